@@ -0,0 +1,267 @@
+
+import os
+import re
+import ssl
+import sys
+import gzip
+import json
+import time
+import base64
+import asyncio
+import argparse
+from urllib.parse import urlsplit
+import instrument
+from bazaar import REQUEST_TIMEOUT
+from pricing import reachable_products
+from recipe_model import load_recipes
+
+# Lowest-BIN prices from the Auction House, for products the Bazaar does not
+# list (new mutations, some ingredients). The auctions endpoint is paginated
+# (~1000 auctions a page, dozens of pages); page 0 gives the page count, then
+# a fixed number of workers, each on its own keep-alive connection, take the
+# remaining pages in turn. Every page is folded into the index as soon as it
+# has been read and is then dropped, so at most `concurrency` pages are in
+# memory at once.
+#
+# The item id is not in the auction JSON itself but in item_bytes (base64,
+# gzipped NBT), where it is the first string tag named "id"
+# (tag.ExtraAttributes.id). Only BIN auctions are decoded, and only the ids
+# asked for are kept, at starting_bid per item in the stack.
+#
+# The HTTP client is a small HTTP/1.1 one over asyncio streams (like
+# server.py), so there is no extra dependency; --auctions-url points it at a
+# local stand-in server.
+
+AUCTIONS_URL = os.environ.get("AUCTIONS_URL", "https://api.hypixel.net/v2/skyblock/auctions")
+DEFAULT_CONCURRENCY = 8
+RETRIES = 2
+MAX_HEADER_BYTES = 1 << 16
+
+_NBT_ID = re.compile(rb'\x08\x00\x02id(..)', re.S)
+_NBT_COUNT = re.compile(rb'\x01\x00\x05Count(.)', re.S)
+
+class AuctionError(Exception):
+    pass
+
+def item_id(item_bytes):
+    # (item id, stack size) from an auction's item_bytes, or (None, 0)
+    try:
+        raw = gzip.decompress(base64.b64decode(item_bytes))
+    except (ValueError, OSError, EOFError):
+        return None, 0
+    m = _NBT_ID.search(raw)
+    if not m:
+        return None, 0
+    start = m.end()
+    name = raw[start:start + int.from_bytes(m.group(1), 'big')].decode('utf-8', 'replace')
+    count = _NBT_COUNT.search(raw)
+    return name, count.group(1)[0] if count else 1
+
+class LowestBIN:
+    def __init__(self, wanted):
+        self.wanted = set(wanted)
+        self.prices = {}  # item id -> lowest BIN per unit
+        self.last_updated = None
+        self.pages = 0
+        self.auctions = 0
+        self.decoded = 0
+        self.failed = []      # page numbers that could not be read
+        self.stale_pages = 0  # pages from a newer listing than page 0
+
+    def add_page(self, payload):
+        if not payload.get("success", False):
+            raise AuctionError(payload.get("cause", "API reported failure"))
+        if self.last_updated is None:
+            self.last_updated = payload.get("lastUpdated")
+        elif payload.get("lastUpdated") != self.last_updated:
+            self.stale_pages += 1
+        self.pages += 1
+        prices = self.prices
+        wanted = self.wanted
+        auctions = payload.get("auctions", [])
+        self.auctions += len(auctions)
+        for auction in auctions:
+            if not auction.get("bin"):
+                continue
+            self.decoded += 1
+            name, count = item_id(auction.get("item_bytes", ""))
+            if name not in wanted or count <= 0:
+                continue
+            price = auction["starting_bid"] / count
+            if name not in prices or price < prices[name]:
+                prices[name] = price
+
+class Connection:
+    # One keep-alive HTTP/1.1 connection, reopened when the server drops it
+    def __init__(self, url, timeout=REQUEST_TIMEOUT):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.netloc = parts.netloc
+        self.tls = parts.scheme == "https"
+        self.port = parts.port or (443 if self.tls else 80)
+        self.path = parts.path or "/"
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port, ssl=ssl.create_default_context() if self.tls else None, limit=MAX_HEADER_BYTES)
+
+    def close(self):
+        # Returns the closed writer, for wait_closed()
+        writer = self.writer
+        if writer is not None:
+            writer.close()
+        self.reader = self.writer = None
+        return writer
+
+    async def get_json(self, page):
+        target = f"{self.path}?page={page}"
+        for attempt in range(RETRIES + 1):
+            try:
+                if self.writer is None:
+                    await self.open()
+                status, body = await asyncio.wait_for(self.request(target), self.timeout)
+                break
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError) as e:
+                self.close()
+                if attempt == RETRIES:
+                    raise AuctionError(f"page {page}: {type(e).__name__}: {e}")
+        instrument.count("auctions.bytes", len(body))
+        if status != 200:
+            raise AuctionError(f"page {page}: HTTP {status}")
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise AuctionError(f"page {page}: bad JSON: {e}")
+
+    async def request(self, target):
+        self.writer.write((f"GET {target} HTTP/1.1\r\nHost: {self.netloc}\r\nAccept-Encoding: gzip\r\n"
+                           f"Connection: keep-alive\r\n\r\n").encode("latin-1"))
+        await self.writer.drain()
+        reader = self.reader
+        head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        status_line = head[0].split(None, 2)
+        if len(status_line) < 2 or not status_line[1].isdigit():
+            raise OSError(f"malformed status line {head[0]!r}")
+        headers = {}
+        for line in head[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip().lower()
+
+        if headers.get("transfer-encoding") == "chunked":
+            parts = []
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if not size:
+                    # Trailers, if any, end with an empty line
+                    while await reader.readuntil(b"\r\n") != b"\r\n":
+                        pass
+                    break
+                parts.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b"".join(parts)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            headers["connection"] = "close"
+        if headers.get("connection") == "close":
+            self.close()
+        if headers.get("content-encoding") == "gzip":
+            body = gzip.decompress(body)
+        return int(status_line[1]), body
+
+async def fetch_lowest_bin(wanted, url=AUCTIONS_URL, concurrency=DEFAULT_CONCURRENCY, timeout=REQUEST_TIMEOUT):
+    # LowestBIN over every page. Raises AuctionError if page 0 fails; later
+    # pages that fail are listed in .failed.
+    index = LowestBIN(wanted)
+    connections = [Connection(url, timeout) for _ in range(max(1, concurrency))]
+
+    async def worker(connection, pages):
+        # pages is shared: each page number is handed to exactly one worker
+        for page in pages:
+            try:
+                payload = await connection.get_json(page)
+                with instrument.stage("auctions.page", page=page):
+                    index.add_page(payload)
+            except AuctionError:
+                # Pages shift while the API refreshes, so the last ones can 404
+                index.failed.append(page)
+
+    try:
+        first = await connections[0].get_json(0)
+        index.add_page(first)
+        pages = iter(range(1, first.get("totalPages", 1)))
+        await asyncio.gather(*(worker(c, pages) for c in connections))
+    finally:
+        for writer in [c.close() for c in connections]:
+            if writer is not None:
+                try:
+                    await writer.wait_closed()
+                except OSError:
+                    pass
+    index.failed.sort()
+    return index
+
+def lowest_bin(wanted, url=AUCTIONS_URL, concurrency=DEFAULT_CONCURRENCY, timeout=REQUEST_TIMEOUT):
+    # Blocking wrapper for scripts; returns the LowestBIN, or None on failure
+    with instrument.stage("auctions.fetch"):
+        try:
+            return asyncio.run(fetch_lowest_bin(wanted, url, concurrency, timeout))
+        except AuctionError as e:
+            print(f"Error fetching auctions: {e}")
+            return None
+
+def fill_from_auctions(index, url=AUCTIONS_URL, concurrency=DEFAULT_CONCURRENCY):
+    # Prices every product the Bazaar snapshot lacks at its lowest BIN
+    # (pricing.PriceIndex.fill_missing). Returns the names filled.
+    missing = index.missing()
+    if not missing:
+        return []
+    found = lowest_bin(missing, url, concurrency)
+    if found is None:
+        return []
+    return index.fill_missing(found.prices)
+
+def add_auction_args(parser):
+    # Shared CLI flags for entry points that can fall back to lowest BIN
+    parser.add_argument("--auctions-url", default=AUCTIONS_URL,
+                        help="auctions endpoint, e.g. a local stand-in server")
+    parser.add_argument("--auction-concurrency", type=int, default=DEFAULT_CONCURRENCY, metavar="N",
+                        help="auction pages fetched at once (default: %(default)s)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the lowest BIN price of items from the Auction House.")
+    parser.add_argument("items", nargs="*", help="item ids (default: every product items.json reaches)")
+    add_auction_args(parser)
+    args = parser.parse_args(argv)
+
+    if args.items:
+        wanted = [name.upper() for name in args.items]
+    else:
+        try:
+            wanted = reachable_products(load_recipes())
+        except FileNotFoundError:
+            print("items.json not found.")
+            return
+
+    started = time.perf_counter()
+    index = lowest_bin(wanted, args.auctions_url, args.auction_concurrency)
+    if index is None:
+        return
+    sys.stdout.reconfigure(encoding='utf-8')
+    print(f"Read {index.pages} pages, {index.auctions:,} auctions ({index.decoded:,} BIN) "
+          f"in {time.perf_counter() - started:.2f}s.")
+    if index.failed:
+        print(f"Could not read pages: {', '.join(map(str, index.failed))}")
+    if index.stale_pages:
+        print(f"{index.stale_pages} pages came from a newer listing than page 0.")
+    print("")
+    for name in wanted:
+        price = index.prices.get(name)
+        print(f"{name:<24} {f'{price:,.1f}' if price is not None else '-'}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
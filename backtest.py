@@ -0,0 +1,187 @@
+
+import os
+import sys
+import gzip
+import argparse
+import numpy as np
+from bazaar import load_snapshot, stream_payload
+from layout_cache import LayoutCache
+from pricing import PriceIndex, reachable_products
+from profit_engine import ProfitEngine
+from positions import EXACT_TIME_BUDGET
+from recipe_model import load_recipes
+
+# Replays stored Bazaar snapshots through the profit pass, one at a time.
+# Recipes, layouts, the PriceIndex and the ProfitEngine are built once; each
+# snapshot only rewrites the index's price arrays and runs one batched
+# evaluate(), so thousands of snapshots cost little more than decoding them.
+
+def snapshot_sort_key(name):
+    # bazaar_<lastUpdated>.json.gz sorts by timestamp, anything else by name
+    stem = name.split('.', 1)[0]
+    if stem.startswith('bazaar_') and stem[len('bazaar_'):].isdigit():
+        return (int(stem[len('bazaar_'):]), name)
+    return (0, name)
+
+def snapshot_paths(directory):
+    names = [n for n in os.listdir(directory) if n.endswith('.json') or n.endswith('.json.gz')]
+    return [os.path.join(directory, n) for n in sorted(names, key=snapshot_sort_key)]
+
+def iter_snapshots(source, whitelist=None):
+    # Yields one payload at a time from a snapshot directory, a JSONL file
+    # (one payload per line, optionally gzipped) or a single snapshot file.
+    # Decoded like a live fetch: with a whitelist, products outside it are
+    # dropped while streaming instead of being built and thrown away.
+    if os.path.isdir(source):
+        for path in snapshot_paths(source):
+            yield load_snapshot(path, whitelist)
+    elif source.endswith('.jsonl') or source.endswith('.jsonl.gz'):
+        opener = gzip.open if source.endswith('.gz') else open
+        with opener(source, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield stream_payload((line,), whitelist)
+    else:
+        yield load_snapshot(source, whitelist)
+
+class Backtest:
+    def __init__(self, recipes, layouts):
+        self.index = PriceIndex(recipes)
+        self.engine = ProfitEngine(recipes, self.index, layouts)
+        self.items = self.engine.items
+        self.times = []
+        self.rows = []
+        self.skipped = 0
+
+    def add(self, payload):
+        products = payload.get("products")
+        if not payload.get("success") or not products:
+            self.skipped += 1
+            return False
+        last_updated = payload.get("lastUpdated")
+        self.index.update(products, last_updated)
+        result = self.engine.evaluate(*self.engine.price_vectors())
+        # Items that could not be priced in this snapshot are NaN
+        self.rows.append(np.where(result["valid"], result["profit_per_hour"], np.nan))
+        self.times.append(last_updated)
+        return True
+
+    def series(self):
+        # (snapshots, items) matrix of profit/hour
+        if not self.rows:
+            return np.empty((0, len(self.items)))
+        return np.vstack(self.rows)
+
+    def ranks(self, series):
+        # 1-based rank per snapshot among the items priced in it, NaN if not
+        filled = np.where(np.isnan(series), -np.inf, series)
+        order = np.argsort(-filled, axis=1, kind='stable')
+        ranks = np.empty_like(series)
+        rows = np.arange(series.shape[0])[:, None]
+        ranks[rows, order] = np.arange(1, series.shape[1] + 1)
+        ranks[np.isnan(series)] = np.nan
+        return ranks
+
+    def stats(self):
+        series = self.series()
+        ranks = self.ranks(series)
+        out = []
+        for col, item in enumerate(self.items):
+            values = series[:, col]
+            priced = ~np.isnan(values)
+            if not priced.any():
+                continue
+            v = values[priced]
+            r = ranks[priced, col]
+            out.append({
+                "item": item,
+                "snapshots": int(priced.sum()),
+                "mean": float(v.mean()),
+                "p10": float(np.percentile(v, 10)),
+                "p90": float(np.percentile(v, 90)),
+                "mean_rank": float(r.mean()),
+                "rank_sd": float(r.std()),
+                "top_share": float((r == 1).mean()),
+            })
+        out.sort(key=lambda x: x["mean"], reverse=True)
+        return out
+
+    def rank_stability(self):
+        # Mean Spearman correlation between consecutive snapshots' rankings,
+        # over the items priced in both. 1.0 = the order never changes.
+        ranks = self.ranks(self.series())
+        corrs = []
+        for prev, cur in zip(ranks[:-1], ranks[1:]):
+            both = ~np.isnan(prev) & ~np.isnan(cur)
+            if both.sum() < 2:
+                continue
+            a = np.argsort(np.argsort(prev[both])).astype(float)
+            b = np.argsort(np.argsort(cur[both])).astype(float)
+            n = len(a)
+            corrs.append(1 - 6 * ((a - b) ** 2).sum() / (n * (n * n - 1)))
+        return float(np.mean(corrs)) if corrs else float('nan')
+
+    def write_series(self, f):
+        f.write(",".join(["lastUpdated"] + self.items) + "\n")
+        for ts, row in zip(self.times, self.rows):
+            cells = ["" if np.isnan(v) else f"{v:.1f}" for v in row]
+            f.write(",".join([str(ts)] + cells) + "\n")
+
+def print_stats(bt):
+    sys.stdout.reconfigure(encoding='utf-8')
+    stats = bt.stats()
+    print(f"Backtested {len(bt.times)} snapshots ({bt.skipped} skipped).\n")
+    print(f"{'ITEM':<20} | {'SNAPS':<5} | {'MEAN P/H':<12} | {'P10 P/H':<12} | {'P90 P/H':<12} | {'RANK':<5} | {'RANK SD':<7} | {'#1':<5}")
+    print("-" * 100)
+    for s in stats:
+        print(f"{s['item']:<20} | {s['snapshots']:<5} | {s['mean']:<12.1f} | {s['p10']:<12.1f} | {s['p90']:<12.1f} | "
+              f"{s['mean_rank']:<5.1f} | {s['rank_sd']:<7.2f} | {s['top_share'] * 100:<4.0f}%")
+    print(f"\nRank stability (mean Spearman between consecutive snapshots): {bt.rank_stability():.3f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest mutation profits over stored Bazaar snapshots.")
+    parser.add_argument("source", help="snapshot directory, JSONL file of payloads, or a single snapshot")
+    parser.add_argument("--series", nargs="?", const="-", default=None, metavar="CSV",
+                        help="write the per-item profit/hour time series as CSV (default: stdout)")
+    parser.add_argument("--limit", type=int, default=None, help="stop after N snapshots")
+    parser.add_argument("--exact", action="store_true", help="use exact layouts")
+    parser.add_argument("--time-budget", type=float, default=EXACT_TIME_BUDGET,
+                        help="seconds per recipe for --exact (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        recipes = load_recipes()
+    except FileNotFoundError:
+        print("items.json not found.")
+        return
+
+    layout_cache = LayoutCache(exact=args.exact, time_budget=args.time_budget)
+    layouts = layout_cache.get_layouts([name for name, data in recipes.items() if data.get("made_of")], recipes)
+    layout_cache.save()
+
+    bt = Backtest(recipes, layouts)
+    try:
+        for n, payload in enumerate(iter_snapshots(args.source, set(reachable_products(recipes)))):
+            if args.limit is not None and n >= args.limit:
+                break
+            bt.add(payload)
+    except (OSError, ValueError) as e:
+        print(f"Error reading snapshots from {args.source}: {e}")
+        return
+
+    if not bt.times:
+        print("No usable snapshots found.")
+        return
+
+    if args.series == "-":
+        bt.write_series(sys.stdout)
+        print("")
+    elif args.series:
+        with open(args.series, 'w', encoding='utf-8') as f:
+            bt.write_series(f)
+        print(f"Wrote time series to {args.series}\n")
+
+    print_stats(bt)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,345 @@
+
+import os
+import re
+import json
+import gzip
+import time
+import codecs
+import email.utils
+import requests
+import instrument
+from requests.adapters import HTTPAdapter
+
+BAZAAR_URL = os.environ.get("BAZAAR_URL", "https://api.hypixel.net/v2/skyblock/bazaar")
+SNAPSHOT_DIR = '.bazaar_snapshots'
+# The API refreshes roughly every 20s; anything younger is reused as-is
+DEFAULT_TTL = 60
+REQUEST_TIMEOUT = 15
+# Snapshots kept on disk, newest first: a day's worth at one fetch a minute
+DEFAULT_KEEP = 1440
+STREAM_CHUNK = 1 << 16
+
+def snapshot_name(last_updated):
+    return f"bazaar_{last_updated}.json.gz"
+
+def load_snapshot(path, whitelist=None, levels=None):
+    # Accepts both our gzipped snapshots and plain saved API responses.
+    # With a whitelist or levels the file is streamed like a download.
+    opener = gzip.open if path.endswith('.gz') else open
+    if whitelist is None and levels is None:
+        with opener(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    with opener(path, 'rb') as f:
+        return stream_payload(iter(lambda: f.read(STREAM_CHUNK), b''), whitelist, levels)
+
+# Streaming decode. The payload is ~1-2k products with up to 30 orders per
+# side, of which items.json reaches a few dozen, so products are decoded one
+# at a time as their bytes arrive (each still by the C json decoder) and the
+# ones not in the whitelist are dropped straight away. Only the unread tail
+# of the body and the kept products are ever held in memory.
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+
+class JSONStream:
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decode = codecs.getincrementaldecoder('utf-8')().decode
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        # Appends the next chunk, dropping what was consumed; False at the end
+        for chunk in self.chunks:
+            text = self.decode(chunk)
+            if text:
+                self.buf = self.buf[self.pos:] + text
+                self.pos = 0
+                return True
+        self.buf = self.buf[self.pos:] + self.decode(b'', True)
+        self.pos = 0
+        self.eof = True
+        return False
+
+    def peek(self):
+        # Next non-whitespace character, without consuming it
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                raise ValueError("Unexpected end of Bazaar response")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Malformed Bazaar response: expected {char!r} near {self.buf[self.pos:self.pos + 40]!r}")
+        self.pos += 1
+
+    def value(self):
+        # Next complete JSON value. A value that runs up to the end of the
+        # buffer may be cut short (a number, or an object missing its tail),
+        # so it is only accepted once a following character has arrived.
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.more()
+
+    def members(self):
+        # Keys of the object starting here. The caller must read (or skip)
+        # each member's value before asking for the next key.
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError(f"Malformed Bazaar response: expected ',' or '}}' near {self.buf[self.pos - 1:self.pos + 40]!r}")
+
+def trim_levels(product, levels):
+    # Keep the best `levels` orders on each side
+    if levels is not None:
+        for key in ("sell_summary", "buy_summary"):
+            if key in product:
+                product[key] = product[key][:levels]
+    return product
+
+def stream_payload(chunks, whitelist=None, levels=None):
+    # Payload dict from an iterable of raw body chunks. Products outside the
+    # whitelist (None = keep all) are discarded while parsing.
+    stream = JSONStream(chunks)
+    payload = {}
+    skipped = 0
+    for key in stream.members():
+        if key != "products":
+            payload[key] = stream.value()
+            continue
+        products = {}
+        for product_id in stream.members():
+            product = stream.value()
+            if whitelist is None or product_id in whitelist:
+                products[product_id] = trim_levels(product, levels)
+            else:
+                skipped += 1
+        payload["products"] = products
+    instrument.count("bazaar.products_skipped", skipped)
+    return payload
+
+class SnapshotStore:
+    # Raw /v2/skyblock/bazaar payloads on disk, one file per lastUpdated.
+    # Fetch time is the file mtime, which is what the TTL is checked against.
+    # Only the newest keep snapshots are kept (0 or None = all).
+    def __init__(self, path=SNAPSHOT_DIR, keep=DEFAULT_KEEP):
+        self.path = path
+        self.keep = keep
+
+    def list(self):
+        # Snapshot paths, oldest first
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return []
+        stamps = []
+        for name in names:
+            if name.startswith('bazaar_') and name.endswith('.json.gz'):
+                try:
+                    stamps.append(int(name[len('bazaar_'):-len('.json.gz')]))
+                except ValueError:
+                    continue
+        return [os.path.join(self.path, snapshot_name(ts)) for ts in sorted(stamps)]
+
+    def latest(self):
+        paths = self.list()
+        return paths[-1] if paths else None
+
+    def age(self, path):
+        return time.time() - os.path.getmtime(path)
+
+    def add(self, tmp_path, last_updated):
+        # Moves an already written gzip file into place
+        path = os.path.join(self.path, snapshot_name(last_updated))
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            os.utime(path)
+            return path
+        os.replace(tmp_path, path)
+        self.trim()
+        return path
+
+    def save(self, payload):
+        os.makedirs(self.path, exist_ok=True)
+        path = os.path.join(self.path, snapshot_name(payload.get("lastUpdated", 0)))
+        if os.path.exists(path):
+            # Same lastUpdated as one we already have: just mark it fresh
+            os.utime(path)
+            return path
+        tmp_path = path + '.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        self.trim()
+        return path
+
+    def trim(self):
+        if not self.keep:
+            return
+        for path in self.list()[:-self.keep]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+class BazaarClient:
+    def __init__(self, url=BAZAAR_URL, snapshot_dir=SNAPSHOT_DIR, ttl=DEFAULT_TTL,
+                 offline=None, timeout=REQUEST_TIMEOUT, keep=DEFAULT_KEEP, whitelist=None, levels=None):
+        self.url = url
+        # With a whitelist of product ids and/or an order-level cap, payloads
+        # are stream-decoded and everything else is dropped while parsing.
+        # Snapshots on disk always keep the full response.
+        self.whitelist = whitelist
+        self.levels = levels
+        self.store = SnapshotStore(snapshot_dir, keep)
+        self.ttl = ttl
+        # offline: None = use the network, '' = replay the newest stored
+        # snapshot, anything else = path of a saved snapshot file to replay
+        self.offline = offline
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.last_source = None
+
+    def fetch_snapshot(self, max_age=None):
+        # Full payload ({"success", "lastUpdated", "products"}), or None.
+        # A stored snapshot younger than max_age seconds (default: the TTL)
+        # is reused; 0 always asks the API, still with If-Modified-Since.
+        if self.offline is not None:
+            path = self.offline or self.store.latest()
+            if not path:
+                print(f"Offline mode: no snapshot found in {self.store.path}")
+                return None
+            self.last_source = path
+            with instrument.stage("bazaar.load_snapshot"):
+                return load_snapshot(path, self.whitelist, self.levels)
+
+        latest = self.store.latest()
+        if max_age is None:
+            max_age = self.ttl
+        if latest and max_age and self.store.age(latest) < max_age:
+            self.last_source = latest
+            instrument.count("bazaar.ttl_reuse")
+            with instrument.stage("bazaar.load_snapshot"):
+                return load_snapshot(latest, self.whitelist, self.levels)
+
+        headers = {}
+        if latest:
+            # Conditional refresh: only download if newer than what we have
+            last_updated = int(os.path.basename(latest)[len('bazaar_'):-len('.json.gz')])
+            headers["If-Modified-Since"] = email.utils.formatdate(last_updated / 1000, usegmt=True)
+
+        streaming = self.whitelist is not None or self.levels is not None
+        with instrument.stage("bazaar.download"):
+            response = self.session.get(self.url, headers=headers, timeout=self.timeout, stream=streaming)
+            if not streaming:
+                instrument.count("bazaar.bytes", len(response.content))
+        if response.status_code == 304 and latest:
+            response.close()
+            os.utime(latest)
+            self.last_source = latest
+            instrument.count("bazaar.not_modified")
+            with instrument.stage("bazaar.load_snapshot"):
+                return load_snapshot(latest, self.whitelist, self.levels)
+        response.raise_for_status()
+        if streaming:
+            with instrument.stage("bazaar.stream_decode"), response:
+                return self.stream_response(response)
+        with instrument.stage("bazaar.decode"):
+            payload = response.json()
+        if payload.get("success"):
+            with instrument.stage("bazaar.save_snapshot"):
+                self.last_source = self.store.save(payload)
+        else:
+            self.last_source = self.url
+        return payload
+
+    def stream_response(self, response):
+        # Decodes the body as it downloads while copying the raw bytes into a
+        # gzip file, which becomes the snapshot once lastUpdated is known
+        os.makedirs(self.store.path, exist_ok=True)
+        tmp_path = os.path.join(self.store.path, f"download_{os.getpid()}.json.gz.tmp")
+        try:
+            with gzip.open(tmp_path, 'wb') as raw:
+                def tee(chunks):
+                    for chunk in chunks:
+                        raw.write(chunk)
+                        instrument.count("bazaar.bytes", len(chunk))
+                        yield chunk
+                payload = stream_payload(tee(response.iter_content(STREAM_CHUNK)), self.whitelist, self.levels)
+            if payload.get("success"):
+                self.last_source = self.store.add(tmp_path, payload.get("lastUpdated", 0))
+            else:
+                os.remove(tmp_path)
+                self.last_source = self.url
+            return payload
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_products(self):
+        try:
+            data = self.fetch_snapshot()
+            if not data:
+                return {}
+            if not data.get("success"):
+                print("API request failed or returned success: false")
+                return {}
+            return data.get("products", {})
+        except Exception as e:
+            print(f"Error fetching bazaar data: {e}")
+            return {}
+
+    def close(self):
+        self.session.close()
+
+def get_bazaar_data(client=None, whitelist=None):
+    # whitelist: product ids to keep (e.g. pricing.reachable_products),
+    # everything else is skipped while decoding
+    if client is None:
+        client = BazaarClient()
+    if whitelist is not None:
+        client.whitelist = set(whitelist)
+    return client.get_products()
+
+def add_bazaar_args(parser):
+    # Shared CLI flags for every entry point that reads Bazaar prices
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL,
+                        help="reuse the newest stored snapshot if younger than this many seconds (default: %(default)s)")
+    parser.add_argument("--offline", nargs="?", const="", default=None, metavar="SNAPSHOT",
+                        help="replay a saved snapshot instead of the network (default: newest stored)")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR,
+                        help="where Bazaar snapshots are stored (default: %(default)s)")
+    parser.add_argument("--bazaar-url", default=BAZAAR_URL,
+                        help="Bazaar endpoint, e.g. a local stand-in server")
+    parser.add_argument("--levels", type=int, default=None, metavar="N",
+                        help="keep only the best N orders per side of each product (default: all)")
+    parser.add_argument("--keep", type=int, default=DEFAULT_KEEP, metavar="N",
+                        help="keep only the newest N snapshots on disk, 0 = all (default: %(default)s)")
+
+def client_from_args(args):
+    return BazaarClient(url=args.bazaar_url, snapshot_dir=args.snapshot_dir,
+                        ttl=args.ttl, offline=args.offline, keep=args.keep, levels=args.levels)
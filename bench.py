@@ -0,0 +1,219 @@
+
+import gc
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import statistics
+import subprocess
+import tracemalloc
+from positions import solve_layout, SOLVER_VERSION, PLOT_ROWS, PLOT_COLS
+from pricing import PriceIndex, DepthIndex, reachable_products
+from bazaar import stream_payload, STREAM_CHUNK
+from main import compute_profits
+from recipe_model import load_recipes
+
+# Benchmarks for the layout solver branches and the profit pass. Runs offline:
+# prices come from a frozen snapshot fixture, either a saved API payload
+# (--snapshot) or one generated from items.json with a fixed seed.
+#
+# Each case reports wall time over --repeat runs after one warm-up run (plus
+# the cold first run on its own), the tracemalloc peak of one run, the net
+# change in allocated blocks, and gen-0 GC collections as a proxy for how
+# many container objects were allocated.
+
+DEFAULT_OUTPUT = "bench_results.json"
+FIXTURE_SEED = 1337
+FIXTURE_LEVELS = 30
+# Unrelated products, so the fixture is about as large as a live payload
+FIXTURE_FILLER = 1500
+
+def fixture_snapshot(recipes, seed=FIXTURE_SEED):
+    # Deterministic stand-in for a /v2/skyblock/bazaar payload
+    rng = random.Random(seed)
+    names = reachable_products(recipes) + [f"BENCH_FILLER_{i}" for i in range(FIXTURE_FILLER)]
+    products = {}
+    for name in names:
+        base = rng.uniform(5, 5000)
+
+        def levels(price, step):
+            return [{"amount": rng.randint(1, 2000), "pricePerUnit": round(price * (1 + step * j), 1),
+                     "orders": rng.randint(1, 9)} for j in range(FIXTURE_LEVELS)]
+
+        products[name] = {
+            "product_id": name,
+            "sell_summary": levels(base, -0.01),
+            "buy_summary": levels(base * 1.05, 0.01),
+            "quick_status": {"productId": name, "sellPrice": base, "buyPrice": base * 1.05},
+        }
+    return {"success": True, "lastUpdated": 1700000000000, "products": products}
+
+def measure(fn, repeat):
+    # Returns the stats dict for one case
+    gc.collect()
+    started = time.perf_counter()
+    fn()
+    cold = time.perf_counter() - started
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    gen0 = gc.get_stats()[0]["collections"]
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gen0 = gc.get_stats()[0]["collections"] - gen0
+    del result
+    gc.collect()
+    net_blocks = sys.getallocatedblocks() - blocks
+
+    return {
+        "repeat": repeat,
+        "cold_s": cold,
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "mean_s": statistics.fmean(times),
+        "peak_bytes": peak,
+        "net_blocks": net_blocks,
+        "gc_gen0": gen0,
+    }
+
+def layout_cases(recipes):
+    # One recipe per solve_layout branch, plus every recipe in one go
+    def solve(name, rows=PLOT_ROWS, cols=PLOT_COLS):
+        return lambda: solve_layout(name, recipes[name], recipes, rows, cols)
+
+    def solve_all():
+        return [solve_layout(name, data, recipes) for name, data in recipes.items() if data.get("made_of")]
+
+    return [
+        ("layout/plantboy_backtracking", solve("PLANTBOY_ADVANCE")),
+        # The 10x10 search succeeds at once; 8x10 makes it backtrack
+        ("layout/plantboy_backtracking_8x10", solve("PLANTBOY_ADVANCE", 8, 10)),
+        ("layout/size3_snoozling", solve("SNOOZLING")),
+        ("layout/size2_noctilume", solve("NOCTILUME")),
+        ("layout/size1_with_size2_ingredient", solve("ALL_IN_ALOE")),
+        ("layout/all_recipes", solve_all),
+    ]
+
+def profit_cases(recipes, raw):
+    # The work main.calculate_profits does once layouts are known: decode
+    # the payload, build the index, run the pass
+    layouts = {name: solve_layout(name, data, recipes) for name, data in recipes.items() if data.get("made_of")}
+
+    def profit_pass():
+        products = json.loads(raw)["products"]
+        index = PriceIndex.from_products(recipes, products)
+        del products
+        return compute_profits(recipes, index, layouts)
+
+    whitelist = set(reachable_products(recipes))
+
+    def streamed_pass():
+        # Same, decoding like a streamed download
+        chunks = (raw[i:i + STREAM_CHUNK] for i in range(0, len(raw), STREAM_CHUNK))
+        products = stream_payload(chunks, whitelist)["products"]
+        index = PriceIndex.from_products(recipes, products)
+        del products
+        return compute_profits(recipes, index, layouts)
+
+    products = json.loads(raw)["products"]
+    index = PriceIndex.from_products(recipes, products)
+    depth = DepthIndex.from_products(index, products)
+    del products
+
+    cases = [
+        ("profit/full_pass", profit_pass),
+        ("profit/full_pass_streamed", streamed_pass),
+        ("profit/compute_only", lambda: compute_profits(recipes, index, layouts)),
+        ("profit/depth", lambda: compute_profits(recipes, index, layouts, depth)),
+    ]
+    try:
+        from profit_engine import ProfitEngine
+    except ImportError:
+        print("numpy not installed, skipping profit/vectorized")
+    else:
+        engine = ProfitEngine(recipes, index, layouts)
+        cases.append(("profit/vectorized", engine.compute_profits))
+    return cases
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def print_results(results, baseline=None):
+    print(f"{'CASE':<38} | {'MEDIAN MS':<10} | {'MIN MS':<10} | {'COLD MS':<10} | {'PEAK KB':<9} | {'GC0':<5} | VS BASE")
+    print("-" * 106)
+    for name, r in results.items():
+        vs = ""
+        if baseline and name in baseline:
+            vs = f"{r['median_s'] / baseline[name]['median_s']:.2f}x"
+        print(f"{name:<38} | {r['median_s'] * 1000:<10.3f} | {r['min_s'] * 1000:<10.3f} | {r['cold_s'] * 1000:<10.3f} | "
+              f"{r['peak_bytes'] / 1024:<9.1f} | {r['gc_gen0']:<5} | {vs}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the layout solver and the profit pass (offline).")
+    parser.add_argument("--snapshot", default=None,
+                        help="saved Bazaar payload to price against (default: generated fixture)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per case (default: %(default)s)")
+    parser.add_argument("--only", default=None, help="run only cases whose name contains this")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write results JSON (default: %(default)s)")
+    parser.add_argument("--compare", default=None, metavar="JSON", help="earlier results to compare against")
+    args = parser.parse_args(argv)
+
+    try:
+        recipes = load_recipes()
+    except FileNotFoundError:
+        print("items.json not found.")
+        return
+
+    if args.snapshot:
+        from bazaar import load_snapshot
+        payload = load_snapshot(args.snapshot)
+    else:
+        payload = fixture_snapshot(recipes)
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    del payload
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    for name, fn in layout_cases(recipes) + profit_cases(recipes, raw):
+        if args.only and args.only not in name:
+            continue
+        results[name] = measure(fn, args.repeat)
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    print_results(results, baseline)
+
+    report = {
+        "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "revision": git_revision(),
+        "solver_version": SOLVER_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "snapshot": os.path.abspath(args.snapshot) if args.snapshot else f"fixture(seed={FIXTURE_SEED})",
+        "snapshot_bytes": len(raw),
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,108 @@
+
+# Bitboard-backed plot grid used by the layout solver.
+# Each cell (r, c) maps to bit r * cols + c. We keep one mask per symbol plus
+# an occupancy mask, so fit checks, placement and undo are plain integer ops.
+# The char grid is only materialized at the end (to_chars) for print_grid.
+
+
+def cell_bit(r, c, cols=10):
+    return 1 << (r * cols + c)
+
+
+def block_mask(r, c, h, w, rows=10, cols=10):
+    # Mask of an h x w block with top-left (r, c), or 0 if it leaves the plot
+    if r < 0 or c < 0 or r + h > rows or c + w > cols:
+        return 0
+    row_bits = ((1 << w) - 1) << c
+    mask = 0
+    for rr in range(r, r + h):
+        mask |= row_bits << (rr * cols)
+    return mask
+
+
+def ring_cells(r, c, size, rows=10, cols=10):
+    # In-bounds cells touching a size x size footprint (corners included).
+    # Order matches the old get_neighbors_p: top row, bottom row, then sides.
+    cells = []
+    cells.extend([(r - 1, cc) for cc in range(c - 1, c + size + 1)])
+    cells.extend([(r + size, cc) for cc in range(c - 1, c + size + 1)])
+    for rr in range(r, r + size):
+        cells.append((rr, c - 1))
+        cells.append((rr, c + size))
+    return [(rr, cc) for rr, cc in cells if 0 <= rr < rows and 0 <= cc < cols]
+
+
+def ring_mask(r, c, size, rows=10, cols=10):
+    mask = 0
+    for rr, cc in ring_cells(r, c, size, rows, cols):
+        mask |= cell_bit(rr, cc, cols)
+    return mask
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+def iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class BitGrid:
+    __slots__ = ("rows", "cols", "occ", "masks")
+
+    def __init__(self, rows=10, cols=10):
+        self.rows = rows
+        self.cols = cols
+        self.occ = 0
+        self.masks = {}
+
+    def copy(self):
+        g = BitGrid(self.rows, self.cols)
+        g.occ = self.occ
+        g.masks = dict(self.masks)
+        return g
+
+    def get(self, sym):
+        return self.masks.get(sym, 0)
+
+    def fits(self, mask):
+        # Every cell in mask is empty
+        return not (self.occ & mask)
+
+    def fits_sym(self, mask, sym):
+        # Every cell in mask is empty or already holds sym
+        return not (self.occ & mask & ~self.masks.get(sym, 0))
+
+    def place(self, sym, mask):
+        # Returns the bits actually added so the caller can undo precisely
+        added = mask & ~self.occ
+        self.occ |= added
+        self.masks[sym] = self.masks.get(sym, 0) | added
+        return added
+
+    def remove(self, sym, added):
+        self.occ &= ~added
+        self.masks[sym] &= ~added
+
+    def count(self, sym):
+        return popcount(self.masks.get(sym, 0))
+
+    def to_chars(self, fill=' '):
+        grid = [[fill for _ in range(self.cols)] for _ in range(self.rows)]
+        for sym, mask in self.masks.items():
+            for bit in iter_bits(mask):
+                r, c = divmod(bit, self.cols)
+                grid[r][c] = sym
+        return grid
+
+    @classmethod
+    def from_chars(cls, grid, empty=' '):
+        g = cls(len(grid), len(grid[0]) if grid else 0)
+        for r, row in enumerate(grid):
+            for c, ch in enumerate(row):
+                if ch != empty:
+                    g.place(ch, cell_bit(r, c, g.cols))
+        return g
@@ -0,0 +1,334 @@
+
+import time
+import functools
+from bitgrid import BitGrid, block_mask, ring_mask, popcount, iter_bits
+
+# Exact maximum-placement solver.
+#
+# Model: a crop of size s occupies an s x s block. Every crop needs, among the
+# cells touching its footprint (its "ring", corners included), at least
+# made_of[ing] cells of each ingredient. An ingredient of size k is placed as a
+# whole k x k block. Ingredient cells may be shared by any number of crops.
+# Destructive crops only ever get one spot.
+#
+# Search: cells are decided in row-major order (crop anchor, ingredient block
+# anchor, or empty), which means a cell is final once the scan passes it.
+# Branch-and-bound prunes with:
+#   - ring feasibility: a placed crop's missing ingredient cells must fit in
+#     its still-undecided ring cells,
+#   - a window upper bound: the plot is tiled into (s+1)x(s+1) anchor windows,
+#     and each window's max crop count is precomputed once,
+#   - symmetry breaking: of a layout and its vertical mirror only the one whose
+#     top crop row is no further from the edge than its bottom one is explored
+#     (only when the blocked cells are themselves mirror-symmetric).
+# Blocked cells (paths, water, fixtures) are pre-occupied with BLOCKED, so
+# the scan skips them and no block or crop can cover them.
+
+EXACT_TIME_BUDGET = 2.0
+BLOCKED = '~'
+
+class ExactLayoutSolver:
+    def __init__(self, size, requirements, sym_sizes, rows=10, cols=10,
+                 max_crops=None, time_budget=EXACT_TIME_BUDGET, blocked=0):
+        self.size = size
+        self.rows = rows
+        self.cols = cols
+        self.n = rows * cols
+        # Symbols with the biggest requirement first: tried first at each cell
+        self.reqs = sorted(requirements.items(), key=lambda x: -x[1])
+        self.syms = [s for s, _ in self.reqs]
+        self.sym_sizes = sym_sizes
+        self.max_crops = max_crops if max_crops is not None else self.n
+        self.time_budget = time_budget
+        # If any ingredient is 1x1, leaving a cell empty is never better than
+        # filling it with that ingredient, so the "empty" branch is skipped.
+        self.has_unit_ingredient = any(sym_sizes.get(s, 1) == 1 for s in self.syms)
+
+        self.nodes = 0
+        self.pruned = 0
+        self.timed_out = False
+
+        t = get_anchor_tables(size, sum(requirements.values()), rows, cols)
+        self.anchor_mask, self.foot, self.ring, self.ring_of, self.windows = t
+        # blocked is a cell bitmask; anchors that would cover a blocked cell
+        # or lose too much of their ring to them are dropped
+        self.blocked = blocked
+        if blocked:
+            total_req = sum(requirements.values())
+            for a in iter_bits(self.anchor_mask):
+                if self.foot[a] & blocked or popcount(self.ring[a] & ~blocked) < total_req:
+                    self.anchor_mask &= ~(1 << a)
+        self.symmetric = blocked == mirror_rows(blocked, rows, cols)
+        self.blocks = {}
+        for sym in self.syms:
+            k = sym_sizes.get(sym, 1)
+            self.blocks[sym] = [block_mask(i // cols, i % cols, k, k, rows, cols) for i in range(self.n)]
+        self.suffix = [((1 << self.n) - 1) >> i << i for i in range(self.n + 1)]
+        self.row_masks = [((1 << ((r + 1) * cols)) - 1) for r in range(rows)]
+
+    def ring_ok(self, board, a, pos):
+        ring = self.ring[a]
+        open_cells = popcount(ring & ~board.occ & self.suffix[pos])
+        deficit = 0
+        for sym, req in self.reqs:
+            have = popcount(ring & board.get(sym))
+            if have < req:
+                deficit += req - have
+                if deficit > open_cells:
+                    return False
+        return True
+
+    def affected_ok(self, board, changed, crops, pos):
+        touched = 0
+        for bit in iter_bits(changed):
+            touched |= self.ring_of[bit]
+        for a in iter_bits(touched & crops):
+            if not self.ring_ok(board, a, pos):
+                return False
+        return True
+
+    def upper_bound(self, crops, avail):
+        ub = 0
+        for wm, wmax in self.windows:
+            n = popcount(crops & wm) + popcount(avail & wm)
+            ub += wmax if n > wmax else n
+        return min(ub, self.max_crops)
+
+    def solve(self, incumbent=0):
+        # incumbent is the spot count of a layout already known (e.g. the
+        # heuristic one). Only strictly better layouts are recorded, so if
+        # self.best is still incumbent afterwards nothing beat it, and a
+        # finished search proves it optimal.
+        board = BitGrid(self.rows, self.cols)
+        if self.blocked:
+            board.place(BLOCKED, self.blocked)
+        self.best = incumbent
+        self.best_board = board.copy()
+        self.best_crops = 0
+        self.deadline = time.perf_counter() + self.time_budget
+        # Without mirror symmetry every crop row is open from the start
+        self.dfs(board, 0, 0, 0, None if self.symmetric else self.rows - self.size)
+        return self.best_board, self.best_crops, not self.timed_out
+
+    def dfs(self, board, pos, crops, count, row_limit):
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+            self.timed_out = True
+        if self.timed_out:
+            return
+
+        # Skip cells already covered by an earlier block
+        occ = board.occ
+        while pos < self.n and occ >> pos & 1:
+            pos += 1
+
+        # Any state whose placed crops are already satisfied is a valid
+        # layout (the rest of the plot can stay empty), so it can become the
+        # incumbent long before the scan reaches the last cell.
+        if count > self.best and self.all_satisfied(board, crops):
+            self.best = count
+            self.best_board = board.copy()
+            self.best_crops = crops
+        if pos >= self.n:
+            return
+
+        # Mirror symmetry: the first crop must sit in the top half, and it
+        # then caps the last crop row at the same distance from the bottom.
+        # Before it is placed, later crops are only capped by the scan row.
+        row = pos // self.cols
+        if row_limit is None:
+            can_crop = row <= (self.rows - self.size) // 2
+            limit = self.rows - self.size - row
+        else:
+            can_crop = True
+            limit = row_limit
+
+        if count >= self.max_crops or limit < row:
+            avail = 0
+        else:
+            avail = self.anchor_mask & self.suffix[pos] & ~occ & self.row_masks[limit]
+        if self.upper_bound(crops, avail) <= self.best:
+            self.pruned += 1
+            return
+
+        bit = 1 << pos
+        nxt = pos + 1
+
+        # 1. Crop anchored here
+        if can_crop and avail & bit:
+            foot = self.foot[pos]
+            if board.fits(foot):
+                board.place('.', foot)
+                new_crops = crops | bit
+                if self.ring_ok(board, pos, nxt) and self.affected_ok(board, foot, crops, nxt):
+                    self.dfs(board, nxt, new_crops, count + 1, limit)
+                else:
+                    self.pruned += 1
+                board.remove('.', foot)
+                if self.timed_out:
+                    return
+
+        # 2. Ingredient block anchored here, most-needed symbol first
+        for sym in self.order_syms(board, pos, crops, avail):
+            mask = self.blocks[sym][pos]
+            if not mask or not board.fits(mask):
+                continue
+            board.place(sym, mask)
+            if self.affected_ok(board, mask, crops, nxt):
+                self.dfs(board, nxt, crops, count, row_limit)
+            else:
+                self.pruned += 1
+            board.remove(sym, mask)
+            if self.timed_out:
+                return
+
+        # 3. Leave it empty
+        if not self.has_unit_ingredient:
+            if self.affected_ok(board, bit, crops, nxt):
+                self.dfs(board, nxt, crops, count, row_limit)
+            else:
+                self.pruned += 1
+
+    def all_satisfied(self, board, crops):
+        for a in iter_bits(crops):
+            ring = self.ring[a]
+            for sym, req in self.reqs:
+                if popcount(ring & board.get(sym)) < req:
+                    return False
+        return True
+
+    def order_syms(self, board, pos, crops, avail):
+        # Value ordering only: shortfalls of placed crops count double, and
+        # anchors that may still get a crop look ahead so that cells decided
+        # before their crops exist get a useful mix of symbols.
+        need = {}
+        touching = self.ring_of[pos]
+        for weight, anchors in ((2, touching & crops), (1, touching & avail)):
+            for a in iter_bits(anchors):
+                ring = self.ring[a]
+                for sym, req in self.reqs:
+                    short = req - popcount(ring & board.get(sym))
+                    if short > 0:
+                        need[sym] = need.get(sym, 0) + weight * short
+        if not need:
+            return self.syms
+        return sorted(self.syms, key=lambda s: -need.get(s, 0))
+
+def mirror_rows(mask, rows, cols):
+    # mask flipped top to bottom
+    row_bits = (1 << cols) - 1
+    out = 0
+    for r in range(rows):
+        out |= (mask >> (r * cols) & row_bits) << ((rows - 1 - r) * cols)
+    return out
+
+@functools.lru_cache(maxsize=None)
+def get_anchor_tables(size, total_req, rows=10, cols=10):
+    n = rows * cols
+    foot = [0] * n
+    ring = [0] * n
+    ring_size = [0] * n
+    anchor_mask = 0
+    for i in range(n):
+        r, c = divmod(i, cols)
+        fm = block_mask(r, c, size, size, rows, cols)
+        if not fm:
+            continue
+        rm = ring_mask(r, c, size, rows, cols)
+        foot[i] = fm
+        ring[i] = rm
+        ring_size[i] = popcount(rm)
+        # Anchors whose ring is too small to ever satisfy the recipe are dropped
+        if ring_size[i] >= total_req:
+            anchor_mask |= 1 << i
+
+    ring_of = [0] * n
+    for a in iter_bits(anchor_mask):
+        for cell in iter_bits(ring[a]):
+            ring_of[cell] |= 1 << a
+
+    # Tile anchors into (size+1)x(size+1) windows. Any two crops anchored in
+    # the same window overlap or touch, so the window max is small and exact.
+    # The tiling offset matters near the edges; keep the tightest one.
+    w = size + 1
+    windows = None
+    for off_r in range(w):
+        for off_c in range(w):
+            tiling = tile_windows(anchor_mask, foot, ring, ring_size, total_req,
+                                  rows, cols, w, off_r, off_c)
+            if windows is None or sum(m for _, m in tiling) < sum(m for _, m in windows):
+                windows = tiling
+    return anchor_mask, tuple(foot), tuple(ring), tuple(ring_of), tuple(windows or ())
+
+def tile_windows(anchor_mask, foot, ring, ring_size, total_req, rows, cols, w, off_r, off_c):
+    windows = []
+    for wr in range(off_r - w, rows, w):
+        for wc in range(off_c - w, cols, w):
+            anchors = []
+            for r in range(max(wr, 0), min(wr + w, rows)):
+                for c in range(max(wc, 0), min(wc + w, cols)):
+                    i = r * cols + c
+                    if anchor_mask >> i & 1:
+                        anchors.append(i)
+            if not anchors:
+                continue
+            wm = 0
+            for a in anchors:
+                wm |= 1 << a
+            windows.append((wm, window_max(anchors, foot, ring, ring_size, total_req)))
+    return windows
+
+def window_max(anchors, foot, ring, ring_size, total_req):
+    # Largest set of non-overlapping crops in the window where every crop
+    # still has room for its ingredients after its neighbours' footprints.
+    best = 0
+
+    def ok(chosen):
+        for a in chosen:
+            others = 0
+            for b in chosen:
+                if b != a:
+                    others |= foot[b]
+            if ring_size[a] - popcount(ring[a] & others) < total_req:
+                return False
+        return True
+
+    def rec(i, chosen, used):
+        nonlocal best
+        if len(chosen) + len(anchors) - i <= best:
+            return
+        if i == len(anchors):
+            if ok(chosen):
+                best = len(chosen)
+            return
+        a = anchors[i]
+        if not foot[a] & used:
+            chosen.append(a)
+            rec(i + 1, chosen, used | foot[a])
+            chosen.pop()
+        rec(i + 1, chosen, used)
+
+    rec(0, [], 0)
+    return best
+
+def prune_unused(board, crops, ring, sym_sizes):
+    # Ingredient blocks that touch no crop ring are noise in the printed grid
+    used_ring = 0
+    for a in iter_bits(crops):
+        used_ring |= ring[a]
+    for sym, mask in list(board.masks.items()):
+        if sym == '.' or sym == BLOCKED:
+            continue
+        k = sym_sizes.get(sym, 1)
+        if k == 1:
+            board.remove(sym, mask & ~used_ring)
+        else:
+            # Blocks are contiguous k x k runs; drop whole blocks only
+            cols = board.cols
+            remaining = mask
+            while remaining:
+                top = (remaining & -remaining).bit_length() - 1
+                blk = block_mask(top // cols, top % cols, k, k, board.rows, cols) & mask
+                if not blk & used_ring:
+                    board.remove(sym, blk)
+                remaining &= ~blk
@@ -0,0 +1,313 @@
+
+import sys
+import math
+import time
+import argparse
+from layout_cache import LayoutCache
+from bazaar import get_bazaar_data, add_bazaar_args, client_from_args
+from positions import EXACT_TIME_BUDGET
+from pricing import PriceIndex, item_revenue, reachable_products
+from recipe_model import as_model, load_recipes
+
+# Plans a farm of N plots: how many plots to give each mutation so that the
+# whole farm earns the most per hour, with crops feeding each other.
+#
+# Steady-state model, per hour. A plot of mutation m yields spots / hours
+# crops (layout spot count, stages * 2 hours) plus their drops, and uses
+# each ingredient at qty / harvests_per_set per crop. This is the same
+# amortization main.compute_profits uses, so a single plot earns exactly
+# its PROFIT/HOUR there. Summed over the farm, each product ends up with a
+# net flow. A surplus is insta-sold at the bid and a shortfall insta-bought
+# at the ask, so crops grown in-house replace Bazaar purchases whenever that
+# pays. Products with no sell offers must be covered in-house.
+#
+# The exact optimizer is an integer program (scipy.optimize.milp). Without
+# scipy, a pure-Python greedy picks plots, or plot bundles that include the
+# feeders an unbuyable ingredient needs, by gain per plot. Add, remove and
+# swap moves then refine the result until none improves it.
+
+DEFAULT_PLOTS = 20
+INFEASIBLE = float('-inf')
+
+class FarmModel:
+    def __init__(self, recipes, index, layouts):
+        self.index = index
+        bid = index.bid
+        ask = index.ask
+
+        self.mutations = []
+        self.rate = []      # crops per hour per plot
+        self.drops = []     # drop coins per hour per plot
+        self.flows = []     # [(product id, units per hour per plot)], + produced / - used
+        self.excluded = {}  # mutation -> reason
+        for name, data in as_model(recipes).items():
+            if not data.get("made_of"):
+                continue
+            layout = layouts.get(name)
+            if layout is None or isinstance(layout, Exception) or not layout[1]:
+                self.excluded[name] = "no layout"
+                continue
+            if data.stages <= 0:
+                self.excluded[name] = "no grow time"
+                continue
+            item_id, ingredients, _ = index.refs[name]
+            rate = layout[1] / data.hours
+            drop_value, _ = item_revenue(index, name, crop=False)
+
+            flow = {item_id: rate}
+            for _, ing_id, qty in ingredients:
+                flow[ing_id] = flow.get(ing_id, 0) - rate * qty / data.harvests
+            self.mutations.append(name)
+            self.rate.append(rate)
+            self.drops.append(rate * drop_value)
+            self.flows.append(list(flow.items()))
+
+        # Per product: value of selling a unit and of not having to buy one.
+        # A product nobody bids on sells for 0; one nobody offers cannot be
+        # bought at all.
+        self.products = sorted({i for flow in self.flows for i, _ in flow})
+        self.sell = {i: bid[i] if index.has_bid(i) else 0.0 for i in self.products}
+        self.buy = {i: max(ask[i], self.sell[i]) if index.has_ask(i) else None for i in self.products}
+        # Product id -> mutation producing it, for feeder bundles
+        self.producer = {index.refs[name][0]: m for m, name in enumerate(self.mutations)}
+
+    def value(self, i, net):
+        if net >= 0:
+            return self.sell[i] * net
+        if self.buy[i] is None:
+            # Within float noise of zero counts as covered
+            return 0.0 if net > -1e-9 else INFEASIBLE
+        return self.buy[i] * net
+
+    def nets(self, counts):
+        net = dict.fromkeys(self.products, 0.0)
+        for m, n in enumerate(counts):
+            if n:
+                for i, units in self.flows[m]:
+                    net[i] += n * units
+        return net
+
+    def profit(self, counts):
+        # Profit per hour of a plan (plots per mutation), -inf if infeasible
+        net = self.nets(counts)
+        total = sum(n * self.drops[m] for m, n in enumerate(counts))
+        for i, v in net.items():
+            total += self.value(i, v)
+        return total
+
+    def delta(self, net, changes):
+        # Profit change of adding changes = {mutation: plots} (may be
+        # negative) to a plan whose product nets are net
+        moved = {}
+        gain = 0.0
+        for m, n in changes.items():
+            gain += n * self.drops[m]
+            for i, units in self.flows[m]:
+                moved[i] = moved.get(i, 0.0) + n * units
+        for i, d in moved.items():
+            after = self.value(i, net[i] + d)
+            if after == INFEASIBLE:
+                return INFEASIBLE
+            gain += after - self.value(i, net[i])
+        return gain
+
+    def bundle(self, net, m, n=1, depth=0):
+        # n plots of m plus enough plots of in-house feeders to cover any
+        # ingredient that cannot be bought. None if that is impossible.
+        changes = {m: n}
+        for i, units in self.flows[m]:
+            short = -(net[i] + n * units)
+            if units >= 0 or self.buy[i] is not None or short <= 1e-9:
+                continue
+            feeder = self.producer.get(i)
+            if feeder is None or depth > len(self.mutations):
+                return None
+            sub = self.bundle(net, feeder, math.ceil(short / self.rate[feeder] - 1e-9), depth + 1)
+            if sub is None:
+                return None
+            for k, v in sub.items():
+                changes[k] = changes.get(k, 0) + v
+        return changes
+
+    def solve_greedy(self, plots):
+        counts = [0] * len(self.mutations)
+        net = self.nets(counts)
+        used = 0
+
+        def apply(changes):
+            nonlocal used
+            for k, n in changes.items():
+                counts[k] += n
+                used += n
+                for i, units in self.flows[k]:
+                    net[i] += n * units
+
+        # Greedy by gain per plot. Bundles of several plots of one mutation
+        # are tried too, so a feeder plot shared by many consumers is not
+        # charged to the first one alone.
+        while used < plots:
+            best = None
+            for m in range(len(self.mutations)):
+                for n in range(1, plots - used + 1):
+                    changes = self.bundle(net, m, n)
+                    if changes is None:
+                        break
+                    size = sum(changes.values())
+                    if used + size > plots:
+                        break
+                    gain = self.delta(net, changes)
+                    if gain > 1e-9 and (best is None or gain / size > best[0]):
+                        best = (gain / size, changes)
+            if best is None:
+                break
+            apply(best[1])
+
+        # Local search: best single add, remove or swap until none helps
+        moves = [{m: 1} for m in range(len(self.mutations))]
+        while True:
+            best = None
+            for m in range(len(self.mutations)):
+                if counts[m]:
+                    candidates = [{m: -1}] + [{m: -1, k: 1} for k in range(len(self.mutations)) if k != m]
+                else:
+                    candidates = []
+                if used < plots:
+                    candidates.append(moves[m])
+                for changes in candidates:
+                    gain = self.delta(net, changes)
+                    if gain > 1e-6 and (best is None or gain > best[0]):
+                        best = (gain, changes)
+            if best is None:
+                break
+            apply(best[1])
+        return counts
+
+    def solve_milp(self, plots):
+        # Variables: plots per mutation (integer), then sold and bought
+        # units per product. Each product's production - use - sold +
+        # bought = 0, and plots add up to at most the farm size.
+        import numpy as np
+        from scipy.optimize import milp, LinearConstraint, Bounds
+
+        n_m = len(self.mutations)
+        n_p = len(self.products)
+        col = {i: k for k, i in enumerate(self.products)}
+        c = np.zeros(n_m + 2 * n_p)
+        c[:n_m] = -np.array(self.drops)
+        upper = np.full(n_m + 2 * n_p, np.inf)
+        upper[:n_m] = plots
+        for k, i in enumerate(self.products):
+            c[n_m + k] = -self.sell[i]
+            if self.buy[i] is None:
+                upper[n_m + n_p + k] = 0
+            else:
+                c[n_m + n_p + k] = self.buy[i]
+
+        A = np.zeros((n_p + 1, n_m + 2 * n_p))
+        for m, flow in enumerate(self.flows):
+            for i, units in flow:
+                A[col[i], m] += units
+        for k in range(n_p):
+            A[k, n_m + k] = -1
+            A[k, n_m + n_p + k] = 1
+        A[n_p, :n_m] = 1
+        lower = np.zeros(n_p + 1)
+        upper_rows = np.zeros(n_p + 1)
+        lower[n_p] = 0
+        upper_rows[n_p] = plots
+
+        integrality = np.zeros(n_m + 2 * n_p)
+        integrality[:n_m] = 1
+        result = milp(c, integrality=integrality, bounds=Bounds(np.zeros(n_m + 2 * n_p), upper),
+                      constraints=LinearConstraint(A, lower, upper_rows))
+        if result.x is None:
+            raise RuntimeError(f"MILP solver failed: {result.message}")
+        return [int(round(v)) for v in result.x[:n_m]]
+
+    def plan(self, plots, method="auto"):
+        # (counts, method used)
+        if method in ("auto", "milp"):
+            try:
+                return self.solve_milp(plots), "milp"
+            except ImportError:
+                if method == "milp":
+                    raise
+        return self.solve_greedy(plots), "greedy"
+
+def print_plan(model, counts, plots, method, elapsed):
+    sys.stdout.reconfigure(encoding='utf-8')
+    index = model.index
+    names = index.names
+    net = model.nets(counts)
+    total = model.profit(counts)
+    print(f"Farm plan for {plots} plots ({sum(counts)} used), solved with {method} in {elapsed * 1000:.1f} ms\n")
+    print(f"{'MUTATION':<20} | {'PLOTS':<5} | {'CROPS/H':<9} | {'SOLO P/H':<12} | {'SOLD/H':<9} | {'IN-HOUSE/H':<10}")
+    print("-" * 80)
+    solo_profits = []
+    for m, name in enumerate(model.mutations):
+        solo = [0] * len(counts)
+        solo[m] = 1
+        solo_profit = model.profit(solo)
+        solo_profits.append((solo_profit, name))
+        if not counts[m]:
+            continue
+        item_id = index.refs[name][0]
+        produced = counts[m] * model.rate[m]
+        sold = max(net[item_id], 0.0)
+        solo_text = f"{solo_profit:.1f}" if solo_profit != INFEASIBLE else "-"
+        print(f"{name:<20} | {counts[m]:<5} | {produced:<9.2f} | {solo_text:<12} | {sold:<9.2f} | {produced - sold:<10.2f}")
+
+    bought = [(names[i], -v) for i, v in net.items() if v < -1e-9]
+    if bought:
+        print("\nBought per hour:")
+        for name, units in sorted(bought):
+            print(f" - {name}: {units:,.2f}")
+
+    print(f"\nTotal profit/hour: {total:,.1f}")
+    best_solo = max(solo_profits, default=(0, None))
+    if best_solo[1] is not None and best_solo[0] > 0:
+        print(f"Every plot on {best_solo[1]}: {best_solo[0] * plots:,.1f}")
+    if model.excluded:
+        print("\nNot planned:")
+        for name, reason in model.excluded.items():
+            print(f" - {name}: {reason}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Allocate N plots across mutations to maximize farm profit per hour.")
+    parser.add_argument("plots", nargs="?", type=int, default=DEFAULT_PLOTS,
+                        help="number of plots (default: %(default)s)")
+    parser.add_argument("--method", choices=["auto", "milp", "greedy"], default="auto",
+                        help="optimizer: milp needs scipy, auto falls back to greedy (default: %(default)s)")
+    parser.add_argument("--exact", action="store_true", help="use exact layouts")
+    parser.add_argument("--time-budget", type=float, default=EXACT_TIME_BUDGET,
+                        help="seconds per recipe for --exact (default: %(default)s)")
+    add_bazaar_args(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        recipes = load_recipes()
+    except FileNotFoundError:
+        print("items.json not found.")
+        return
+
+    layout_cache = LayoutCache(exact=args.exact, time_budget=args.time_budget)
+    layouts = layout_cache.get_layouts([name for name, data in recipes.items() if data.get("made_of")], recipes)
+    layout_cache.save()
+
+    products = get_bazaar_data(client_from_args(args), whitelist=reachable_products(recipes))
+    if not products:
+        return
+    index = PriceIndex.from_products(recipes, products)
+    del products
+
+    model = FarmModel(recipes, index, layouts)
+    started = time.perf_counter()
+    try:
+        counts, method = model.plan(args.plots, args.method)
+    except (ImportError, RuntimeError) as e:
+        print(f"Error planning farm: {e}")
+        return
+    print_plan(model, counts, args.plots, method, time.perf_counter() - started)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
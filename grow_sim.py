@@ -0,0 +1,335 @@
+
+import sys
+import heapq
+import time
+import argparse
+from bisect import bisect_right
+from layout_cache import LayoutCache
+from layout_atlas import crop_anchors
+from bazaar import get_bazaar_data, add_bazaar_args, client_from_args
+from bitgrid import ring_cells
+from positions import EXACT_TIME_BUDGET, get_symbols
+from pricing import PriceIndex, reachable_products, item_revenue
+from recipe_model import as_model, load_recipes
+
+# Discrete-event grow-cycle simulator, in place of the 48 / stages
+# amortization of main.compute_profits.
+#
+# A plot is its solve_layout grid. Every crop footprint is one spot and
+# every ingredient block is one placement, possibly shared by several spots.
+# Rules, in game hours:
+#   - placements live INGREDIENT_LIFETIME hours and are replanted (and
+#     paid for) the moment they expire or are destroyed,
+#   - a spot's crop only grows while all of its placements are alive, so a
+#     replanted placement restarts every spot around it: the mutation
+#     appears again spawn_delay hours later and needs stages * 2 hours,
+#   - a regrowing crop starts over right after each harvest,
+#   - a destructive crop uses up its placements when harvested,
+#   - an exploding crop also destroys the crops around it.
+#
+# Events are (time, kind, spots or placements) groups on a heap. Everything
+# due at the same time is popped and handled as one batch, and the spots
+# and placements it restarts are pushed back as one group, so lockstep
+# spots (most of a plot) cost one event per cycle rather than one per cell.
+# Stale entries (a crop reset, a placement replanted) are skipped by epoch.
+#
+# One run records the cumulative crops and plantings after every batch.
+# A plot planted o hours later is the same run cut at horizon - o, so a farm
+# of staggered plots costs one run plus a bisect per plot.
+
+INGREDIENT_LIFETIME = 48
+DEFAULT_HORIZON = 14 * 24
+DEFAULT_PLOTS = 1
+HARVEST, EXPIRE = 0, 1
+
+class PlotModel:
+    def __init__(self, recipe, grid, recipes):
+        rows, cols = len(grid), len(grid[0]) if grid else 0
+        size = recipe.size
+        mapping, _ = get_symbols(recipe.made_of)
+        self.spots = crop_anchors(grid, size)
+        self.ingredients = list(recipe.made_of)
+        owner = {}
+        self.placements = []  # ingredient index per placement
+        for k, ing in enumerate(self.ingredients):
+            ing_size = recipes[ing].size if ing in recipes else 1
+            for r, c in crop_anchors(grid, ing_size, mapping[ing]):
+                for dr in range(ing_size):
+                    for dc in range(ing_size):
+                        owner[(r + dr, c + dc)] = len(self.placements)
+                self.placements.append(k)
+        spot_at = {(r + dr, c + dc): s for s, (r, c) in enumerate(self.spots)
+                   for dr in range(size) for dc in range(size)}
+
+        self.deps = []        # per spot: placements around it
+        self.neighbours = []  # per spot: crops around it
+        self.users = [[] for _ in self.placements]
+        for s, (r, c) in enumerate(self.spots):
+            ring = ring_cells(r, c, size, rows, cols)
+            deps = tuple(sorted({owner[cell] for cell in ring if cell in owner}))
+            self.deps.append(deps)
+            self.neighbours.append(tuple(sorted({spot_at[cell] for cell in ring if cell in spot_at} - {s})))
+            for p in deps:
+                self.users[p].append(s)
+
+class Timeline:
+    # Cumulative totals after each batch of one simulated plot
+    def __init__(self, n_ingredients):
+        self.times = []
+        self.crops = []
+        self.planted_before = []  # plantings before this batch's replant
+        self.planted = []         # and including it
+        self.events = 0
+        self.n_ingredients = n_ingredients
+
+    def at(self, hours):
+        # (crops, plantings per ingredient) of a plot run for `hours` hours;
+        # nothing is replanted at the very end
+        i = bisect_right(self.times, hours) - 1
+        if i < 0:
+            return 0, (0,) * self.n_ingredients
+        if self.times[i] == hours:
+            return self.crops[i], self.planted_before[i]
+        return self.crops[i], self.planted[i]
+
+def simulate(plot, recipe, horizon, spawn_delay=0.0, lifetime=INGREDIENT_LIFETIME):
+    # One plot planted at hour 0 and run until `horizon`
+    timeline = Timeline(len(plot.ingredients))
+    grow = recipe.hours
+    if grow <= 0 or not plot.spots or horizon <= 0:
+        return timeline
+    deps, neighbours, users, kinds = plot.deps, plot.neighbours, plot.users, plot.placements
+    crop_epoch = [0] * len(plot.spots)
+    place_epoch = [0] * len(plot.placements)
+    planted = [0] * len(plot.ingredients)
+    heap = []
+    seq = 0
+
+    def push(t, kind, ids, epoch):
+        nonlocal seq
+        ids = tuple(sorted(ids))
+        heapq.heappush(heap, (t, kind, seq, ids, tuple(epoch[i] for i in ids)))
+        seq += 1
+
+    for k in kinds:
+        planted[k] += 1
+    push(lifetime, EXPIRE, range(len(kinds)), place_epoch)
+    push(spawn_delay + grow, HARVEST, range(len(plot.spots)), crop_epoch)
+    timeline.times.append(0.0)
+    timeline.crops.append(0)
+    timeline.planted_before.append((0,) * len(planted))
+    timeline.planted.append(tuple(planted))
+
+    crops = 0
+    while heap and heap[0][0] <= horizon:
+        t = heap[0][0]
+        harvested = []
+        expired = []
+        while heap and heap[0][0] == t:
+            _, kind, _, ids, epochs = heapq.heappop(heap)
+            timeline.events += 1
+            if kind == HARVEST:
+                harvested.extend(s for s, e in zip(ids, epochs) if crop_epoch[s] == e)
+            else:
+                expired.extend(p for p, e in zip(ids, epochs) if place_epoch[p] == e)
+        crops += len(harvested)
+
+        replant = set(expired)
+        reset = set()
+        regrow = ()
+        if recipe.explodes_on_harvest:
+            for s in harvested:
+                replant.update(deps[s])
+                reset.update(neighbours[s])
+            reset.update(harvested)
+        elif recipe.destructive:
+            for s in harvested:
+                replant.update(deps[s])
+            reset.update(harvested)
+        else:
+            regrow = harvested
+        for p in replant:
+            reset.update(users[p])
+
+        before = tuple(planted)
+        if t < horizon:
+            if replant:
+                for p in replant:
+                    place_epoch[p] += 1
+                    planted[kinds[p]] += 1
+                push(t + lifetime, EXPIRE, replant, place_epoch)
+            if reset:
+                for s in reset:
+                    crop_epoch[s] += 1
+                push(t + spawn_delay + grow, HARVEST, reset, crop_epoch)
+            regrow = [s for s in regrow if s not in reset]
+            if regrow:
+                push(t + grow, HARVEST, regrow, crop_epoch)
+        timeline.times.append(t)
+        timeline.crops.append(crops)
+        timeline.planted_before.append(before)
+        timeline.planted.append(tuple(planted))
+    return timeline
+
+def simulate_farm(plot, recipe, plots=DEFAULT_PLOTS, horizon=DEFAULT_HORIZON, stagger=0.0,
+                  spawn_delay=0.0, lifetime=INGREDIENT_LIFETIME):
+    # Totals for `plots` copies of a plot, the k-th planted k * stagger
+    # hours in: {"crops", "planted" (per ingredient name), "plot_hours", "events"}
+    timeline = simulate(plot, recipe, horizon, spawn_delay, lifetime)
+    crops = 0
+    planted = [0] * len(plot.ingredients)
+    plot_hours = 0.0
+    for k in range(plots):
+        hours = horizon - k * stagger
+        if hours <= 0:
+            break
+        c, p = timeline.at(hours)
+        crops += c
+        for i, n in enumerate(p):
+            planted[i] += n
+        plot_hours += hours
+    return {
+        "crops": crops,
+        "planted": dict(zip(plot.ingredients, planted)),
+        "plot_hours": plot_hours,
+        "events": timeline.events,
+        "batches": len(timeline.times) - 1,
+    }
+
+def simulated_profits(recipes, index, layouts, horizon=DEFAULT_HORIZON, spawn_delay=0.0,
+                      lifetime=INGREDIENT_LIFETIME, plots=DEFAULT_PLOTS, stagger=0.0):
+    # compute_profits with simulated throughput and ingredient use instead
+    # of the 48 / stages amortization. Same (profits, skipped, warnings)
+    # shape; spots is the number of crops on the plot and total_profit one
+    # grow cycle's worth of profit/hour.
+    recipes = as_model(recipes)
+    profits = []
+    skipped_items = []
+    warnings = []
+    ask = index.ask
+    for recipe in recipes.records:
+        name = recipe.name
+        if not recipe.made_of:
+            skipped_items.append(f"{name}: No recipe defined")
+            continue
+        revenue, reason = item_revenue(index, name, warnings)
+        if reason:
+            skipped_items.append(f"{name}: {reason}")
+            continue
+        layout = layouts[name]
+        if isinstance(layout, Exception):
+            skipped_items.append(f"{name}: Error solving layout: {layout}")
+            continue
+        _, ingredients, _ = index.refs[name]
+        cost_per_unit = {}
+        for ing_name, ing_id, _ in ingredients:
+            if not index.has(ing_id):
+                reason = f"Ingredient '{ing_name}' not found"
+                break
+            if not index.has_ask(ing_id):
+                reason = f"Ingredient '{ing_name}' has no sell offers"
+                break
+            cost_per_unit[ing_name] = ask[ing_id]
+        if reason:
+            skipped_items.append(f"{name}: {reason}")
+            continue
+
+        plot = PlotModel(recipe, layout[0], recipes)
+        sim = simulate_farm(plot, recipe, plots, horizon, stagger, spawn_delay, lifetime)
+        # Free ingredients (FIRE, ...) are not in the refs and cost nothing
+        cost = sum(cost_per_unit.get(ing, 0.0) * units for ing, units in sim["planted"].items())
+        crops = sim["crops"]
+        profit_per_hour = (crops * revenue - cost) / sim["plot_hours"] if sim["plot_hours"] else 0
+        profits.append({
+            "item": name,
+            "spots": len(plot.spots),
+            "unit_profit": revenue - cost / crops if crops else -cost,
+            "total_profit": profit_per_hour * recipe.hours,
+            "hours": recipe.hours,
+            "profit_per_hour": profit_per_hour,
+            "crops_per_hour": crops / sim["plot_hours"] if sim["plot_hours"] else 0,
+            "ingredients_per_hour": sum(sim["planted"].values()) / sim["plot_hours"] if sim["plot_hours"] else 0,
+            "events": sim["events"],
+        })
+    profits.sort(key=lambda x: x['profit_per_hour'], reverse=True)
+    return profits, skipped_items, warnings
+
+def approximation(recipe, spots):
+    # (crops/hour, ingredient units/hour) per plot under the 48 / stages model
+    if recipe.hours <= 0:
+        return 0.0, 0.0
+    crops = spots / recipe.hours
+    return crops, crops * sum(recipe.made_of.values()) / recipe.harvests
+
+def print_report(profits, approx, skipped_items, plots, horizon, elapsed):
+    sys.stdout.reconfigure(encoding='utf-8')
+    events = sum(p["events"] for p in profits)
+    print(f"Simulated {len(profits)} mutations over {horizon:g} hours ({events:,} events) in {elapsed * 1000:.1f} ms"
+          f"{f', {plots} plots each' if plots > 1 else ''}.\n")
+    print(f"{'ITEM':<20} | {'CROPS':<5} | {'CROPS/H':<7} | {'48/ST':<7} | {'ING/H':<7} | {'48/ST':<7} | "
+          f"{'PROFIT/HOUR':<12} | {'48/ST P/H':<12}")
+    print("-" * 100)
+    for p in profits:
+        crops_h, ing_h, approx_pph = approx.get(p["item"], (0.0, 0.0, None))
+        approx_text = f"{approx_pph:.1f}" if approx_pph is not None else "-"
+        print(f"{p['item']:<20} | {p['spots']:<5} | {p['crops_per_hour']:<7.2f} | {crops_h:<7.2f} | "
+              f"{p['ingredients_per_hour']:<7.2f} | {ing_h:<7.2f} | {p['profit_per_hour']:<12.1f} | {approx_text:<12}")
+    if skipped_items:
+        print("\nSkipped Items:")
+        for skip in skipped_items:
+            print(f" - {skip}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate grow cycles plot by plot and compare with the 48/stages model.")
+    parser.add_argument("--horizon", type=float, default=DEFAULT_HORIZON,
+                        help="game hours to simulate (default: %(default)s)")
+    parser.add_argument("--plots", type=int, default=DEFAULT_PLOTS,
+                        help="plots per mutation (default: %(default)s)")
+    parser.add_argument("--stagger", type=float, default=0.0, metavar="HOURS",
+                        help="plant each further plot HOURS after the previous one (default: %(default)s)")
+    parser.add_argument("--spawn-delay", type=float, default=0.0, metavar="HOURS",
+                        help="hours before a mutation appears next to fresh ingredients (default: %(default)s)")
+    parser.add_argument("--lifetime", type=float, default=INGREDIENT_LIFETIME,
+                        help="ingredient lifetime in hours (default: %(default)s)")
+    parser.add_argument("--exact", action="store_true", help="use exact layouts")
+    parser.add_argument("--time-budget", type=float, default=EXACT_TIME_BUDGET,
+                        help="seconds per recipe for --exact (default: %(default)s)")
+    add_bazaar_args(parser)
+    args = parser.parse_args(argv)
+    if args.horizon <= 0 or args.plots < 1 or args.lifetime <= 0 or args.stagger < 0 or args.spawn_delay < 0:
+        parser.error("--horizon, --plots and --lifetime must be positive, --stagger and --spawn-delay not negative")
+
+    try:
+        recipes = load_recipes()
+    except FileNotFoundError:
+        print("items.json not found.")
+        return
+
+    layout_cache = LayoutCache(exact=args.exact, time_budget=args.time_budget)
+    layouts = layout_cache.get_layouts([name for name, data in recipes.items() if data.get("made_of")], recipes)
+    layout_cache.save()
+
+    products = get_bazaar_data(client_from_args(args), whitelist=reachable_products(recipes))
+    if not products:
+        return
+    index = PriceIndex.from_products(recipes, products)
+    del products
+
+    from main import compute_profits
+    approx_profits, _, _ = compute_profits(recipes, index, layouts)
+    approx_pph = {p["item"]: p["profit_per_hour"] for p in approx_profits}
+    approx = {}
+    for name, layout in layouts.items():
+        if not isinstance(layout, Exception):
+            approx[name] = approximation(recipes[name], layout[1]) + (approx_pph.get(name),)
+
+    started = time.perf_counter()
+    profits, skipped_items, warnings = simulated_profits(recipes, index, layouts, args.horizon, args.spawn_delay,
+                                                         args.lifetime, args.plots, args.stagger)
+    elapsed = time.perf_counter() - started
+    for warning in warnings:
+        print(warning)
+    print_report(profits, approx, skipped_items, args.plots, args.horizon, elapsed)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,116 @@
+
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from contextlib import nullcontext
+
+# Opt-in timing and counters for the hot paths. Off by default: stage()
+# hands back one shared no-op context manager and count() returns at once,
+# and hot loops keep their counts in locals and report them once per call.
+#
+# Turn it on with main.py --profile / --trace FILE, or for any entry point
+# with the environment variables
+#   MUTATIONS_PROFILE=1        print a per-stage summary to stderr at exit
+#   MUTATIONS_TRACE=trace.json also write a Chrome trace-event file
+#                              (chrome://tracing, https://ui.perfetto.dev)
+# Stages inside --jobs worker processes are not collected; the parent only
+# sees the time spent waiting on the pool.
+
+enabled = False
+trace_path = None
+
+_NULL = nullcontext()
+_lock = threading.Lock()
+_events = []
+_counters = {}
+_origin = time.perf_counter()
+
+class Stage:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        with _lock:
+            _events.append((self.name, self.start, end - self.start, threading.get_ident(), self.args))
+        return False
+
+def stage(name, **args):
+    if not enabled:
+        return _NULL
+    return Stage(name, args)
+
+def count(name, n=1):
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def enable(trace=None):
+    global enabled, trace_path
+    if not enabled:
+        atexit.register(finish)
+    enabled = True
+    if trace:
+        trace_path = trace
+
+def summary():
+    # {stage: (calls, total_s, max_s)}, in order of first appearance
+    out = {}
+    for name, _, duration, _, _ in _events:
+        calls, total, longest = out.get(name, (0, 0.0, 0.0))
+        out[name] = (calls + 1, total + duration, max(longest, duration))
+    return out
+
+def report(f=None):
+    f = f or sys.stderr
+    stats = summary()
+    if not stats and not _counters:
+        return
+    print(f"\n{'STAGE':<32} | {'CALLS':<6} | {'TOTAL MS':<10} | {'MEAN MS':<10} | {'MAX MS':<10}", file=f)
+    print("-" * 80, file=f)
+    for name, (calls, total, longest) in stats.items():
+        print(f"{name:<32} | {calls:<6} | {total * 1000:<10.2f} | {total / calls * 1000:<10.3f} | {longest * 1000:<10.2f}", file=f)
+    if _counters:
+        print(f"\n{'COUNTER':<32} | VALUE", file=f)
+        print("-" * 80, file=f)
+        for name in sorted(_counters):
+            print(f"{name:<32} | {_counters[name]:,}", file=f)
+
+def write_trace(path):
+    pid = os.getpid()
+    events = [{"name": name, "ph": "X", "ts": (start - _origin) * 1e6, "dur": duration * 1e6,
+               "pid": pid, "tid": tid, "args": args}
+              for name, start, duration, tid, args in _events]
+    end = (time.perf_counter() - _origin) * 1e6
+    events.extend({"name": name, "ph": "C", "ts": end, "pid": pid, "args": {"value": value}}
+                  for name, value in _counters.items())
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+def finish():
+    # Runs once at exit when enabled
+    if not enabled:
+        return
+    report()
+    if trace_path:
+        try:
+            write_trace(trace_path)
+            print(f"Wrote trace to {trace_path}", file=sys.stderr)
+        except OSError as e:
+            print(f"Error writing trace {trace_path}: {e}", file=sys.stderr)
+    _events.clear()
+    _counters.clear()
+
+if os.environ.get("MUTATIONS_PROFILE") or os.environ.get("MUTATIONS_TRACE"):
+    enable(trace=os.environ.get("MUTATIONS_TRACE"))
@@ -0,0 +1,197 @@
+
+import os
+import sys
+import json
+import mmap
+import struct
+import argparse
+import instrument
+from layout_cache import recipe_hash, run_solver, solve_in_pool
+from positions import SOLVER_VERSION, EXACT_TIME_BUDGET
+from recipe_model import load_recipes
+
+# Prebuilt layouts for every recipe in items.json, shipped next to it so a
+# fresh checkout does not have to run the solver (the PLANTBOY_ADVANCE search
+# in particular) before its first report. Rebuild with
+#   python layout_atlas.py
+# whenever items.json or the solver changes. Entries carry the recipe hash
+# (which includes SOLVER_VERSION), so stale ones are ignored and solved at
+# runtime instead.
+#
+# Binary layout, little-endian:
+#   header     magic, format version, solver version, entry count
+#   directory  one fixed-size record per (recipe, mode)
+#   data       per entry: grid as rows*cols ASCII bytes, crop anchors as
+#              (row, col) byte pairs, then the legend as UTF-8 JSON
+# The file is memory-mapped on first use and an entry is only decoded when
+# it is looked up.
+
+ATLAS_FILE = 'layouts.atlas'
+MAGIC = b'MUTATLAS'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sHHI')
+# name, sha256, exact, proven, spots, rows, cols, anchors, budget, offset, length
+RECORD = struct.Struct('<32s32sBBHBBHfII')
+
+def crop_anchors(grid, size, symbol='.'):
+    # Top-left cell of each crop footprint, claiming size x size blocks of
+    # symbol ('.' = the crop) in row-major order
+    claimed = set()
+    anchors = []
+    for r, row in enumerate(grid):
+        for c, ch in enumerate(row):
+            if ch == symbol and (r, c) not in claimed:
+                anchors.append((r, c))
+                claimed.update((r + dr, c + dc) for dr in range(size) for dc in range(size))
+    return anchors
+
+def write_atlas(path, entries):
+    # entries: dicts with name, hash (hex), exact, proven, budget, grid, spots, legend, size
+    directory = []
+    data = []
+    offset = HEADER.size + RECORD.size * len(entries)
+    for e in entries:
+        name = e["name"].encode('utf-8')
+        if len(name) > 32:
+            raise ValueError(f"Recipe name too long for the atlas: {e['name']}")
+        grid = e["grid"]
+        rows, cols = len(grid), len(grid[0]) if grid else 0
+        anchors = crop_anchors(grid, e["size"])
+        blob = ("".join("".join(row) for row in grid).encode('ascii')
+                + bytes(v for anchor in anchors for v in anchor)
+                + json.dumps(e["legend"], separators=(',', ':')).encode('utf-8'))
+        directory.append(RECORD.pack(name, bytes.fromhex(e["hash"]), e["exact"], e["proven"], e["spots"],
+                                     rows, cols, len(anchors), e["budget"], offset, len(blob)))
+        data.append(blob)
+        offset += len(blob)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, SOLVER_VERSION, len(entries)))
+        f.writelines(directory)
+        f.writelines(data)
+    os.replace(tmp_path, path)
+
+class LayoutAtlas:
+    def __init__(self, path=ATLAS_FILE):
+        self.path = path
+        self.directory = None  # (name, exact) -> record, filled on first use
+        self.map = None
+
+    def open(self):
+        if self.directory is not None:
+            return
+        self.directory = {}
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            try:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file
+                return
+        try:
+            magic, version, _, count = HEADER.unpack_from(self.map, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError("not a layout atlas or an unsupported format")
+            for k in range(count):
+                record = RECORD.unpack_from(self.map, HEADER.size + k * RECORD.size)
+                name = record[0].rstrip(b'\0').decode('utf-8')
+                self.directory[(name, bool(record[2]))] = record
+        except (ValueError, struct.error, UnicodeDecodeError) as e:
+            print(f"Ignoring unreadable layout atlas {self.path}: {e}")
+            self.directory = {}
+
+    def entry(self, name, exact=False):
+        # Decoded entry (any hash), or None
+        self.open()
+        record = self.directory.get((name, exact))
+        if record is None:
+            return None
+        _, digest, _, proven, spots, rows, cols, n_anchors, budget, offset, length = record
+        blob = self.map[offset:offset + length]
+        cells = rows * cols
+        text = blob[:cells].decode('ascii')
+        anchors = blob[cells:cells + 2 * n_anchors]
+        return {
+            "hash": digest.hex(),
+            "grid": [list(text[r * cols:(r + 1) * cols]) for r in range(rows)],
+            "spots": spots,
+            "legend": json.loads(blob[cells + 2 * n_anchors:].decode('utf-8')),
+            "anchors": [(anchors[i], anchors[i + 1]) for i in range(0, len(anchors), 2)],
+            "proven": bool(proven),
+            "budget": budget,
+        }
+
+    def lookup(self, name, h, exact=False, time_budget=EXACT_TIME_BUDGET):
+        # (grid, spots, legend) if the atlas has an up-to-date entry, else
+        # None. Unproven exact entries built with less time are skipped,
+        # like in LayoutCache.
+        self.open()
+        record = self.directory.get((name, exact))
+        if record is None or record[1].hex() != h:
+            return None
+        if not record[3] and record[8] < time_budget:
+            return None
+        e = self.entry(name, exact)
+        instrument.count("layout.atlas.hits")
+        return e["grid"], e["spots"], e["legend"]
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.map = None
+        self.directory = None
+
+def build_atlas(recipes, path=ATLAS_FILE, exact=False, time_budget=EXACT_TIME_BUDGET, jobs=1):
+    # Solves every recipe (heuristic, plus exact if asked) and writes the atlas
+    names = [name for name, data in recipes.items() if data.get("made_of")]
+    entries = []
+    for mode in ([False, True] if exact else [False]):
+        if jobs > 1:
+            solved = solve_in_pool(names, recipes, jobs, None, mode, time_budget)
+        else:
+            solved = {}
+            for name in names:
+                try:
+                    solved[name] = run_solver(name, recipes[name], recipes, mode, time_budget)
+                except Exception as e:
+                    solved[name] = e
+        for name in names:
+            res = solved[name]
+            if isinstance(res, Exception):
+                print(f"Skipping {name}{' (exact)' if mode else ''}: {res}")
+                continue
+            grid, spots, legend, proven = res
+            entries.append({
+                "name": name, "hash": recipe_hash(name, recipes[name], recipes, mode), "exact": mode,
+                "proven": proven, "budget": time_budget if mode else 0.0, "grid": grid, "spots": spots,
+                "legend": legend, "size": recipes[name].get("size", 1),
+            })
+    write_atlas(path, entries)
+    return entries
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve every recipe once and write the layout atlas.")
+    parser.add_argument("--output", default=ATLAS_FILE, help="atlas path (default: %(default)s)")
+    parser.add_argument("--exact", action="store_true", help="also store exact-solver layouts")
+    parser.add_argument("--time-budget", type=float, default=EXACT_TIME_BUDGET,
+                        help="seconds per recipe for --exact (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, default=1, help="solve in N worker processes (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        recipes = load_recipes()
+    except FileNotFoundError:
+        print("items.json not found.")
+        return
+
+    entries = build_atlas(recipes, args.output, args.exact, args.time_budget, args.jobs)
+    unproven = sum(1 for e in entries if e["exact"] and not e["proven"])
+    print(f"Wrote {len(entries)} layouts to {args.output} ({os.path.getsize(args.output):,} bytes"
+          f"{f', {unproven} exact layouts unproven' if unproven else ''})")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
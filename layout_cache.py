@@ -0,0 +1,230 @@
+
+import json
+import os
+import time
+import hashlib
+import multiprocessing
+import queue
+import instrument
+from positions import solve_layout, solve_layout_exact, SOLVER_VERSION, EXACT_TIME_BUDGET, PLOT_ROWS, PLOT_COLS
+from recipe_model import ingredient_sizes
+
+LAYOUT_CACHE_FILE = '.layout_cache.json'
+EXACT_SUFFIX = ':exact'
+
+def recipe_hash(item_name, item_data, all_items, exact=False, plot=None):
+    # Layouts only depend on the recipe shape, never on prices, so the key is
+    # everything solve_layout reads: own flags/size plus ingredient sizes,
+    # and the plot when it is not the plain 10x10 one.
+    made_of = item_data.get("made_of", {})
+    key = {
+        "solver": SOLVER_VERSION,
+        "exact": exact,
+        "size": item_data.get("size", 1),
+        "made_of": made_of,
+        "destructive": item_data.get("destructive", False),
+        "explodes_on_harvest": item_data.get("explodes_on_harvest", False),
+        "ingredient_sizes": ingredient_sizes(item_data, all_items),
+    }
+    if plot:
+        rows, cols, blocked = plot
+        key["plot"] = [rows, cols, sorted(blocked)]
+    blob = json.dumps(key, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+def run_solver(item_name, item_data, all_items, exact=False, time_budget=EXACT_TIME_BUDGET, plot=None):
+    # plot is (rows, cols, blocked cells), None for the plain 10x10 plot
+    rows, cols, blocked = plot or (PLOT_ROWS, PLOT_COLS, None)
+    with instrument.stage("layout.solve_exact" if exact else "layout.solve", item=item_name):
+        if exact:
+            return solve_layout_exact(item_name, item_data, all_items, time_budget, rows, cols, blocked)
+        grid, spots, legend = solve_layout(item_name, item_data, all_items, rows, cols, blocked)
+        return grid, spots, legend, True
+
+# Worker-side state for the process pool. The parsed items.json is handed to
+# each worker once through the pool initializer, so tasks only carry a name.
+_worker_items = None
+_worker_opts = None
+_worker_started = None
+
+def _init_worker(all_items, exact, time_budget, started, plot=None):
+    global _worker_items, _worker_opts, _worker_started
+    _worker_items = all_items
+    _worker_opts = (exact, time_budget, plot)
+    _worker_started = started
+
+def _solve_in_worker(item_name):
+    _worker_started.put((item_name, time.monotonic()))
+    exact, time_budget, plot = _worker_opts
+    return run_solver(item_name, _worker_items[item_name], _worker_items, exact, time_budget, plot)
+
+class LayoutCache:
+    def __init__(self, path=LAYOUT_CACHE_FILE, rebuild=False, exact=False, time_budget=EXACT_TIME_BUDGET,
+                 atlas_path=None, plot=None):
+        from layout_atlas import LayoutAtlas, ATLAS_FILE
+        self.path = path
+        self.exact = exact
+        self.time_budget = time_budget
+        self.plot = plot
+        self.entries = {}
+        self.dirty = rebuild
+        self.hits = 0
+        self.misses = 0
+        # The shipped atlas answers for recipes this cache has not seen;
+        # a rebuild re-solves everything, so it skips the atlas too
+        self.atlas = None if rebuild else LayoutAtlas(atlas_path or ATLAS_FILE)
+        if not rebuild:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+        except (ValueError, OSError) as e:
+            print(f"Ignoring unreadable layout cache {self.path}: {e}")
+            self.entries = {}
+            self.dirty = True
+
+    def key(self, item_name):
+        # Exact and heuristic layouts live side by side so switching modes
+        # does not throw away the (expensive) exact results
+        return f"{item_name}{EXACT_SUFFIX}" if self.exact else item_name
+
+    def lookup(self, item_name, h):
+        entry = self.entries.get(self.key(item_name))
+        # An unproven exact layout is retried if we now have more time
+        if entry and entry.get("hash") == h and (entry.get("proven", True) or entry.get("budget", 0) >= self.time_budget):
+            return [list(row) for row in entry["grid"]], entry["spots"], entry["legend"]
+        if self.atlas is not None:
+            return self.atlas.lookup(item_name, h, self.exact, self.time_budget)
+        return None
+
+    def store(self, item_name, h, grid, spots, legend, proven=True):
+        entry = {
+            "hash": h,
+            "grid": ["".join(row) for row in grid],
+            "spots": spots,
+            "legend": legend,
+        }
+        if not proven:
+            entry["proven"] = False
+            entry["budget"] = self.time_budget
+        self.entries[self.key(item_name)] = entry
+        self.dirty = True
+
+    def get_layouts(self, item_names, all_items, jobs=1, timeout=None):
+        # Layouts for many recipes at once. Cache misses are spread over a
+        # process pool when jobs > 1. The result maps name -> (grid, spots,
+        # legend), or to the exception / TimeoutError that recipe hit, in the
+        # same order as item_names regardless of completion order. Only a
+        # changed (or never seen) recipe is re-solved.
+        results = {}
+        todo = {}
+        for name in item_names:
+            h = recipe_hash(name, all_items[name], all_items, self.exact, self.plot)
+            cached = self.lookup(name, h)
+            if cached is not None:
+                self.hits += 1
+                results[name] = cached
+            else:
+                self.misses += 1
+                todo[name] = h
+
+        instrument.count("layout.cache.hits", len(results))
+        instrument.count("layout.cache.misses", len(todo))
+        if jobs <= 1:
+            for name, h in todo.items():
+                try:
+                    grid, spots, legend, proven = run_solver(name, all_items[name], all_items, self.exact,
+                                                             self.time_budget, self.plot)
+                except Exception as e:
+                    results[name] = e
+                    continue
+                self.store(name, h, grid, spots, legend, proven)
+                results[name] = (grid, spots, legend)
+        else:
+            with instrument.stage("layout.pool", jobs=jobs, recipes=len(todo)):
+                solved = solve_in_pool(list(todo), all_items, jobs, timeout, self.exact, self.time_budget,
+                                       self.plot)
+            for name, res in solved.items():
+                if isinstance(res, TimeoutError) and self.exact:
+                    # Not cached, so the exact search is retried next run
+                    print(f"Exact layout for {name} timed out, using the heuristic layout")
+                    grid, spots, legend, _ = run_solver(name, all_items[name], all_items, plot=self.plot)
+                    results[name] = (grid, spots, legend)
+                    continue
+                if isinstance(res, Exception):
+                    results[name] = res
+                    continue
+                grid, spots, legend, proven = res
+                self.store(name, todo[name], grid, spots, legend, proven)
+                results[name] = (grid, spots, legend)
+
+        return {name: results[name] for name in item_names}
+
+    def prune(self, item_names):
+        # Drop entries for recipes that no longer exist in items.json
+        stale = [name for name in self.entries if name.removesuffix(EXACT_SUFFIX) not in item_names]
+        for name in stale:
+            del self.entries[name]
+        if stale:
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"Could not write layout cache {self.path}: {e}")
+
+def solve_in_pool(item_names, all_items, jobs, timeout, exact=False, time_budget=EXACT_TIME_BUDGET, plot=None):
+    # Per-recipe timeouts are measured from when a worker actually picks the
+    # task up. A timed-out search keeps its worker busy, so once every worker
+    # is stuck the pool is torn down and the rest goes to a fresh one.
+    results = {}
+    remaining = list(item_names)
+    while remaining:
+        started_q = multiprocessing.Queue()
+        pool = multiprocessing.Pool(jobs, initializer=_init_worker,
+                                    initargs=(all_items, exact, time_budget, started_q, plot))
+        pending = {name: pool.apply_async(_solve_in_worker, (name,)) for name in remaining}
+        started = {}
+        stuck = set()
+        while pending and len(stuck) < jobs:
+            try:
+                while True:
+                    name, t = started_q.get_nowait()
+                    started[name] = t
+            except queue.Empty:
+                pass
+
+            now = time.monotonic()
+            for name in list(pending):
+                res = pending[name]
+                if res.ready():
+                    try:
+                        results[name] = res.get()
+                    except Exception as e:
+                        results[name] = e
+                    del pending[name]
+                elif timeout and name in started and now - started[name] > timeout:
+                    results[name] = TimeoutError(f"no layout after {timeout:g}s")
+                    stuck.add(name)
+                    del pending[name]
+            if pending and len(stuck) < jobs:
+                time.sleep(0.005)
+
+        if stuck:
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+        remaining = [name for name in remaining if name not in results]
+    return results
@@ -1,159 +1,165 @@
 
-import requests
-import json
 import sys
-from positions import solve_layout
+import argparse
+import instrument
+from layout_cache import LayoutCache
+from bazaar import get_bazaar_data, add_bazaar_args, client_from_args
+from positions import EXACT_TIME_BUDGET, add_plot_args, plot_from_args
+from pricing import PriceIndex, DepthIndex, reachable_products, item_revenue
+from recipe_model import as_model, load_recipes
+from grow_sim import DEFAULT_HORIZON, simulated_profits
+from auctions import add_auction_args, fill_from_auctions
 
-# Constants
-HOURS_PER_STAGE = 2
-
-def get_bazaar_data():
-    url = "https://api.hypixel.net/v2/skyblock/bazaar"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        if not data.get("success"):
-            print("API request failed or returned success: false")
-            return {}
-        return data.get("products", {})
-    except Exception as e:
-        print(f"Error fetching bazaar data: {e}")
-        return {}
-
-def calculate_profits():
+def calculate_profits(rebuild_layouts=False, exact=False, time_budget=EXACT_TIME_BUDGET, jobs=1, layout_timeout=None, bazaar=None, vectorized=False, depth=False, grow_vs_buy=False, watch=None, json_lines=False, plot=None, simulate=None, auctions=None):
     # 1. Load recipes
     try:
-        with open('items.json', 'r', encoding='utf-8') as f:
-            recipes = json.load(f)
+        with instrument.stage("recipes.load"):
+            recipes = load_recipes()
     except FileNotFoundError:
         print("items.json not found.")
         return
 
-    # 2. Fetch bazaar prices
-    products = get_bazaar_data()
+    # Layouts only depend on items.json, so they are cached on disk
+    with instrument.stage("layouts"):
+        layout_cache = LayoutCache(rebuild=rebuild_layouts, exact=exact, time_budget=time_budget, plot=plot)
+        layout_cache.prune(recipes)
+        layouts = layout_cache.get_layouts([name for name, data in recipes.items() if data.get("made_of")],
+                                           recipes, jobs=jobs, timeout=layout_timeout)
+        layout_cache.save()
+
+    if watch:
+        # Keep everything above in memory and re-rank on each new snapshot
+        from watch import watch as watch_bazaar
+        watch_bazaar(recipes, layouts, bazaar, interval=watch, json_lines=json_lines)
+        return
+
+    # 2. Fetch bazaar prices, keeping only the products our recipes reach
+    with instrument.stage("bazaar"):
+        products = get_bazaar_data(bazaar, whitelist=reachable_products(recipes))
     if not products:
         return
+    with instrument.stage("pricing.index", products=len(products)):
+        index = PriceIndex.from_products(recipes, products)
+        depth_index = DepthIndex.from_products(index, products) if depth else None
+    del products
+    if auctions:
+        # Products the Bazaar does not list, priced at their lowest BIN
+        url, concurrency = auctions
+        filled = fill_from_auctions(index, url, concurrency)
+        if filled:
+            print(f"Priced at Auction House lowest BIN: {', '.join(filled)}\n")
 
+    with instrument.stage("profit.pass"):
+        profits, skipped_items, warnings = profit_pass(recipes, index, layouts, depth_index, vectorized, grow_vs_buy, simulate)
+    with instrument.stage("output"):
+        for warning in warnings:
+            print(warning)
+        print_profits(profits, skipped_items, len(recipes))
+
+def profit_pass(recipes, index, layouts, depth_index, vectorized, grow_vs_buy, simulate=None):
+    if simulate:
+        return simulated_profits(recipes, index, layouts, simulate)
+    if grow_vs_buy:
+        from recipe_tree import RecipeTree, print_tree
+        tree = RecipeTree(recipes, index).evaluate()
+        print_tree(tree)
+        return compute_profits(recipes, index, layouts, costs=tree.cost)
+    if depth_index is not None:
+        return compute_profits(recipes, index, layouts, depth_index)
+    if vectorized:
+        from profit_engine import ProfitEngine
+        return ProfitEngine(recipes, index, layouts).compute_profits()
+    return compute_profits(recipes, index, layouts)
+
+def compute_profits(recipes, index, layouts, depth=None, costs=None, names=None):
+    # One profit pass over every recipe for the prices currently in index.
+    # layouts maps item -> (grid, spots, legend) or the Exception its solve
+    # raised. Returns (profits sorted by profit/hour, skipped, warnings).
+    # With a DepthIndex, every price is the average fill for a whole plot's
+    # quantity (spots x made_of to buy, spots crops and drops to sell)
+    # instead of the top of the book. costs (per product id, NaN = cannot be
+    # had) replaces the insta-buy price of ingredients, e.g. RecipeTree.cost.
+    # names limits the pass to those recipes (in recipe order); they are
+    # looked up directly, so the cost follows len(names), not the recipes.
     profits = []
     skipped_items = []
+    warnings = []
+    ask = index.ask
 
-    for item_name, data in recipes.items():
-        made_of = data.get("made_of", {})
-        stages = data.get("stages", 0)
+    model = as_model(recipes)
+    records = model.records
+    if names is not None:
+        records = sorted((model[name] for name in set(names)), key=lambda data: data.id)
+    for data in records:
+        item_name = data.name
+        made_of = data.made_of
         
         # Calculate time in hours
         # If stages is 0, it means instant or not growable? 
         # Usually crops take time. Assuming stages != 0 for growable crops.
         # If stages is 0, we avoid division by zero.
-        hours_to_grow = stages * HOURS_PER_STAGE
+        hours_to_grow = data.hours
         
         if not made_of:
             skipped_items.append(f"{item_name}: No recipe defined")
             continue
 
-        # Get Sell Price of the crafted item (Revenue)
-        product_data = products.get(item_name)
-        if not product_data:
-            skipped_items.append(f"{item_name}: Not found in Bazaar")
-            continue
+        _, ingredients, _ = index.refs[item_name]
 
-        sell_summary = product_data.get("sell_summary", [])
-        if not sell_summary:
-            skipped_items.append(f"{item_name}: No buy orders (cannot instasell)")
+        # Revenue: insta-sell price plus drops (see pricing.item_revenue)
+        fill = plot_spots = None
+        if depth is not None:
+            layout = layouts[item_name]
+            plot_spots = 0 if isinstance(layout, Exception) else layout[1]
+            fill = depth_fill(depth, index, item_name, plot_spots, warnings)
+        revenue, reason = item_revenue(index, item_name, warnings, fill)
+        if reason:
+            skipped_items.append(f"{item_name}: {reason}")
             continue
-        
-        instasell_price = sell_summary[0]["pricePerUnit"]
-        
-        # Calculate Drops Revenue
-        drops_revenue = 0
-        drops_data = data.get("drop", {})
-        # Exceptions for Enchanted names
-        enchanted_exceptions = {
-            "INK_SACK:3": "ENCHANTED_COCOA",
-            "CACTUS": "ENCHANTED_CACTUS_GREEN",
-            "DOUBLE_PLANT": "ENCHANTED_SUNFLOWER",
-            "SUGAR_CANE": "ENCHANTED_SUGAR",
-            "POTATO_ITEM": "ENCHANTED_POTATO",
-            "CARROT_ITEM": "ENCHANTED_CARROT",
-        }
-
-        for drop_item, drop_qty in drops_data.items():
-            # Determine Enchanted Name
-            enchanted_name = enchanted_exceptions.get(drop_item, f"ENCHANTED_{drop_item}")
-
-            drop_unit_price = 0
-            price_found = False
-
-            # Try to get price from ENCHANTED form
-            if enchanted_name in products:
-                enchanted_summary = products[enchanted_name].get("sell_summary", [])
-                if enchanted_summary:
-                    # Found enchanted form, price is per 160 units
-                    drop_unit_price = enchanted_summary[0]["pricePerUnit"]
-                    price_found = True
-
-            # Fallback to base item if Enchanted not found
-            if not price_found:
-                drop_product = products.get(drop_item)
-                if not drop_product:
-                    print(f"Warning: Drop item {drop_item} for {item_name} not found in Bazaar")
-                    continue
-                
-                drop_sell_summary = drop_product.get("sell_summary", [])
-                if not drop_sell_summary:
-                    continue
-
-                drop_unit_price = drop_sell_summary[0]["pricePerUnit"]
-            # x38 based on testing, dk why so much
-            drops_revenue += drop_qty / 160 * 38 * drop_unit_price
-
-        revenue = instasell_price + drops_revenue
 
         # Calculate Cost of Ingredients (Insta-Buy)
         total_cost = 0
         possible = True
         
-        for ing_name, qty in made_of.items():
-            if ing_name == "FIRE":
-                # Fire is free/block
+        for ing_name, ing_id, qty in ingredients:
+            if costs is not None:
+                if costs[ing_id] != costs[ing_id]:
+                    skipped_items.append(f"{item_name}: Ingredient '{ing_name}' cannot be bought or grown")
+                    possible = False
+                    break
+                total_cost += costs[ing_id] * qty
                 continue
 
-            ing_data = products.get(ing_name)
-            if not ing_data:
+            if not index.has(ing_id):
                  skipped_items.append(f"{item_name}: Ingredient '{ing_name}' not found")
                  possible = False
                  break
             
-            buy_summary = ing_data.get("buy_summary", [])
-            if not buy_summary:
+            if not index.has_ask(ing_id):
                 skipped_items.append(f"{item_name}: Ingredient '{ing_name}' has no sell offers")
                 possible = False
                 break
             
-            unit_cost = buy_summary[0]["pricePerUnit"]
-            cost = unit_cost * qty
-            total_cost += cost
+            if depth is not None:
+                total_cost += depth_price(depth.buy_price, ing_id, plot_spots * qty, item_name, index, warnings) * qty
+            else:
+                total_cost += ask[ing_id] * qty
 
         if possible:
             # Adjust cost for non-destructive crops (Ingredients last 48h)
             # "the crops required for crop mutation are alive for 48 hours, so price should be 48/[stages]"
-            is_destructive = data.get("destructive", False)
-            explodes = data.get("explodes_on_harvest", False)
-            
-            if not is_destructive and not explodes and stages > 0:
-                harvests_per_set = 48 / stages
-                total_cost = total_cost / harvests_per_set
+            if data.regrows:
+                total_cost = total_cost / data.harvests
 
             profit = revenue - total_cost
             
-            # Use positions algorithm to get max spots
-            try:
-                # solve_layout requires (item_name, item_data, all_items)
-                _, spots, _ = solve_layout(item_name, data, recipes)
-            except Exception as e:
+            # Use positions algorithm to get max spots (solved up front)
+            layout = layouts[item_name]
+            if isinstance(layout, Exception):
                 spots = 0
-                print(f"Error solving layout for {item_name}: {e}")
+                warnings.append(f"Error solving layout for {item_name}: {layout}")
+            else:
+                _, spots, _ = layout
 
             plot_profit = profit * spots
             
@@ -181,10 +187,26 @@ def calculate_profits():
 
     # Sort by PROFIT PER HOUR descending
     profits.sort(key=lambda x: x['profit_per_hour'], reverse=True)
+    return profits, skipped_items, warnings
 
+def depth_price(fill, product_id, qty, item_name, index, warnings):
+    price, filled = fill(product_id, qty)
+    if not filled:
+        warnings.append(f"Warning: Order book for {index.names[product_id]} too thin for {qty:,.0f} units "
+                        f"({item_name}), rest priced at its last level")
+    return price
+
+def depth_fill(depth, index, item_name, plot_spots, warnings):
+    # Sell-side fill for item_revenue: units per spot are priced at the depth
+    # a whole plot's worth of them takes
+    def fill(product_id, units):
+        return depth_price(depth.sell_price, product_id, plot_spots * units, item_name, index, warnings)
+    return fill
+
+def print_profits(profits, skipped_items, recipe_count):
     sys.stdout.reconfigure(encoding='utf-8')
 
-    print(f"Processed {len(profits)} items out of {len(recipes)} recipes.\n")
+    print(f"Processed {len(profits)} items out of {recipe_count} recipes.\n")
     
     # Header
     print(f"{'ITEM':<20} | {'SPOTS':<5} | {'HOURS':<6} | {'PLOT_PROFIT':<15} | {'PROFIT/HOUR':<15}")
@@ -198,5 +220,66 @@ def calculate_profits():
         for skip in skipped_items:
             print(f" - {skip}")
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rank crop mutations by profit per hour.")
+    parser.add_argument("--rebuild-layouts", action="store_true",
+                        help="ignore the on-disk layout cache and re-solve every recipe")
+    parser.add_argument("--exact", action="store_true",
+                        help="use the exact maximum-placement solver for layouts")
+    parser.add_argument("--time-budget", type=float, default=EXACT_TIME_BUDGET,
+                        help="seconds per recipe for --exact (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="solve layouts in N worker processes (default: %(default)s)")
+    parser.add_argument("--layout-timeout", type=float, default=None,
+                        help="give up on a single recipe's layout after this many seconds (with --jobs)")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="compute profits with the NumPy engine (same output, needs numpy)")
+    parser.add_argument("--depth", action="store_true",
+                        help="price whole plots by walking the order book instead of the top order")
+    add_bazaar_args(parser)
+    add_plot_args(parser)
+    parser.add_argument("--grow-vs-buy", action="store_true",
+                        help="cost each ingredient at the cheaper of buying it and growing it from its own recipe")
+    parser.add_argument("--simulate", nargs="?", type=float, const=DEFAULT_HORIZON, default=None, metavar="HOURS",
+                        help="amortize ingredients by simulating HOURS of grow cycles (default: %(const)s) "
+                             "instead of 48 / stages harvests per set")
+    parser.add_argument("--auctions", action="store_true",
+                        help="price products the Bazaar does not list at their Auction House lowest BIN")
+    add_auction_args(parser)
+    parser.add_argument("--watch", nargs="?", type=float, const=60, default=None, metavar="SECONDS",
+                        help="keep running, poll the Bazaar every SECONDS (default: 60) and print rank changes")
+    parser.add_argument("--json", action="store_true",
+                        help="with --watch, emit rank changes as JSON lines")
+    parser.add_argument("--profile", action="store_true",
+                        help="print per-stage timings and search counters to stderr (or set MUTATIONS_PROFILE=1)")
+    parser.add_argument("--trace", default=None, metavar="FILE",
+                        help="also write a Chrome trace-event JSON file (or set MUTATIONS_TRACE)")
+    args = parser.parse_args(argv)
+    if args.depth and args.vectorized:
+        parser.error("--depth is not supported with --vectorized")
+    if args.watch is not None and (args.depth or args.vectorized or args.grow_vs_buy):
+        parser.error("--watch is not supported with --depth, --vectorized or --grow-vs-buy")
+    if args.grow_vs_buy and (args.depth or args.vectorized):
+        parser.error("--grow-vs-buy is not supported with --depth or --vectorized")
+    if args.simulate is not None and (args.depth or args.vectorized or args.grow_vs_buy or args.watch is not None):
+        parser.error("--simulate is not supported with --depth, --vectorized, --grow-vs-buy or --watch")
+    if args.auctions and (args.depth or args.watch is not None):
+        parser.error("--auctions is not supported with --depth or --watch")
+    if args.simulate is not None and args.simulate <= 0:
+        parser.error("--simulate needs a positive number of hours")
+    try:
+        args.plot = plot_from_args(args)
+    except (OSError, ValueError) as e:
+        parser.error(f"--rows/--cols/--mask: {e}")
+    return args
+
 if __name__ == "__main__":
-    calculate_profits()
+    args = parse_args()
+    if args.profile or args.trace:
+        instrument.enable(trace=args.trace)
+    calculate_profits(rebuild_layouts=args.rebuild_layouts, exact=args.exact, time_budget=args.time_budget,
+                      jobs=args.jobs, layout_timeout=args.layout_timeout, bazaar=client_from_args(args),
+                      vectorized=args.vectorized, depth=args.depth,
+                      grow_vs_buy=args.grow_vs_buy, watch=args.watch, json_lines=args.json, plot=args.plot,
+                      simulate=args.simulate,
+                      auctions=(args.auctions_url, args.auction_concurrency) if args.auctions else None)
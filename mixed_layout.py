@@ -0,0 +1,594 @@
+
+import sys
+import time
+import random
+import argparse
+import itertools
+import multiprocessing
+import instrument
+from bitgrid import BitGrid, block_mask, popcount, iter_bits
+from exact_layout import BLOCKED, get_anchor_tables
+from positions import (PLOT_ROWS, PLOT_COLS, RESET, get_color, print_grid, blocked_bits,
+                       add_plot_args, plot_from_args)
+from bazaar import get_bazaar_data, add_bazaar_args, client_from_args
+from pricing import PriceIndex, reachable_products, item_revenue
+from recipe_model import HOURS_PER_STAGE, load_recipes
+
+# Mixed-mutation plots: crops of several target mutations on one plot, where
+# an ingredient cell counts for every crop whose ring it touches, whichever
+# mutation that crop is. CHOCOBERRY and CREAMBLOOM can both feed on the same
+# CHOCONUT, COALROOT and CINDERSHADE on the same ASHWREATH.
+#
+# Model: as in exact_layout, a crop of size s takes an s x s block and needs
+# made_of[ing] cells of each ingredient among the cells touching it; an
+# ingredient of size k is a whole k x k block. Each target has a weight per
+# crop and each ingredient a cost per block, and a layout is worth the sum
+# of its crops' weights minus the cost of its blocks.
+#
+# Search: ruin and recreate. A greedy pass places crops in row-major order,
+# satisfying each new crop with the fewest new blocks (reusing any cells it
+# already touches, and preferring cells many other crops could share). Each
+# iteration then clears every crop anchored near a random cell, drops the
+# blocks nothing uses any more and refills the hole greedily in a random
+# order. The result is kept if it is worth at least as much as before, so
+# the search can drift across equal layouts. Seeded, so runs are repeatable.
+#
+# Only crops that regrow can share: a destructive or exploding crop takes
+# its ingredients with it, so such targets are rejected.
+
+DEFAULT_ITERATIONS = 1500
+DEFAULT_SEED = 1
+CROP_SYMBOLS = "abcdefghijklmnopqrstuvwxyz"
+INGREDIENT_SYMBOLS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+# Cells cleared on each side of the center of a ruined area
+RUIN_RADIUS = (1, 3)
+
+class MixedLayout:
+    def __init__(self, targets, all_items, weights=None, block_costs=None,
+                 rows=PLOT_ROWS, cols=PLOT_COLS, blocked=None):
+        # targets: mutation names; weights: name -> value per crop
+        # (default 1); block_costs: ingredient name -> cost per block
+        # (default 0); blocked: set of (row, col) cells
+        if not targets:
+            raise ValueError("No target mutations")
+        if len(targets) > len(CROP_SYMBOLS):
+            raise ValueError(f"At most {len(CROP_SYMBOLS)} target mutations")
+        weights = weights or {}
+        block_costs = block_costs or {}
+        self.rows = rows
+        self.cols = cols
+        self.n = rows * cols
+        self.blocked = blocked_bits(blocked or (), cols)
+        self.targets = list(targets)
+        self.weights = [float(weights.get(name, 1.0)) for name in self.targets]
+
+        ingredients = []
+        for name in self.targets:
+            data = all_items.get(name)
+            if not data or not data.get("made_of"):
+                raise ValueError(f"{name} has no recipe")
+            if data.get("destructive", False) or data.get("explodes_on_harvest", False):
+                raise ValueError(f"{name} does not regrow, so its ingredients cannot be shared")
+            ingredients.extend(data["made_of"])
+        self.ingredients = sorted(set(ingredients))
+        if len(self.ingredients) > len(INGREDIENT_SYMBOLS):
+            raise ValueError(f"At most {len(INGREDIENT_SYMBOLS)} distinct ingredients")
+        ing_index = {name: k for k, name in enumerate(self.ingredients)}
+        self.ing_syms = INGREDIENT_SYMBOLS[:len(self.ingredients)]
+        self.ing_sizes = [all_items[name].get("size", 1) if name in all_items else 1 for name in self.ingredients]
+        self.block_costs = [float(block_costs.get(name, 0.0)) for name in self.ingredients]
+        self.crop_syms = CROP_SYMBOLS[:len(self.targets)]
+        # Cells off the first / last column, for shifting masks sideways
+        self.not_left = self.not_right = 0
+        for r in range(rows):
+            self.not_left |= block_mask(r, 1, 1, cols - 1, rows, cols) if cols > 1 else 0
+            self.not_right |= block_mask(r, 0, 1, cols - 1, rows, cols) if cols > 1 else 0
+        self.order = None
+
+        # Per ingredient: its block at each anchor cell, and for each cell
+        # the anchors whose block covers it
+        self.blocks = []
+        self.covering = []
+        for size in self.ing_sizes:
+            masks = [block_mask(p // cols, p % cols, size, size, rows, cols) for p in range(self.n)]
+            masks = [m if not m & self.blocked else 0 for m in masks]
+            covering = [[] for _ in range(self.n)]
+            for p, m in enumerate(masks):
+                for cell in iter_bits(m):
+                    covering[cell].append(p)
+            self.blocks.append(masks)
+            self.covering.append(covering)
+
+        # Per target: requirements (most-needed ingredient first), usable
+        # anchors and their footprint and ring masks
+        self.reqs = []
+        self.needs = []
+        self.anchors = []
+        self.foot = []
+        self.ring = []
+        for name in self.targets:
+            data = all_items[name]
+            made_of = data["made_of"]
+            reqs = sorted(((ing_index[ing], qty) for ing, qty in made_of.items()), key=lambda x: -x[1])
+            total = sum(made_of.values())
+            anchor_mask, foot, ring = get_anchor_tables(data.get("size", 1), total, rows, cols)[:3]
+            anchors = [a for a in iter_bits(anchor_mask)
+                       if not foot[a] & self.blocked and popcount(ring[a] & ~self.blocked) >= total]
+            self.reqs.append(reqs)
+            self.needs.append({k for k, _ in reqs})
+            self.anchors.append(anchors)
+            self.foot.append(foot)
+            self.ring.append(ring)
+
+        # How many (target, anchor) rings that need ingredient k cover each
+        # cell: blocks on busy cells are more likely to be shared later
+        self.share = []
+        for k in range(len(self.ingredients)):
+            counts = [0] * self.n
+            for t, anchors in enumerate(self.anchors):
+                if k in self.needs[t]:
+                    for a in anchors:
+                        for cell in iter_bits(self.ring[t][a]):
+                            counts[cell] += 1
+            self.share.append([sum(counts[cell] for cell in iter_bits(m)) for m in self.blocks[k]])
+
+        self.reset()
+
+    def reset(self):
+        self.board = BitGrid(self.rows, self.cols)
+        if self.blocked:
+            self.board.place(BLOCKED, self.blocked)
+        self.crops = {}   # anchor -> target
+        self.placed = {}  # block anchor -> ingredient
+        self.value = 0.0
+
+    def snapshot(self):
+        return self.board.copy(), dict(self.crops), dict(self.placed), self.value
+
+    def restore(self, state):
+        board, crops, placed, value = state
+        self.board = board.copy()
+        self.crops = dict(crops)
+        self.placed = dict(placed)
+        self.value = value
+
+    def add(self, t, a, rng=None):
+        # Places a crop of target t at anchor a with whatever blocks it still
+        # lacks, and returns those blocks as (anchor, ingredient). Returns
+        # None (board unchanged) if its ring cannot be filled.
+        board = self.board
+        foot = self.foot[t][a]
+        if not board.fits(foot):
+            return None
+        ring = self.ring[t][a]
+        board.place(self.crop_syms[t], foot)
+        added = []
+        for k, qty in self.reqs[t]:
+            sym = self.ing_syms[k]
+            short = qty - popcount(ring & board.get(sym))
+            while short > 0:
+                p = self.pick_block(k, ring, short, rng)
+                if p is None:
+                    for q, j in added:
+                        board.remove(self.ing_syms[j], self.blocks[j][q])
+                    board.remove(self.crop_syms[t], foot)
+                    return None
+                mask = self.blocks[k][p]
+                board.place(sym, mask)
+                added.append((p, k))
+                short -= popcount(mask & ring)
+        self.crops[a] = t
+        self.value += self.weights[t]
+        for p, k in added:
+            self.placed[p] = k
+            self.value -= self.block_costs[k]
+        return added
+
+    def pick_block(self, k, ring, short, rng):
+        # Free block of ingredient k touching ring: most ring cells (up to
+        # what is missing), then most shareable, then at random
+        board = self.board
+        blocks = self.blocks[k]
+        share = self.share[k]
+        best = None
+        best_score = None
+        seen = set()
+        for cell in iter_bits(ring & ~board.occ):
+            for p in self.covering[k][cell]:
+                if p in seen:
+                    continue
+                seen.add(p)
+                mask = blocks[p]
+                if not board.fits(mask):
+                    continue
+                score = (min(popcount(mask & ring), short), share[p], rng.random() if rng else 0)
+                if best_score is None or score > best_score:
+                    best, best_score = p, score
+        return best
+
+    def remove(self, a, added=()):
+        # Takes the crop at anchor a off, plus the blocks in added
+        t = self.crops.pop(a)
+        self.board.remove(self.crop_syms[t], self.foot[t][a])
+        self.value -= self.weights[t]
+        for p, k in added:
+            self.take(p, k)
+
+    def drop_unused(self, area=None, strict=False):
+        # Removes blocks (those meeting area, if given) that touch no crop
+        # needing them; if strict, also those every such crop can spare
+        board = self.board
+        need = [0] * len(self.ingredients)
+        for a, t in self.crops.items():
+            ring = self.ring[t][a]
+            for k in self.needs[t]:
+                need[k] |= ring
+        for p, k in list(self.placed.items()):
+            mask = self.blocks[k][p]
+            if (area is None or mask & area) and not mask & need[k]:
+                self.take(p, k)
+        if not strict:
+            return
+
+        surplus = {}   # (crop anchor, ingredient) -> cells beyond the requirement
+        touching = {}  # cell -> anchors of the crops whose ring holds it
+        # Only crops whose ring can reach a block meeting area matter
+        reach = None if area is None else self.widen(area, max(self.ing_sizes) - 1)
+        for a, t in self.crops.items():
+            ring = self.ring[t][a]
+            if reach is not None and not ring & reach:
+                continue
+            for k, qty in self.reqs[t]:
+                surplus[a, k] = popcount(ring & board.get(self.ing_syms[k])) - qty
+            for cell in iter_bits(ring):
+                touching.setdefault(cell, []).append(a)
+        for p, k in list(self.placed.items()):
+            mask = self.blocks[k][p]
+            if area is not None and not mask & area:
+                continue
+            users = {}
+            for cell in iter_bits(mask):
+                for a in touching.get(cell, ()):
+                    if k in self.needs[self.crops[a]]:
+                        users[a] = users.get(a, 0) + 1
+            if all(n <= surplus[a, k] for a, n in users.items()):
+                self.take(p, k)
+                for a, n in users.items():
+                    surplus[a, k] -= n
+
+    def take(self, p, k):
+        self.board.remove(self.ing_syms[k], self.blocks[k][p])
+        del self.placed[p]
+        self.value += self.block_costs[k]
+
+    def fill(self, candidates, rng=None):
+        # Greedy pass over (target, anchor) candidates; a crop is only
+        # added if it is worth more than the blocks it brings
+        for t, a in candidates:
+            if self.weights[t] <= 0 or not self.board.fits(self.foot[t][a]):
+                continue
+            before = self.value
+            added = self.add(t, a, rng)
+            if added is not None and self.value <= before:
+                self.remove(a, added)
+
+    def candidates(self, area=None):
+        # (target, anchor) in row-major order, heavier targets first at
+        # each anchor
+        if self.order is None:
+            order = sorted((a, -self.weights[t], t) for t, anchors in enumerate(self.anchors) for a in anchors)
+            self.order = [(t, a) for a, _, t in order]
+        if area is None:
+            return list(self.order)
+        return [(t, a) for t, a in self.order if area >> a & 1]
+
+    def solve(self, iterations=DEFAULT_ITERATIONS, seed=DEFAULT_SEED, start=None):
+        # Returns the best value found; the board is left on that layout.
+        # start is a layout() to begin from (e.g. a single-mutation plot of
+        # one of the targets), so the result is never worth less.
+        rng = random.Random(seed)
+        priced = any(self.block_costs)
+        with instrument.stage("layout.mixed", targets=",".join(self.targets)):
+            self.reset()
+            self.fill(self.candidates(), rng)
+            self.drop_unused(strict=priced)
+            best = self.snapshot()
+            if start:
+                self.load(start)
+                self.fill(self.candidates(), rng)
+                self.drop_unused(strict=priced)
+                if self.value > best[3]:
+                    best = self.snapshot()
+                else:
+                    self.restore(best)
+            accepted = 0
+            for _ in range(iterations):
+                current = self.snapshot()
+                r = rng.randrange(self.rows)
+                c = rng.randrange(self.cols)
+                d = rng.randint(*RUIN_RADIUS)
+                area = self.box(r - d, c - d, r + d, c + d)
+                for a in [a for a in self.crops if area >> a & 1]:
+                    self.remove(a)
+                self.drop_unused(self.box(r - d - 2, c - d - 2, r + d + 2, c + d + 2))
+                region = self.box(r - d - 3, c - d - 3, r + d + 3, c + d + 3)
+                candidates = self.candidates(region)
+                if rng.random() < 0.5:
+                    rng.shuffle(candidates)
+                self.fill(candidates, rng)
+                if priced:
+                    self.drop_unused(self.box(r - d - 5, c - d - 5, r + d + 5, c + d + 5), strict=True)
+                if self.value >= current[3] - 1e-9:
+                    accepted += 1
+                    if self.value > best[3] + 1e-9:
+                        best = self.snapshot()
+                else:
+                    self.restore(current)
+            self.restore(best)
+            self.drop_unused(strict=True)
+            instrument.count("layout.mixed.iterations", iterations)
+            instrument.count("layout.mixed.accepted", accepted)
+        return self.value
+
+    def box(self, r0, c0, r1, c1):
+        # Mask of the cells in rows r0..r1, columns c0..c1 (clipped)
+        r0, c0 = max(r0, 0), max(c0, 0)
+        r1, c1 = min(r1, self.rows - 1), min(c1, self.cols - 1)
+        if r0 > r1 or c0 > c1:
+            return 0
+        return block_mask(r0, c0, r1 - r0 + 1, c1 - c0 + 1, self.rows, self.cols)
+
+    def widen(self, mask, d):
+        # mask grown by d cells in every direction (diagonals included)
+        full = (1 << self.n) - 1
+        for _ in range(d):
+            mask |= (mask << 1 & self.not_left) | (mask >> 1 & self.not_right)
+            mask |= (mask << self.cols | mask >> self.cols) & full
+        return mask
+
+    def layout(self):
+        # ([(target, crop anchor)], [(ingredient, block anchor)]), the form
+        # load() and solve(start=) take
+        return ([(self.targets[t], a) for a, t in sorted(self.crops.items())],
+                [(self.ingredients[k], p) for p, k in sorted(self.placed.items())])
+
+    def load(self, layout):
+        # Replaces the board with a layout() from a solver on the same plot
+        # whose targets and ingredients are among these
+        crops, blocks = layout
+        self.reset()
+        target_index = {name: t for t, name in enumerate(self.targets)}
+        ing_index = {name: k for k, name in enumerate(self.ingredients)}
+        for name, p in blocks:
+            k = ing_index[name]
+            self.board.place(self.ing_syms[k], self.blocks[k][p])
+            self.placed[p] = k
+            self.value -= self.block_costs[k]
+        for name, a in crops:
+            t = target_index[name]
+            self.board.place(self.crop_syms[t], self.foot[t][a])
+            self.crops[a] = t
+            self.value += self.weights[t]
+
+    def counts(self):
+        counts = {name: 0 for name in self.targets}
+        for t in self.crops.values():
+            counts[self.targets[t]] += 1
+        return counts
+
+    def block_counts(self):
+        counts = {name: 0 for name in self.ingredients}
+        for k in self.placed.values():
+            counts[self.ingredients[k]] += 1
+        return counts
+
+    def legend(self):
+        parts = [f"{get_color(sym)}{sym}{RESET} : {name}" for sym, name in zip(self.crop_syms, self.targets)]
+        parts.extend(f"{get_color(sym)}{sym}{RESET} : {name}" for sym, name in zip(self.ing_syms, self.ingredients))
+        return ", ".join(parts)
+
+def solve_mixed(targets, all_items, weights=None, block_costs=None, rows=PLOT_ROWS, cols=PLOT_COLS,
+                blocked=None, iterations=DEFAULT_ITERATIONS, seed=DEFAULT_SEED):
+    # (grid, crops per target, value, legend) for the best mixed layout found
+    layout = MixedLayout(targets, all_items, weights, block_costs, rows, cols, blocked)
+    value = layout.solve(iterations, seed)
+    return layout.board.to_chars(' '), layout.counts(), value, layout.legend()
+
+def price_weights(recipes, index, names):
+    # Per-hour values from Bazaar prices, in the units of main.py's
+    # PROFIT/HOUR: a crop earns its revenue (with drops) every stages * 2
+    # hours, and an ingredient block costs its insta-buy price per 48-hour
+    # lifetime spread over the same per-crop hours as main.compute_profits.
+    # Returns (weights, block costs, skipped {name: reason}).
+    weights = {}
+    block_costs = {}
+    skipped = {}
+    for name in names:
+        data = recipes[name]
+        stages = data.get("stages", 0)
+        if stages <= 0:
+            skipped[name] = "no grow time"
+            continue
+        revenue, reason = item_revenue(index, name)
+        if reason:
+            skipped[name] = reason
+            continue
+        _, ingredients, _ = index.refs[name]
+        missing = [ing for ing, ing_id, _ in ingredients if not index.has_ask(ing_id)]
+        if missing:
+            skipped[name] = f"ingredient '{missing[0]}' has no sell offers"
+            continue
+        weights[name] = revenue / (stages * HOURS_PER_STAGE)
+        for ing, ing_id, _ in ingredients:
+            block_costs[ing] = index.ask[ing_id] / (48 * HOURS_PER_STAGE)
+    return weights, block_costs, skipped
+
+def sharing_pairs(recipes, names):
+    # Pairs of regrowing mutations with at least one ingredient in common
+    regrow = [n for n in names if recipes[n].get("made_of") and not recipes[n].get("destructive", False)
+              and not recipes[n].get("explodes_on_harvest", False)]
+    pairs = []
+    for x, y in itertools.combinations(sorted(regrow), 2):
+        if set(recipes[x]["made_of"]) & set(recipes[y]["made_of"]):
+            pairs.append((x, y))
+    return pairs
+
+def _solve_job(job):
+    # Pool worker: (value, crops per target, layout) for one set of targets
+    targets, recipes, weights, block_costs, plot, iterations, seed, start = job
+    layout = MixedLayout(targets, recipes, weights, block_costs, *plot)
+    value = layout.solve(iterations, seed, start)
+    return value, layout.counts(), layout.layout()
+
+def compare_pairs(recipes, pairs, weights, block_costs, plot=(PLOT_ROWS, PLOT_COLS, None),
+                  iterations=DEFAULT_ITERATIONS, seed=DEFAULT_SEED, jobs=1):
+    # [(pair, mixed value, crops per target, best single value, its target)],
+    # biggest gain over the better single-mutation plot first. Each pair
+    # starts from that plot, so the gain is never negative. jobs > 1 solves
+    # in a process pool.
+    names = sorted({name for pair in pairs for name in pair})
+
+    def run(jobs_list):
+        if jobs <= 1 or len(jobs_list) < 2:
+            return [_solve_job(job) for job in jobs_list]
+        with multiprocessing.Pool(min(jobs, len(jobs_list))) as pool:
+            return pool.map(_solve_job, jobs_list)
+
+    with instrument.stage("layout.mixed.singles", targets=len(names)):
+        single = dict(zip(names, run([([name], recipes, weights, block_costs, plot, iterations, seed, None)
+                                      for name in names])))
+    with instrument.stage("layout.mixed.pairs", pairs=len(pairs)):
+        mixed = run([(list(pair), recipes, weights, block_costs, plot, iterations, seed,
+                      single[max(pair, key=lambda name: single[name][0])][2]) for pair in pairs])
+
+    # A pair that ended up growing one mutation only is a better plot of
+    # that mutation, so it raises the bar for every pair with it
+    best = {name: value for name, (value, _, _) in single.items()}
+    for pair, (value, counts, _) in zip(pairs, mixed):
+        grown = [name for name in pair if counts[name]]
+        if len(grown) == 1:
+            best[grown[0]] = max(best[grown[0]], value)
+    results = []
+    for pair, (value, counts, _) in zip(pairs, mixed):
+        alone = max(pair, key=lambda name: best[name])
+        results.append((pair, value, counts, best[alone], alone))
+    results.sort(key=lambda x: x[1] - x[3], reverse=True)
+    return results
+
+def print_pairs(results, unit):
+    print(f"{'MUTATIONS':<36} | {'MIXED':<12} | {'CROPS':<9} | {'BEST SINGLE':<32} | GAIN")
+    print("-" * 108)
+    for pair, value, counts, alone_value, alone in results:
+        crops = "+".join(str(counts[name]) for name in pair)
+        gain = value - alone_value
+        gain = gain if abs(gain) > 1e-6 else 0.0
+        print(f"{' + '.join(pair):<36} | {value:<12,.{unit}f} | {crops:<9} | "
+              f"{f'{alone_value:,.{unit}f} ({alone})':<32} | {gain:+,.{unit}f}")
+
+def parse_weights(pairs):
+    weights = {}
+    for pair in pairs:
+        name, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"expected NAME=WEIGHT, got {pair!r}")
+        weights[name.upper()] = float(value)
+    return weights
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lay out several mutations on one plot, sharing ingredient cells.")
+    parser.add_argument("items", nargs="*", help="target mutations (with --pairs: the mutations to pair up)")
+    parser.add_argument("--pairs", action="store_true",
+                        help="solve every pair of the mutations that share an ingredient and compare each "
+                             "with its better single-mutation plot")
+    parser.add_argument("--count", action="store_true",
+                        help="maximize the number of crops instead of profit per hour (no prices needed)")
+    parser.add_argument("--weight", action="append", default=[], metavar="NAME=WEIGHT",
+                        help="value of one crop of NAME, overriding its price (repeatable)")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS,
+                        help="local search iterations per layout (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="random seed (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes for --pairs (default: %(default)s)")
+    add_plot_args(parser)
+    add_bazaar_args(parser)
+    args = parser.parse_args(argv)
+    if args.iterations < 0:
+        parser.error("--iterations must not be negative")
+    if not args.pairs and not args.items:
+        parser.error("give the target mutations, or --pairs")
+
+    try:
+        plot = plot_from_args(args)
+        manual = parse_weights(args.weight)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return
+    rows, cols, blocked = plot or (PLOT_ROWS, PLOT_COLS, None)
+
+    try:
+        recipes = load_recipes()
+    except FileNotFoundError:
+        print("items.json not found.")
+        return
+    names = [name.upper() for name in args.items]
+    unknown = [name for name in names + list(manual) if name not in recipes]
+    if unknown:
+        print(f"Unknown mutation: {', '.join(unknown)}")
+        return
+    if args.pairs:
+        names = names or [name for name, data in recipes.items() if data.get("made_of")]
+        pairs = sharing_pairs(recipes, names)
+        names = sorted({name for pair in pairs for name in pair})
+        if not pairs:
+            print("No two of these mutations share an ingredient.")
+            return
+
+    skipped = {}
+    if args.count:
+        weights, block_costs = {}, {}
+    else:
+        products = get_bazaar_data(client_from_args(args), whitelist=reachable_products(recipes))
+        if not products:
+            return
+        index = PriceIndex.from_products(recipes, products)
+        del products
+        weights, block_costs, skipped = price_weights(recipes, index, names)
+        # A mutation without a price is left out of the plot
+        for name in skipped:
+            weights[name] = 0.0
+    weights.update(manual)
+    unit = 0 if args.count else 1
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    started = time.perf_counter()
+    if args.pairs:
+        # A pair with an unpriced mutation is no better than the other alone
+        pairs = [pair for pair in pairs if not set(pair) & set(skipped)]
+        results = compare_pairs(recipes, pairs, weights, block_costs, (rows, cols, blocked),
+                                args.iterations, args.seed, args.jobs)
+        print_pairs(results, unit)
+        print(f"\n{len(pairs)} pairs in {time.perf_counter() - started:.2f}s.")
+    else:
+        try:
+            layout = MixedLayout(names, recipes, weights, block_costs, rows, cols, blocked)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+        value = layout.solve(args.iterations, args.seed)
+        counts = layout.counts()
+        print_grid(layout.board.to_chars(' '), " + ".join(names), sum(counts.values()), layout.legend())
+        for name in names:
+            print(f"{name:<24} {counts[name]:>3} crops  ({weights.get(name, 1.0):,.{unit + 1}f} each)")
+        blocks = layout.block_counts()
+        if block_costs:
+            for name, n in blocks.items():
+                print(f"{name:<24} {n:>3} blocks ({block_costs.get(name, 0.0):,.{unit + 1}f} each)")
+        label = "Crops" if args.count else "Profit/hour"
+        print(f"\n{label}: {value:,.{unit}f}  (solved in {time.perf_counter() - started:.2f}s)")
+
+    if skipped:
+        print("\nLeft out (no price):")
+        for name, reason in skipped.items():
+            print(f" - {name}: {reason}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,6 +1,28 @@
 
 import sys
-import json
+import argparse
+import itertools
+import functools
+import collections
+import instrument
+from bitgrid import BitGrid, block_mask, cell_bit, ring_cells
+from exact_layout import ExactLayoutSolver, EXACT_TIME_BUDGET, BLOCKED, prune_unused
+from recipe_model import load_recipes
+
+# Bump whenever a change to solve_layout can change its output, so cached
+# layouts keyed on it are re-solved.
+SOLVER_VERSION = 3
+
+# Default plot, and the largest side solved in one piece; bigger plots are
+# split into tiles (see solve_tiled)
+PLOT_ROWS = 10
+PLOT_COLS = 10
+TILE = 10
+
+# Backtracking search for size-2 crops with a size-3 ingredient: most crops
+# it places, and how many finished states its transposition table keeps
+MAX_BACKTRACK_CROPS = 4
+TRANSPOSITION_SIZE = 1 << 16
 
 # ANSI Colors
 RESET = "\033[0m"
@@ -18,7 +40,7 @@ INGREDIENT_COLORS = [YELLOW, BLUE, MAGENTA, CYAN, WHITE, RED]
 
 def get_color(char):
     if char == '.': return GREEN
-    if char == '#': return DARK_GRAY
+    if char == '#' or char == BLOCKED: return DARK_GRAY
     if char == '?': return RED
     if char.isalnum():
         return INGREDIENT_COLORS[ord(char) % len(INGREDIENT_COLORS)]
@@ -27,17 +49,151 @@ def get_color(char):
 def create_grid(rows=10, cols=10, fill_char=' '):
     return [[fill_char for _ in range(cols)] for _ in range(rows)]
 
-def print_grid(grid, item_name, count, legend):
+def print_grid(grid, item_name, count, legend, proven=None):
     print(f"{BOLD}--- Layout for {item_name} ---{RESET}")
     print(f"Total Spots: {count}")
+    if proven is not None:
+        print(f"Optimal: {'proven' if proven else 'not proven (time budget reached)'}")
     print(f"Legend: {legend}")
-    print("   " + " ".join([str(i) for i in range(10)]))
-    for r in range(10):
+    print("   " + " ".join([str(i % 10) for i in range(len(grid[0]) if grid else 0)]))
+    for r in range(len(grid)):
         colored_row = [f"{get_color(char)}{char}{RESET}" for char in grid[r]]
         line = " ".join(colored_row)
-        print(f"{r}  {line}")
+        print(f"{r:<2} {line}")
     print("")
 
+def load_mask(path):
+    # Plot mask file: one line per row, '#', 'x' or '~' = blocked, anything
+    # else free. Returns (rows, cols, blocked cells).
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [line.rstrip('\r\n') for line in f if line.strip()]
+    rows = len(lines)
+    cols = max((len(line) for line in lines), default=0)
+    blocked = frozenset((r, c) for r, line in enumerate(lines)
+                        for c, ch in enumerate(line) if ch in '#xX~')
+    return rows, cols, blocked
+
+def add_plot_args(parser):
+    parser.add_argument("--rows", type=int, default=None,
+                        help=f"plot rows (default: {PLOT_ROWS}, or the mask's)")
+    parser.add_argument("--cols", type=int, default=None,
+                        help=f"plot columns (default: {PLOT_COLS}, or the mask's)")
+    parser.add_argument("--mask", default=None, metavar="FILE",
+                        help="text file of the plot marking blocked cells with '#', 'x' or '~'")
+
+def plot_from_args(args):
+    # (rows, cols, blocked) for the options above, or None for a plain
+    # 10x10 plot so default layouts keep their cache keys
+    rows, cols, blocked = PLOT_ROWS, PLOT_COLS, frozenset()
+    if args.mask:
+        rows, cols, blocked = load_mask(args.mask)
+    rows = args.rows or rows
+    cols = args.cols or cols
+    if rows < 1 or cols < 1:
+        raise ValueError(f"Invalid plot size {rows}x{cols}")
+    blocked = frozenset((r, c) for r, c in blocked if r < rows and c < cols)
+    if (rows, cols, blocked) == (PLOT_ROWS, PLOT_COLS, frozenset()):
+        return None
+    return rows, cols, blocked
+
+def blocked_bits(blocked, cols):
+    mask = 0
+    for r, c in blocked:
+        mask |= cell_bit(r, c, cols)
+    return mask
+
+def split_sizes(n, tile=TILE):
+    # Ways to cut n cells into pieces of at most tile: full tile-wide pieces
+    # with the remainder strip last or first, and the fewest near-equal pieces
+    full = [tile] * (n // tile) + ([n % tile] if n % tile else [])
+    k = -(-n // tile)
+    base, extra = divmod(n, k)
+    even = [base + 1] * extra + [base] * (k - extra)
+    return [full, full[::-1], even]
+
+def plot_tilings(rows, cols):
+    # (row sizes, column sizes) for each tiling solve_tiled tries
+    return list(zip(split_sizes(rows), split_sizes(cols)))
+
+def plot_tiles(row_sizes, col_sizes, blocked):
+    # (top, left, (height, width, blocked cells relative to the tile))
+    tiles = []
+    r0 = 0
+    for h in row_sizes:
+        c0 = 0
+        for w in col_sizes:
+            sub = frozenset((r - r0, c - c0) for r, c in blocked if r0 <= r < r0 + h and c0 <= c < c0 + w)
+            tiles.append((r0, c0, (h, w, sub)))
+            c0 += w
+        r0 += h
+    return tiles
+
+def tile_keys(rows, cols, blocked):
+    # Distinct tiles solve_tiled solves across all tilings
+    return {key for sizes in plot_tilings(rows, cols) for _, _, key in plot_tiles(*sizes, blocked)}
+
+def solve_tiled(solve, rows, cols, blocked, whole=None):
+    # Large plots are cut into tiles of at most TILE x TILE that are solved
+    # on their own and pasted together. Every crop's ring stays inside its
+    # tile, so the union is a valid layout, and cutting full TILE x TILE
+    # tiles first means it never has fewer spots than the top-left corner on
+    # its own. Tiles with the same shape and blocked cells are solved once.
+    # Each tiling from plot_tilings is tried, along with whole = the plot
+    # solved in one piece, and the one with the most spots wins.
+    # solve(rows=, cols=, blocked=) returns (grid, spots, legend, ...); a
+    # trailing proven flag only survives when the whole-plot solve wins,
+    # since proven tiles do not prove the plot.
+    best = whole
+    solved = {}
+    for sizes in plot_tilings(rows, cols):
+        grid = create_grid(rows, cols, fill_char='#')
+        spots = 0
+        legend = None
+        rest = ()
+        for r0, c0, key in plot_tiles(*sizes, blocked):
+            if key not in solved:
+                h, w, sub = key
+                solved[key] = solve(rows=h, cols=w, blocked=sub)
+            tile_grid, tile_spots, legend, *rest = solved[key]
+            for r, row in enumerate(tile_grid):
+                grid[r0 + r][c0:c0 + len(row)] = row
+            spots += tile_spots
+        if best is None or spots > best[1]:
+            best = (grid, spots, legend) + ((False,) if rest else ())
+    return best
+
+def drop_blocked(grid, size, blocked):
+    # For the fixed-anchor patterns: drop crops whose footprint is blocked
+    # or that lost an ingredient cell to a blocked cell, clear ingredient
+    # cells only those crops used, then mark the blocked cells.
+    rows, cols = len(grid), len(grid[0])
+    claimed = set()
+    kept_ring = set()
+    dropped_ring = set()
+    spots = 0
+    for r in range(rows):
+        for c in range(cols):
+            if grid[r][c] != '.' or (r, c) in claimed:
+                continue
+            foot = [(r + dr, c + dc) for dr in range(size) for dc in range(size)]
+            claimed.update(foot)
+            ring = ring_cells(r, c, size, rows, cols)
+            if any(cell in blocked for cell in foot) or \
+                    any(cell in blocked and grid[cell[0]][cell[1]] not in ' #' + BLOCKED for cell in ring):
+                for rr, cc in foot:
+                    if 0 <= rr < rows and 0 <= cc < cols:
+                        grid[rr][cc] = ' '
+                dropped_ring.update(ring)
+            else:
+                kept_ring.update(ring)
+                spots += 1
+    for rr, cc in dropped_ring - kept_ring:
+        if grid[rr][cc] != '.':
+            grid[rr][cc] = ' '
+    for rr, cc in blocked:
+        grid[rr][cc] = BLOCKED
+    return spots
+
 def get_symbols(made_of):
     # Assign symbols 0-9, A-Z to ingredients
     keys = sorted(list(made_of.keys()))
@@ -52,7 +208,35 @@ def get_symbols(made_of):
         
     return mapping, ", ".join(legend_parts)
 
-def solve_layout(item_name, item_data, all_items):
+@functools.lru_cache(maxsize=None)
+def get_search_tables(rows=PLOT_ROWS, cols=PLOT_COLS):
+    # Precomputed masks for the size-2 / size-3 search, shared by every call.
+    # S blocks are keyed by top-left; P anchors (0..80 -> 9x9 top-left
+    # positions on a 10x10 plot) get their footprint and ring cells (top
+    # row, bottom row, then sides; T fills from the end).
+    s_masks = {}
+    for sr in range(-3, rows + 1):
+        for sc in range(-3, cols + 1):
+            s_masks[(sr, sc)] = block_mask(sr, sc, 3, 3, rows, cols)
+
+    p_masks = []
+    p_rings = []
+    for i in range((rows - 1) * (cols - 1)):
+        pr, pc = divmod(i, cols - 1)
+        p_masks.append(block_mask(pr, pc, 2, 2, rows, cols))
+        p_rings.append(tuple(cell_bit(r, c, cols) for r, c in ring_cells(pr, pc, 2, rows, cols)))
+    return s_masks, tuple(p_masks), tuple(p_rings)
+
+def solve_layout(item_name, item_data, all_items, rows=PLOT_ROWS, cols=PLOT_COLS, blocked=None, tiled=True):
+    # Layout on a rows x cols plot; blocked is a set of (row, col) cells
+    # that cannot be used. Plots wider or taller than TILE are also tiled,
+    # unless tiled is False.
+    blocked = frozenset(blocked or ())
+    if tiled and (rows > TILE or cols > TILE):
+        whole = solve_layout(item_name, item_data, all_items, rows, cols, blocked, tiled=False)
+        return solve_tiled(functools.partial(solve_layout, item_name, item_data, all_items),
+                           rows, cols, blocked, whole)
+
     size = item_data.get("size", 1)
     made_of = item_data.get("made_of", {})
     destructive = item_data.get("destructive", False)
@@ -72,7 +256,7 @@ def solve_layout(item_name, item_data, all_items):
         else:
             ingredient_sizes[sym] = 1
     
-    grid = create_grid(fill_char=' ')
+    grid = create_grid(rows, cols, fill_char=' ')
     spots = 0
 
     # DESTRUCTIVE LOGIC
@@ -135,145 +319,120 @@ def solve_layout(item_name, item_data, all_items):
                     if touches:
                         valid_s_offsets.append((dr, dc))
 
-        def can_place_s(g, sr, sc, sym):
-            if sr < 0 or sc < 0 or sr+2 >= 10 or sc+2 >= 10: return False
-            for r in range(sr, sr+3):
-                for c in range(sc, sc+3):
-                    if g[r][c] != ' ' and g[r][c] != sym:
-                        return False
-            return True
-
-        def place_s(g, sr, sc, sym):
-            for r in range(sr, sr+3):
-                for c in range(sc, sc+3):
-                    g[r][c] = sym
-                    
-        def remove_s(g, sr, sc):
-             # This is tricky with overlaps. 
-             # We should clone grid or use a rigorous state.
-             # Since P3 is slow, grid copy is OK.
-             pass
-
-        def get_neighbors_p(pr, pc):
-            # Return all adjacent cells to 2x2 P
-            # Top: (pr-1, pc), (pr-1, pc+1)
-            # Bottom: (pr+2, pc), (pr+2, pc+1)
-            # Left: (pr, pc-1), (pr+1, pc-1)
-            # Right: (pr, pc+2), (pr+1, pc+2)
-            # Corners: (pr-1, pc-1), (pr-1, pc+2), (pr+2, pc-1), (pr+2, pc+2)
-            candidates = []
-            # Top row
-            candidates.extend([(pr-1, c) for c in range(pc-1, pc+3)])
-            # Bottom row
-            candidates.extend([(pr+2, c) for c in range(pc-1, pc+3)])
-            # Sides
-            candidates.append((pr, pc-1)); candidates.append((pr, pc+2))
-            candidates.append((pr+1, pc-1)); candidates.append((pr+1, pc+2))
-            return candidates
-
-        best_grid = None
-            
-        def solve(k, idx, current_grid):
-            nonlocal best_grid
-            if k == 0:
-                best_grid = [row[:] for row in current_grid]
-                return True
-            
-            # Try to place 1 crop
-            # Iterate positions
-            for i in range(idx, 81): # 0..8, 0..8 -> max index 88? 9*9=81 positions (0..8)
-                pr, pc = divmod(i, 9) # 9 cols relevant for top-left
-                if pr > 8 or pc > 8: continue # should be covered by range but just safe
-                
-                # Check P fit
-                p_fits = True
-                for r in range(pr, pr+2):
-                    for c in range(pc, pc+2):
-                        if current_grid[r][c] != ' ':
-                            p_fits = False; break
-                    if not p_fits: break
-                
-                if p_fits:
-                    # Place P
-                    # We need to backtrack P too, so copy grid or meticulous undo
-                    # Copying is safer for prototyping
-                    next_grid = [row[:] for row in current_grid]
-                    for r in range(pr, pr+2):
-                        for c in range(pc, pc+2):
-                            next_grid[r][c] = '.'
-                            
-                    # satisfy S (need 2)
-                    # Iterate couples of S?
-                    # Or nested recursion?
-                    # Let's simple Loop for S1, S2
-                    
-                    found_s_config = False
-                    
-                    # We need 2 SNOOZLINGs
-                    # Get valid absolute S positions
-                    possible_s = []
-                    for dr, dc in valid_s_offsets:
-                        sr, sc = pr+dr, pc+dc
-                        if can_place_s(next_grid, sr, sc, s3_sym):
-                            possible_s.append((sr, sc))
-                            
-                    # Try pairs
-                    import itertools
-                    
-                    for s1, s2 in itertools.combinations(possible_s, 2):
-                        # Check S1 S2 overlap
-                        s1r, s1c = s1
-                        s2r, s2c = s2
-                        # Quick overlap check
-                        overlap = (abs(s1r - s2r) < 3) and (abs(s1c - s2c) < 3)
-                        if overlap: continue
-
-                        temp_g = [row[:] for row in next_grid]
-                        place_s(temp_g, s1r, s1c, s3_sym)
-                        place_s(temp_g, s2r, s2c, s3_sym)
-                        
-                        # Check T requirements (6 T's)
-                        neighbors = get_neighbors_p(pr, pc)
-                        t_count = 0
-                        t_spots = []
-                        
-                        valid_t = True
-                        for nr, nc in neighbors:
-                             if 0 <= nr < 10 and 0 <= nc < 10:
-                                 cell = temp_g[nr][nc]
-                                 if cell == t_sym:
-                                     t_count += 1
-                                 elif cell == s3_sym:
-                                     pass # is S
-                                 elif cell == ' ':
-                                     t_spots.append((nr, nc))
-                                 elif cell == '.':
-                                     pass # self? (should not happen in neighbors)
-                                 else:
-                                     pass # blocked
-                                    
-                        needed = 6 - t_count
-                        if needed <= len(t_spots):
-                            # Place T's
-                            for _ in range(needed):
-                                tr, tc = t_spots.pop()
-                                temp_g[tr][tc] = t_sym
-                            # Success for this crop!
-                            if solve(k-1, i+1, temp_g):
+        # Bitboard state: one mask per symbol + occupancy, so every fit
+        # check, placement and undo below is an integer op instead of a
+        # grid copy.
+        board = BitGrid(rows, cols)
+        if blocked:
+            board.place(BLOCKED, blocked_bits(blocked, cols))
+        s_masks, p_masks, p_rings = get_search_tables(rows, cols)
+
+        # Cells that anchors i.. can still look at (footprint, ring and
+        # every S block they may use). Two partial boards that agree there,
+        # with the same next anchor and crop count, have identical subtrees,
+        # so once one has been searched to the end the other is skipped.
+        # Finished states go into a bounded LRU transposition table.
+        future = [0] * (len(p_masks) + 1)
+        for i in range(len(p_masks) - 1, -1, -1):
+            pr, pc = divmod(i, cols - 1)
+            reach = p_masks[i]
+            for bit in p_rings[i]:
+                reach |= bit
+            for dr, dc in valid_s_offsets:
+                reach |= s_masks[(pr + dr, pc + dc)]
+            future[i] = future[i + 1] | reach
+        table = collections.OrderedDict()
+
+        best_board = None
+        best_depth = 0
+        # Search stats, reported once per call when instrumentation is on
+        nodes = 0
+        pruned = 0
+        tt_hits = 0
+        tt_evictions = 0
+
+        # One pass for every k: the first board in search order to reach a
+        # new depth is kept, which is the board the per-k searches (4 down
+        # to 1) used to return for the largest k that fits.
+        def solve(depth, idx):
+            nonlocal best_board, best_depth, nodes, pruned, tt_hits, tt_evictions
+            nodes += 1
+            if depth > best_depth:
+                best_depth = depth
+                best_board = board.copy()
+                if depth == MAX_BACKTRACK_CROPS:
+                    return True
+
+            for i in range(idx, len(p_masks)):
+                pr, pc = divmod(i, cols - 1)
+                p_mask = p_masks[i]
+                if not board.fits(p_mask):
+                    continue
+
+                p_added = board.place('.', p_mask)
+
+                possible_s = []
+                for dr, dc in valid_s_offsets:
+                    s_mask = s_masks[(pr + dr, pc + dc)]
+                    if s_mask and board.fits_sym(s_mask, s3_sym):
+                        possible_s.append((pr + dr, pc + dc, s_mask))
+
+                for (s1r, s1c, s1_mask), (s2r, s2c, s2_mask) in itertools.combinations(possible_s, 2):
+                    overlap = (abs(s1r - s2r) < 3) and (abs(s1c - s2c) < 3)
+                    if overlap:
+                        pruned += 1
+                        continue
+
+                    s_added = board.place(s3_sym, s1_mask | s2_mask)
+
+                    # Check T requirements (6 T's)
+                    t_mask = board.get(t_sym)
+                    t_count = 0
+                    t_spots = []
+                    for bit in p_rings[i]:
+                        if t_mask & bit:
+                            t_count += 1
+                        elif not board.occ & bit:
+                            t_spots.append(bit)
+
+                    needed = 6 - t_count
+                    if needed <= len(t_spots):
+                        t_added = 0
+                        for _ in range(needed):
+                            t_added |= t_spots.pop()
+                        t_added = board.place(t_sym, t_added)
+                        reach = future[i + 1]
+                        state = (i + 1, depth, board.get('.') & reach, board.get(s3_sym) & reach,
+                                 board.get(t_sym) & reach)
+                        if state in table:
+                            table.move_to_end(state)
+                            tt_hits += 1
+                        else:
+                            if solve(depth + 1, i + 1):
                                 return True
-                            # Else, try next S pair
-                        
-                    # If no S pair worked, this P placement fails
-            
+                            table[state] = True
+                            if len(table) > TRANSPOSITION_SIZE:
+                                table.popitem(last=False)
+                                tt_evictions += 1
+
+                        board.remove(t_sym, t_added)
+                    else:
+                        pruned += 1
+
+                    board.remove(s3_sym, s_added)
+
+                board.remove('.', p_added)
+
             return False
 
-        # Try k from 4 down to 1
-        for k in range(4, 0, -1):
-            if solve(k, 0, grid):
-                grid[:] = best_grid[:] # Update grid in place
-                spots = k # spots is count of crops?
-                spots = sum(row.count('.') for row in grid)
-                break
+        solve(0, 0)
+        if best_board is not None:
+            grid[:] = best_board.to_chars(' ')
+            spots = best_board.count('.')
+        instrument.count("layout.backtrack.nodes", nodes)
+        instrument.count("layout.backtrack.tt_hits", tt_hits)
+        instrument.count("layout.backtrack.tt_evictions", tt_evictions)
+        instrument.count("layout.backtrack.pruned", pruned)
 
     # Standard Algorithms with Optional Single-Spot Override
     
@@ -289,12 +448,16 @@ def solve_layout(item_name, item_data, all_items):
         for dr in range(2, -1, -1): offsets.append((dr, -1))
         
         if destructive:
-            valid_indices = [4] # Place one at 4,4
+            row_indices = [rows // 2 - 1] # Place one at 4,4
+            col_indices = [cols // 2 - 1]
         else:
-            valid_indices = [1, 5]
+            row_indices = list(range(1, rows - 2, 4))
+            col_indices = list(range(1, cols - 2, 4))
 
-        for r in valid_indices:
-            for c in valid_indices:
+        for r in row_indices:
+            for c in col_indices:
+                if r + 3 > rows or c + 3 > cols:
+                    continue
                 # Place Crop
                 for dr in range(3):
                     for dc in range(3):
@@ -305,7 +468,7 @@ def solve_layout(item_name, item_data, all_items):
                 for i, (or_, oc) in enumerate(offsets):
                     sym = pool[i % len(pool)]
                     gr, gc = r + or_, c + oc
-                    if 0 <= gr < 10 and 0 <= gc < 10:
+                    if 0 <= gr < rows and 0 <= gc < cols:
                         if grid[gr][gc] == ' ' or grid[gr][gc] == sym:
                             grid[gr][gc] = sym
 
@@ -377,12 +540,16 @@ def solve_layout(item_name, item_data, all_items):
         pool = final_pool
 
         if destructive:
-             valid_indices = [4] # Place one at 4,4
+             row_indices = [rows // 2 - 1] # Place one at 4,4
+             col_indices = [cols // 2 - 1]
         else:
-             valid_indices = [1, 4, 7]
+             row_indices = list(range(1, rows - 2, 3))
+             col_indices = list(range(1, cols - 2, 3))
              
-        for r in valid_indices:
-            for c in valid_indices:
+        for r in row_indices:
+            for c in col_indices:
+                if r + 2 > rows or c + 2 > cols:
+                    continue
                 # Place Crop
                 for dr in range(2):
                     for dc in range(2):
@@ -392,7 +559,7 @@ def solve_layout(item_name, item_data, all_items):
                 for i, (or_, oc) in enumerate(offsets):
                     sym = pool[i]
                     gr, gc = r + or_, c + oc
-                    if 0 <= gr < 10 and 0 <= gc < 10:
+                    if 0 <= gr < rows and 0 <= gc < cols:
                         # Only place if empty or same symbol (to allow sharing)
                         if grid[gr][gc] == ' ' or grid[gr][gc] == sym:
                             grid[gr][gc] = sym
@@ -417,9 +584,11 @@ def solve_layout(item_name, item_data, all_items):
             h_sym = sym_1[1] if len(sym_1) > 1 else v_sym
 
             if destructive:
-                valid_indices = [4]
+                row_indices = [rows // 2 - 1]
+                col_indices = [cols // 2 - 1]
             else:
-                valid_indices = [2, 7]
+                row_indices = list(range(2, rows - 2, 5))
+                col_indices = list(range(2, cols - 2, 5))
             
             valid_offsets = [
                 # Top-Left 2x2
@@ -436,13 +605,13 @@ def solve_layout(item_name, item_data, all_items):
                 (0,-1), (0,1)
             ]
 
-            for r in valid_indices:
-                for c in valid_indices:
+            for r in row_indices:
+                for c in col_indices:
                     grid[r][c] = '.'
                     spots += 1
                     for dr, dc in valid_offsets:
                         nr, nc = r + dr, c + dc
-                        if 0 <= nr < 10 and 0 <= nc < 10:
+                        if 0 <= nr < rows and 0 <= nc < cols:
                             if grid[nr][nc] == ' ':
                                 if abs(dr) >= 1 and abs(dc) >= 1:
                                     grid[nr][nc] = main_sym_2
@@ -496,16 +665,18 @@ def solve_layout(item_name, item_data, all_items):
             
             if destructive:
                  # Place at 5,5
-                 valid_indices = [5]
+                 row_indices = [rows // 2]
+                 col_indices = [cols // 2]
             else:
-                 valid_indices = [1, 3, 5, 7]
+                 row_indices = list(range(1, rows - 2, 2))
+                 col_indices = list(range(1, cols - 2, 2))
 
             # Check symmetries for optimization
             h_swap = pool[3] != pool[7]
             v_swap = pool[1] != pool[5]
 
-            for r_i, r in enumerate(valid_indices):
-                for c_i, c in enumerate(valid_indices):
+            for r_i, r in enumerate(row_indices):
+                for c_i, c in enumerate(col_indices):
                     # Determine pool for this spot to resolve conflicts
                     cur_pool = list(pool)
                     
@@ -520,7 +691,7 @@ def solve_layout(item_name, item_data, all_items):
                     for i, (or_, oc) in enumerate(offsets):
                          sym = cur_pool[i % len(cur_pool)]
                          gr, gc = r + or_, c + oc
-                         if 0 <= gr < 10 and 0 <= gc < 10:
+                         if 0 <= gr < rows and 0 <= gc < cols:
                              grid[gr][gc] = sym
         else:
             # 4-Neighbor
@@ -528,23 +699,24 @@ def solve_layout(item_name, item_data, all_items):
             
             if destructive:
                 # Single spot at 5,5
-                grid[5][5] = '.'
+                cr, cc = rows // 2, cols // 2
+                grid[cr][cc] = '.'
                 spots = 1
                 # Fill Neighbors
-                neighbors = [(4,5), (6,5), (5,4), (5,6)]
+                neighbors = [(cr-1,cc), (cr+1,cc), (cr,cc-1), (cr,cc+1)]
                 for i, (nr, nc) in enumerate(neighbors):
                      if len(syms) > 0:
                          grid[nr][nc] = syms[i % len(syms)]
                      else:
                          grid[nr][nc] = '?'
             else:
-                for r in range(1, 9):
-                    for c in range(1, 9):
+                for r in range(1, rows - 1):
+                    for c in range(1, cols - 1):
                         if (r + c) % 2 == 0:
                             grid[r][c] = '.'
                             spots += 1
-                for r in range(10):
-                    for c in range(10):
+                for r in range(rows):
+                    for c in range(cols):
                         if grid[r][c] == ' ':
                             if len(syms) >= 2:
                                 if r % 2 == 0: grid[r][c] = syms[0]
@@ -552,21 +724,83 @@ def solve_layout(item_name, item_data, all_items):
                             elif len(syms) == 1: grid[r][c] = syms[0]
                             else: grid[r][c] = '?'
     
+    # The backtracking search above already planned around blocked cells
+    if blocked and not (size == 2 and has_size_3):
+        spots = drop_blocked(grid, size, blocked)
+
     # Post-process
-    for r in range(10):
-        for c in range(10):
+    for r in range(rows):
+        for c in range(cols):
             if grid[r][c] == ' ':
                 grid[r][c] = '#'
 
     return grid, spots, legend
 
+def solve_layout_exact(item_name, item_data, all_items, time_budget=EXACT_TIME_BUDGET,
+                       rows=PLOT_ROWS, cols=PLOT_COLS, blocked=None, tiled=True):
+    # Same inputs as solve_layout, but searches for the true maximum number of
+    # crops instead of using fixed anchors. Returns an extra flag telling
+    # whether that maximum was proven or the time budget ran out first. The
+    # search starts from the solve_layout result, so it never returns fewer
+    # spots; if nothing beats it, that layout is returned. Tiled plots give
+    # half the budget to the whole-plot search and split the rest between
+    # their distinct tiles; they are only proven when the whole-plot search
+    # proves its result and the tiles do not beat it.
+    blocked = frozenset(blocked or ())
+    if tiled and (rows > TILE or cols > TILE):
+        distinct = len(tile_keys(rows, cols, blocked))
+        whole = solve_layout_exact(item_name, item_data, all_items, time_budget / 2,
+                                   rows, cols, blocked, tiled=False)
+        return solve_tiled(functools.partial(solve_layout_exact, item_name, item_data, all_items,
+                                             time_budget / 2 / distinct),
+                           rows, cols, blocked, whole)
+    size = item_data.get("size", 1)
+    made_of = item_data.get("made_of", {})
+    destructive = item_data.get("destructive", False)
+
+    mapping, legend = get_symbols(made_of)
+    requirements = {}
+    sym_sizes = {}
+    for k, v in made_of.items():
+        sym = mapping[k]
+        requirements[sym] = v
+        sym_sizes[sym] = all_items[k].get("size", 1) if k in all_items else 1
+
+    solver = ExactLayoutSolver(size, requirements, sym_sizes, rows, cols,
+                               max_crops=1 if destructive else None,
+                               time_budget=time_budget, blocked=blocked_bits(blocked, cols))
+    seed_grid, seed_spots, _ = solve_layout(item_name, item_data, all_items, rows, cols, blocked, tiled=False)
+    board, crops, proven = solver.solve(seed_spots)
+    instrument.count("layout.exact.nodes", solver.nodes)
+    instrument.count("layout.exact.pruned", solver.pruned)
+    if not proven:
+        instrument.count("layout.exact.timed_out")
+    if solver.best == seed_spots:
+        return seed_grid, seed_spots, legend, proven
+    prune_unused(board, crops, solver.ring, sym_sizes)
+
+    grid = board.to_chars('#')
+    return grid, solver.best, legend, proven
+
 def main(args):
-    priority = None
-    if len(args) > 0:
-        priority = args
+    parser = argparse.ArgumentParser(description="Print crop layouts for the given mutations.")
+    parser.add_argument("items", nargs="*", help="item names to lay out (default: a showcase list)")
+    parser.add_argument("--exact", action="store_true",
+                        help="search for the maximum number of spots instead of fixed anchors")
+    parser.add_argument("--time-budget", type=float, default=EXACT_TIME_BUDGET,
+                        help="seconds per item for --exact (default: %(default)s)")
+    add_plot_args(parser)
+    opts = parser.parse_args(args)
+    try:
+        plot = plot_from_args(opts)
+    except (OSError, ValueError) as e:
+        print(f"Error loading plot: {e}")
+        return
+    rows, cols, blocked = plot or (PLOT_ROWS, PLOT_COLS, None)
+
+    priority = opts.items or None
     try:
-        with open('items.json', 'r', encoding='utf-8') as f:
-            items = json.load(f)
+        items = load_recipes()
     except Exception as e:
         print(f"Error loading items.json: {e}")
         return
@@ -575,10 +809,26 @@ def main(args):
     if not priority:
         priority = ["NOCTILUME", "SNOOZLING", "SCOURROOT", "WITHERBLOOM", "DUSTGRAIN", "ZOMBUD", "ASHWREATH", "CHORUS_FRUIT", "PLANTBOY_ADVANCE"]
     
+    # Prebuilt layouts are used when current; the rest are solved here
+    from layout_atlas import LayoutAtlas
+    from layout_cache import recipe_hash
+    atlas = LayoutAtlas()
+
     for name in priority:
         if name in items:
-            grid, count, legend = solve_layout(name, items[name], items)
-            print_grid(grid, name, count, legend)
+            h = recipe_hash(name, items[name], items, opts.exact, plot)
+            cached = atlas.lookup(name, h, opts.exact, opts.time_budget)
+            if cached is not None:
+                grid, count, legend = cached
+                proven = atlas.entry(name, opts.exact)["proven"] if opts.exact else None
+                print_grid(grid, name, count, legend, proven)
+            elif opts.exact:
+                grid, count, legend, proven = solve_layout_exact(name, items[name], items, opts.time_budget,
+                                                                 rows, cols, blocked)
+                print_grid(grid, name, count, legend, proven)
+            else:
+                grid, count, legend = solve_layout(name, items[name], items, rows, cols, blocked)
+                print_grid(grid, name, count, legend)
 
 if __name__ == "__main__":
     main(sys.argv[1:])
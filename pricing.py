@@ -0,0 +1,233 @@
+
+import bisect
+import functools
+from array import array
+
+NAN = float('nan')
+
+# Exceptions for Enchanted names
+ENCHANTED_EXCEPTIONS = {
+    "INK_SACK:3": "ENCHANTED_COCOA",
+    "CACTUS": "ENCHANTED_CACTUS_GREEN",
+    "DOUBLE_PLANT": "ENCHANTED_SUNFLOWER",
+    "SUGAR_CANE": "ENCHANTED_SUGAR",
+    "POTATO_ITEM": "ENCHANTED_POTATO",
+    "CARROT_ITEM": "ENCHANTED_CARROT",
+}
+
+# Ingredients that are blocks, not Bazaar products
+FREE_INGREDIENTS = {"FIRE"}
+
+# Drops in items.json are per 160 harvests and are scaled by a per-recipe
+# factor (items.json "drop_factor"). 38 came from testing in-game.
+DROP_BATCH = 160
+DEFAULT_DROP_FACTOR = 38
+
+@functools.lru_cache(maxsize=None)
+def enchanted_name(item):
+    return ENCHANTED_EXCEPTIONS.get(item, f"ENCHANTED_{item}")
+
+def drop_units(data, qty):
+    # Drop units per harvested crop
+    return qty / DROP_BATCH * data.get("drop_factor", DEFAULT_DROP_FACTOR)
+
+def reachable_products(recipes):
+    # Every product id the profit pass can look at: the crops themselves,
+    # their ingredients, and each drop in base and ENCHANTED_ form.
+    names = []
+    seen = set()
+
+    def add(name):
+        if name not in seen and name not in FREE_INGREDIENTS:
+            seen.add(name)
+            names.append(name)
+
+    for item_name, data in recipes.items():
+        add(item_name)
+        for ing_name in data.get("made_of", {}):
+            add(ing_name)
+        for drop_item in data.get("drop", {}):
+            add(enchanted_name(drop_item))
+            add(drop_item)
+    return names
+
+class PriceIndex:
+    # Top-of-book prices for just the products reachable from items.json.
+    # Product ids are fixed per recipe set; update() rewrites the arrays in
+    # place for each new snapshot, so the full Bazaar payload can be dropped
+    # right after. bid = sell_summary[0] (insta-sell price), ask =
+    # buy_summary[0] (insta-buy price); NaN when that side is empty.
+    def __init__(self, recipes):
+        self.names = reachable_products(recipes)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        # Per recipe, every product it touches resolved to ids once:
+        # (item_id, [(ing_name, ing_id, qty)], [(drop_item, ench_id, base_id, units)])
+        # with units = drop_units(). FIRE and other free ingredients are left
+        # out of the ingredient list.
+        self.refs = {}
+        for item_name, data in recipes.items():
+            ingredients = [(ing_name, self.ids[ing_name], qty)
+                           for ing_name, qty in data.get("made_of", {}).items()
+                           if ing_name not in FREE_INGREDIENTS]
+            drops = [(drop_item, self.ids[enchanted_name(drop_item)], self.ids[drop_item], drop_units(data, qty))
+                     for drop_item, qty in data.get("drop", {}).items()]
+            self.refs[item_name] = (self.ids[item_name], ingredients, drops)
+        n = len(self.names)
+        self.bid = array('d', [NAN]) * n
+        self.ask = array('d', [NAN]) * n
+        self.present = bytearray(n)
+        self.last_updated = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def id(self, name):
+        return self.ids.get(name)
+
+    def update(self, products, last_updated=None):
+        bid = self.bid
+        ask = self.ask
+        present = self.present
+        for i, name in enumerate(self.names):
+            product = products.get(name)
+            if not product:
+                present[i] = 0
+                bid[i] = NAN
+                ask[i] = NAN
+                continue
+            present[i] = 1
+            sell_summary = product.get("sell_summary")
+            bid[i] = sell_summary[0]["pricePerUnit"] if sell_summary else NAN
+            buy_summary = product.get("buy_summary")
+            ask[i] = buy_summary[0]["pricePerUnit"] if buy_summary else NAN
+        self.last_updated = last_updated
+        return self
+
+    def missing(self):
+        # Names of products the last snapshot did not list
+        return [name for i, name in enumerate(self.names) if not self.present[i]]
+
+    def fill_missing(self, prices):
+        # Fallback prices (e.g. Auction House lowest BIN, see auctions.py)
+        # for products the Bazaar does not list, used as both the insta-sell
+        # and the insta-buy price. Returns the names filled.
+        filled = []
+        for name, price in prices.items():
+            i = self.ids.get(name)
+            if i is not None and not self.present[i]:
+                self.present[i] = 1
+                self.bid[i] = price
+                self.ask[i] = price
+                filled.append(name)
+        return filled
+
+    def has(self, i):
+        return i is not None and self.present[i] == 1
+
+    def has_bid(self, i):
+        return i is not None and self.bid[i] == self.bid[i]
+
+    def has_ask(self, i):
+        return i is not None and self.ask[i] == self.ask[i]
+
+    @classmethod
+    def from_products(cls, recipes, products, last_updated=None):
+        return cls(recipes).update(products, last_updated)
+
+def sell_as(index, enchanted_id, base_id):
+    # Product a drop is sold as: its ENCHANTED_ form when that has buy
+    # orders, else the base item, None when neither can be sold
+    if index.has_bid(enchanted_id):
+        return enchanted_id
+    if index.has_bid(base_id):
+        return base_id
+    return None
+
+def item_revenue(index, item_name, warnings=None, fill=None, drops=True, crop=True):
+    # (revenue per crop, None), or (None, reason) when the crop cannot be
+    # sold. Revenue is the insta-sell price plus the drops, each sold as
+    # its ENCHANTED_ form when that has buy orders, else as the base item.
+    # fill(product_id, units per crop) replaces the top-of-book bid, e.g.
+    # to price a whole plot through the order book. crop=False prices the
+    # drops alone, whether or not the crop itself sells.
+    item_id, _, item_drops = index.refs[item_name]
+    bid = index.bid
+    instasell_price = 0
+    if crop:
+        if not index.has(item_id):
+            return None, "Not found in Bazaar"
+        if not index.has_bid(item_id):
+            return None, "No buy orders (cannot instasell)"
+        instasell_price = fill(item_id, 1) if fill else bid[item_id]
+
+    drops_revenue = 0
+    for drop_item, enchanted_id, base_id, units in (item_drops if drops else ()):
+        drop_id = sell_as(index, enchanted_id, base_id)
+        if drop_id is None:
+            if warnings is not None and not index.has(base_id):
+                warnings.append(f"Warning: Drop item {drop_item} for {item_name} not found in Bazaar")
+            continue
+        drops_revenue += units * (fill(drop_id, units) if fill else bid[drop_id])
+    return instasell_price + drops_revenue, None
+
+def price_items(index, names, warnings=None, drops=True):
+    # Batch form of item_revenue: {name: (revenue, reason)} in one pass
+    return {name: item_revenue(index, name, warnings, drops=drops) for name in names}
+
+class DepthIndex:
+    # Full order-book depth for the same products (and ids) as a PriceIndex,
+    # for pricing bulk fills. Each side is stored CSR-style: flat arrays of
+    # level prices plus cumulative amount and cost, with per-product offsets,
+    # so a fill of any size is one bisect instead of a walk over the levels.
+    # "sell" = sell_summary (buy orders we insta-sell into, best first),
+    # "buy" = buy_summary (offers we insta-buy from, cheapest first).
+    def __init__(self, index):
+        self.index = index
+        self.sides = {}
+
+    def update(self, products):
+        for side, key in (("sell", "sell_summary"), ("buy", "buy_summary")):
+            offsets = array('l', [0])
+            prices = array('d')
+            cum_amount = array('d')
+            cum_cost = array('d')
+            for name in self.index.names:
+                amount = 0.0
+                cost = 0.0
+                for level in (products.get(name) or {}).get(key, []):
+                    amount += level["amount"]
+                    cost += level["amount"] * level["pricePerUnit"]
+                    prices.append(level["pricePerUnit"])
+                    cum_amount.append(amount)
+                    cum_cost.append(cost)
+                offsets.append(len(prices))
+            self.sides[side] = (offsets, prices, cum_amount, cum_cost)
+        return self
+
+    def fill(self, side, i, qty):
+        # (average price per unit, fully filled) for qty units of product i.
+        # If the book is thinner than qty, the rest is priced at the last
+        # (worst) level. Returns (NaN, False) for an empty side.
+        offsets, prices, cum_amount, cum_cost = self.sides[side]
+        lo, hi = offsets[i], offsets[i + 1]
+        if lo == hi:
+            return NAN, False
+        if qty <= 0:
+            return prices[lo], True
+        k = bisect.bisect_left(cum_amount, qty, lo, hi)
+        if k == hi:
+            cost = cum_cost[hi - 1] + (qty - cum_amount[hi - 1]) * prices[hi - 1]
+            return cost / qty, False
+        prev_amount = cum_amount[k - 1] if k > lo else 0.0
+        prev_cost = cum_cost[k - 1] if k > lo else 0.0
+        return (prev_cost + (qty - prev_amount) * prices[k]) / qty, True
+
+    def sell_price(self, i, qty):
+        return self.fill("sell", i, qty)
+
+    def buy_price(self, i, qty):
+        return self.fill("buy", i, qty)
+
+    @classmethod
+    def from_products(cls, index, products):
+        return cls(index).update(products)
@@ -0,0 +1,174 @@
+
+import numpy as np
+from recipe_model import HOURS_PER_STAGE, as_model
+
+# Batched version of main.compute_profits.
+# Recipes are encoded once as sparse (COO) ingredient and drop matrices over
+# the PriceIndex product ids. Evaluating a price vector, or a whole (B, P)
+# batch of them, is then a handful of array ops. Every float is computed with
+# the same operations in the same order as the scalar loop, so a single
+# vector reproduces its output exactly.
+
+class ProfitEngine:
+    def __init__(self, recipes, index, layouts):
+        self.index = index
+        # Only recipes with ingredients take part; others are always skipped
+        self.recipes = recipes = as_model(recipes)
+        self.items = [r.name for r in recipes.records if r.made_of]
+        n = len(self.items)
+
+        self.item_ids = np.array([index.refs[name][0] for name in self.items], dtype=np.intp)
+        self.spots = np.zeros(n)
+        self.layout_errors = {}
+        for row, name in enumerate(self.items):
+            layout = layouts[name]
+            if isinstance(layout, Exception):
+                self.layout_errors[name] = layout
+            else:
+                self.spots[row] = layout[1]
+
+        stages = np.array([recipes[name].stages for name in self.items], dtype=float)
+        self.hours = stages * HOURS_PER_STAGE
+        # Non-destructive crops: ingredients last 48h, so cost / (48 / stages)
+        amortized = [recipes[name].regrows for name in self.items]
+        self.harvests = np.where(amortized, 48 / np.where(stages > 0, stages, 1), 1.0)
+        self.amortized = np.array(amortized)
+
+        # Sparse ingredient matrix: (row, product id, qty), grouped by row
+        ing_rows, ing_cols, ing_vals = [], [], []
+        drop_rows, drop_ench, drop_base, drop_vals = [], [], [], []
+        for row, name in enumerate(self.items):
+            _, ingredients, drops = index.refs[name]
+            for _, ing_id, qty in ingredients:
+                ing_rows.append(row)
+                ing_cols.append(ing_id)
+                ing_vals.append(qty)
+            for _, ench_id, base_id, units in drops:
+                drop_rows.append(row)
+                drop_ench.append(ench_id)
+                drop_base.append(base_id)
+                drop_vals.append(units)
+        self.ing_rows = np.array(ing_rows, dtype=np.intp)
+        self.ing_cols = np.array(ing_cols, dtype=np.intp)
+        self.ing_vals = np.array(ing_vals, dtype=float)
+        self.drop_rows = np.array(drop_rows, dtype=np.intp)
+        self.drop_ench = np.array(drop_ench, dtype=np.intp)
+        self.drop_base = np.array(drop_base, dtype=np.intp)
+        self.drop_vals = np.array(drop_vals, dtype=float)
+        self.ing_passes = entry_passes(self.ing_rows)
+        self.drop_passes = entry_passes(self.drop_rows)
+
+    def price_vectors(self):
+        # Zero-copy views over the index's current bid/ask arrays
+        return np.frombuffer(self.index.bid, dtype=float), np.frombuffer(self.index.ask, dtype=float)
+
+    def row_sum(self, passes, terms):
+        # Sum terms (..., k) into (..., n_items). Pass j adds the j-th entry
+        # of every row at once (no repeated rows within a pass), so each row
+        # is still accumulated left to right like `total += x`.
+        out = np.zeros(terms.shape[:-1] + (len(self.items),))
+        for pass_rows, pass_entries in passes:
+            out[..., pass_rows] += terms[..., pass_entries]
+        return out
+
+    def evaluate(self, bid, ask):
+        # bid/ask: (P,) or (B, P). Returns arrays shaped (..., n_items).
+        bid = np.asarray(bid, dtype=float)
+        ask = np.asarray(ask, dtype=float)
+
+        item_bid = bid[..., self.item_ids]
+        valid = ~np.isnan(item_bid)
+
+        ing_ask = ask[..., self.ing_cols]
+        missing = np.isnan(ing_ask)
+        if missing.any():
+            valid &= ~self.row_sum(self.ing_passes, missing.astype(float)).astype(bool)
+        cost = self.row_sum(self.ing_passes, np.where(missing, 0.0, ing_ask) * self.ing_vals)
+
+        ench = bid[..., self.drop_ench]
+        base = bid[..., self.drop_base]
+        drop_price = np.where(~np.isnan(ench), ench, np.where(~np.isnan(base), base, 0.0))
+        drops = self.row_sum(self.drop_passes, self.drop_vals * drop_price)
+
+        revenue = np.where(valid, item_bid, 0.0) + drops
+        cost = np.where(self.amortized, cost / self.harvests, cost)
+        unit_profit = revenue - cost
+        plot_profit = unit_profit * self.spots
+        with np.errstate(divide='ignore', invalid='ignore'):
+            per_hour = np.where(self.hours > 0, plot_profit / np.where(self.hours > 0, self.hours, 1), 0.0)
+
+        return {
+            "valid": valid,
+            "unit_profit": unit_profit,
+            "total_profit": plot_profit,
+            "profit_per_hour": per_hour,
+        }
+
+    def compute_profits(self):
+        # Drop-in for main.compute_profits using the index's current prices
+        bid, ask = self.price_vectors()
+        result = self.evaluate(bid, ask)
+        valid = result["valid"]
+
+        order = np.argsort(-np.where(valid, result["profit_per_hour"], -np.inf), kind='stable')
+        profits = []
+        for row in order:
+            if not valid[row]:
+                continue
+            profits.append({
+                "item": self.items[row],
+                "spots": int(self.spots[row]),
+                "unit_profit": float(result["unit_profit"][row]),
+                "total_profit": float(result["total_profit"][row]),
+                "hours": self.recipes[self.items[row]].hours,
+                "profit_per_hour": float(result["profit_per_hour"][row]),
+            })
+
+        skipped_items, warnings = self.explain(valid)
+        return profits, skipped_items, warnings
+
+    def explain(self, valid):
+        # Skip reasons and warnings, worded and ordered like the scalar loop
+        index = self.index
+        skipped_items = []
+        warnings = []
+        rows = {name: row for row, name in enumerate(self.items)}
+        for item_name, data in self.recipes.items():
+            if not data.get("made_of"):
+                skipped_items.append(f"{item_name}: No recipe defined")
+                continue
+            item_id, ingredients, drops = index.refs[item_name]
+            if not index.has(item_id):
+                skipped_items.append(f"{item_name}: Not found in Bazaar")
+                continue
+            if not index.has_bid(item_id):
+                skipped_items.append(f"{item_name}: No buy orders (cannot instasell)")
+                continue
+            for drop_item, ench_id, base_id, _ in drops:
+                if not index.has_bid(ench_id) and not index.has(base_id):
+                    warnings.append(f"Warning: Drop item {drop_item} for {item_name} not found in Bazaar")
+            if not valid[rows[item_name]]:
+                for ing_name, ing_id, _ in ingredients:
+                    if not index.has(ing_id):
+                        skipped_items.append(f"{item_name}: Ingredient '{ing_name}' not found")
+                        break
+                    if not index.has_ask(ing_id):
+                        skipped_items.append(f"{item_name}: Ingredient '{ing_name}' has no sell offers")
+                        break
+            elif item_name in self.layout_errors:
+                warnings.append(f"Error solving layout for {item_name}: {self.layout_errors[item_name]}")
+        return skipped_items, warnings
+
+def entry_passes(rows):
+    # Split COO entries (grouped by row) into passes: pass j holds the j-th
+    # entry of every row that has one.
+    passes = []
+    position = {}
+    for entry, row in enumerate(rows.tolist()):
+        j = position.get(row, 0)
+        position[row] = j + 1
+        if j == len(passes):
+            passes.append(([], []))
+        passes[j][0].append(row)
+        passes[j][1].append(entry)
+    return [(np.array(r, dtype=np.intp), np.array(e, dtype=np.intp)) for r, e in passes]
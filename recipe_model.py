@@ -0,0 +1,341 @@
+
+import os
+import json
+import struct
+import hashlib
+from array import array
+
+# Compiled form of items.json. Every name (recipes first, then products that
+# only appear as ingredients or drops) gets an integer id. Per-recipe fields
+# live in arrays and ingredients/drops in CSR tables (start offsets into
+# flat id/qty arrays), with each ingredient's size and a topological order
+# worked out once at compile time.
+#
+# RecipeModel is also a read-only mapping name -> Recipe, and Recipe answers
+# .get()/[] like the raw items.json dict, so code that takes `recipes` works
+# with either. Per-snapshot loops read the Recipe attributes directly.
+#
+# load_recipes() keeps the compiled model in a binary file next to
+# items.json and only recompiles when the JSON changes: the stored mtime and
+# size are checked first, and if they differ the content hash decides.
+
+HOURS_PER_STAGE = 2
+RECIPES_FILE = 'items.json'
+COMPILED_FILE = '.items_compiled.bin'
+MAGIC = b'MUTRECIP'
+FORMAT_VERSION = 1
+# magic, format, has topological order, mtime_ns, size, sha256, names,
+# recipes, ingredient entries, drop entries, then byte lengths of the name
+# table and the extra-fields JSON
+HEADER = struct.Struct('<8sHHqq32sIIIIII')
+
+FLAG_DESTRUCTIVE = 1
+FLAG_EXPLODES = 2
+FLAG_DROP_FACTOR = 4
+FLAG_FLOAT_STAGES = 8
+FLAG_FLOAT_SIZE = 16
+FIELDS = ("size", "stages", "made_of", "drop", "destructive", "explodes_on_harvest", "drop_factor")
+
+class Recipe:
+    __slots__ = ("id", "name", "size", "stages", "destructive", "explodes_on_harvest", "drop_factor",
+                 "made_of", "drop", "ingredient_sizes", "regrows", "harvests", "hours", "extra")
+
+    def get(self, key, default=None):
+        # Same answers as the items.json dict it was compiled from
+        if key in FIELDS:
+            value = getattr(self, key)
+            if key == "drop_factor" and value is None:
+                return default
+            return value
+        return self.extra.get(key, default)
+
+    def __getitem__(self, key):
+        if key in FIELDS and (key != "drop_factor" or self.drop_factor is not None):
+            return getattr(self, key)
+        return self.extra[key]
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __repr__(self):
+        return f"Recipe({self.name!r}, size={self.size}, stages={self.stages}, made_of={self.made_of})"
+
+class RecipeModel:
+    def __init__(self, names, n_recipes, size, stages, flags, drop_factor, ing_start, ing_id, ing_qty,
+                 drop_start, drop_id, drop_qty, extra, order):
+        self.names = names
+        self.ids = {name: i for i, name in enumerate(names)}
+        self.n_recipes = n_recipes
+        self.size, self.stages, self.flags, self.drop_factor = size, stages, flags, drop_factor
+        self.ing_start, self.ing_id, self.ing_qty = ing_start, ing_id, ing_qty
+        self.drop_start, self.drop_id, self.drop_qty = drop_start, drop_id, drop_qty
+        self.extra = extra
+        self._order = order
+        # Ingredient size per ingredient entry (1 for non-recipes)
+        self.ing_size = array('B', [size[j] if j < n_recipes else 1 for j in ing_id])
+        self.records = self.build_records()
+        self.by_name = {r.name: r for r in self.records}
+
+    def build_records(self):
+        names, extra = self.names, self.extra
+        ing_start, ing_qty, ing_size = self.ing_start, self.ing_qty, self.ing_size
+        drop_start, drop_qty = self.drop_start, self.drop_qty
+        ing_names = [names[j] for j in self.ing_id]
+        drop_names = [names[j] for j in self.drop_id]
+        records = []
+        for i, (size, stages, flags, drop_factor) in enumerate(zip(self.size, self.stages, self.flags, self.drop_factor)):
+            r = Recipe()
+            r.id = i
+            r.name = name = names[i]
+            r.size = float(size) if flags & FLAG_FLOAT_SIZE else size
+            r.stages = stages if flags & FLAG_FLOAT_STAGES else int(stages)
+            r.destructive = destructive = bool(flags & FLAG_DESTRUCTIVE)
+            r.explodes_on_harvest = explodes = bool(flags & FLAG_EXPLODES)
+            r.drop_factor = drop_factor if flags & FLAG_DROP_FACTOR else None
+            lo, hi = ing_start[i], ing_start[i + 1]
+            r.made_of = dict(zip(ing_names[lo:hi], ing_qty[lo:hi]))
+            r.ingredient_sizes = dict(zip(ing_names[lo:hi], ing_size[lo:hi]))
+            lo, hi = drop_start[i], drop_start[i + 1]
+            r.drop = dict(zip(drop_names[lo:hi], drop_qty[lo:hi]))
+            r.regrows = regrows = not destructive and not explodes and stages > 0
+            r.harvests = 48 / r.stages if regrows else 1
+            r.hours = r.stages * HOURS_PER_STAGE
+            r.extra = extra.get(name, {})
+            records.append(r)
+        return records
+
+    # Mapping interface over recipe names, in items.json order
+    def __getitem__(self, name):
+        return self.by_name[name]
+
+    def __contains__(self, name):
+        return name in self.by_name
+
+    def __iter__(self):
+        return iter(self.by_name)
+
+    def __len__(self):
+        return self.n_recipes
+
+    def get(self, name, default=None):
+        return self.by_name.get(name, default)
+
+    def keys(self):
+        return self.by_name.keys()
+
+    def values(self):
+        return self.by_name.values()
+
+    def items(self):
+        return self.by_name.items()
+
+    def topological_order(self):
+        # Recipe names, ingredients first. Raises ValueError on a cycle.
+        if self._order is None:
+            raise ValueError(f"Recipe cycle in {RECIPES_FILE}")
+        return [self.names[i] for i in self._order]
+
+    def __reduce__(self):
+        # Pickled (for --jobs workers) as the arrays, not the records
+        return (RecipeModel, (self.names, self.n_recipes, self.size, self.stages, self.flags, self.drop_factor,
+                              self.ing_start, self.ing_id, self.ing_qty, self.drop_start, self.drop_id,
+                              self.drop_qty, self.extra, self._order))
+
+def topological_order(recipes):
+    # Recipe items, ingredients first. Raises ValueError on a cycle.
+    order = []
+    state = {}
+    for root in recipes:
+        if root in state:
+            continue
+        stack = [(root, iter(recipes[root].get("made_of", {})))]
+        state[root] = 1
+        while stack:
+            name, children = stack[-1]
+            for child in children:
+                if child not in recipes:
+                    continue
+                if state.get(child) == 1:
+                    raise ValueError(f"Recipe cycle through {child}")
+                if child not in state:
+                    state[child] = 1
+                    stack.append((child, iter(recipes[child].get("made_of", {}))))
+                    break
+            else:
+                stack.pop()
+                state[name] = 2
+                order.append(name)
+    return order
+
+def compile_recipes(recipes):
+    # RecipeModel from the parsed items.json dict
+    names = list(recipes)
+    ids = {name: i for i, name in enumerate(names)}
+
+    def name_id(name):
+        if name not in ids:
+            ids[name] = len(names)
+            names.append(name)
+        return ids[name]
+
+    n = len(recipes)
+    size, stages, flags = array('H'), array('d'), array('B')
+    drop_factor = array('d')
+    ing_start, ing_id, ing_qty = array('I', [0]), array('I'), []
+    drop_start, drop_id, drop_qty = array('I', [0]), array('I'), []
+    extra = {}
+    for name, data in recipes.items():
+        s = data.get("size", 1)
+        st = data.get("stages", 0)
+        f = 0
+        if data.get("destructive", False):
+            f |= FLAG_DESTRUCTIVE
+        if data.get("explodes_on_harvest", False):
+            f |= FLAG_EXPLODES
+        if "drop_factor" in data:
+            f |= FLAG_DROP_FACTOR
+        if isinstance(s, float):
+            f |= FLAG_FLOAT_SIZE
+        if isinstance(st, float):
+            f |= FLAG_FLOAT_STAGES
+        size.append(int(s))
+        stages.append(st)
+        flags.append(f)
+        drop_factor.append(data.get("drop_factor", 0.0))
+        for ing, qty in data.get("made_of", {}).items():
+            ing_id.append(name_id(ing))
+            ing_qty.append(qty)
+        ing_start.append(len(ing_id))
+        for drop, qty in data.get("drop", {}).items():
+            drop_id.append(name_id(drop))
+            drop_qty.append(qty)
+        drop_start.append(len(drop_id))
+        unknown = {k: v for k, v in data.items() if k not in FIELDS}
+        if unknown:
+            extra[name] = unknown
+
+    try:
+        order = array('I', (ids[name] for name in topological_order(recipes)))
+    except ValueError:
+        order = None
+    return RecipeModel(names, n, size, stages, flags, drop_factor, ing_start, ing_id, ing_qty,
+                       drop_start, drop_id, drop_qty, extra, order)
+
+def as_model(recipes):
+    return recipes if isinstance(recipes, RecipeModel) else compile_recipes(recipes)
+
+def ingredient_sizes(item_data, all_items):
+    # {ingredient: size}; precomputed on compiled recipes
+    sizes = getattr(item_data, "ingredient_sizes", None)
+    if sizes is not None:
+        return sizes
+    return {k: all_items[k].get("size", 1) if k in all_items else 1 for k in item_data.get("made_of", {})}
+
+# Quantities are stored as doubles plus a per-entry int flag, so they come
+# back as the same JSON types (and recipe hashes stay the same)
+def pack_numbers(values):
+    return array('d', values).tobytes() + bytes(isinstance(v, int) for v in values)
+
+def unpack_numbers(buf, offset, n):
+    values = array('d')
+    values.frombytes(buf[offset:offset + 8 * n])
+    kinds = buf[offset + 8 * n:offset + 9 * n]
+    return [int(v) if k else v for v, k in zip(values, kinds)], offset + 9 * n
+
+def write_compiled(path, model, mtime_ns, size, digest):
+    names = "\0".join(model.names).encode('utf-8')
+    extra = json.dumps(model.extra, separators=(',', ':')).encode('utf-8')
+    order = model._order if model._order is not None else array('I')
+    parts = [
+        HEADER.pack(MAGIC, FORMAT_VERSION, model._order is not None, mtime_ns, size, digest, len(model.names),
+                    model.n_recipes, len(model.ing_id), len(model.drop_id), len(names), len(extra)),
+        names, extra,
+        model.size.tobytes(), model.stages.tobytes(), model.flags.tobytes(), model.drop_factor.tobytes(),
+        model.ing_start.tobytes(), model.ing_id.tobytes(), pack_numbers(model.ing_qty),
+        model.drop_start.tobytes(), model.drop_id.tobytes(), pack_numbers(model.drop_qty),
+        order.tobytes(),
+    ]
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.writelines(parts)
+    os.replace(tmp_path, path)
+
+def read_header(buf):
+    if len(buf) < HEADER.size:
+        return None
+    header = HEADER.unpack_from(buf, 0)
+    if header[0] != MAGIC or header[1] != FORMAT_VERSION:
+        return None
+    return header
+
+def read_compiled(buf):
+    _, _, has_order, _, _, _, n_names, n, n_ing, n_drop, names_len, extra_len = HEADER.unpack_from(buf, 0)
+    offset = HEADER.size
+    names = buf[offset:offset + names_len].decode('utf-8').split("\0") if n_names else []
+    offset += names_len
+    extra = json.loads(buf[offset:offset + extra_len].decode('utf-8'))
+    offset += extra_len
+
+    def take(typecode, count):
+        nonlocal offset
+        a = array(typecode)
+        end = offset + a.itemsize * count
+        a.frombytes(buf[offset:end])
+        offset = end
+        return a
+
+    size, stages, flags, drop_factor = take('H', n), take('d', n), take('B', n), take('d', n)
+    ing_start, ing_id = take('I', n + 1), take('I', n_ing)
+    ing_qty, offset = unpack_numbers(buf, offset, n_ing)
+    drop_start, drop_id = take('I', n + 1), take('I', n_drop)
+    drop_qty, offset = unpack_numbers(buf, offset, n_drop)
+    order = take('I', n) if has_order else None
+    if offset != len(buf):
+        raise ValueError("trailing bytes")
+    return RecipeModel(names, n, size, stages, flags, drop_factor, ing_start, ing_id, ing_qty,
+                       drop_start, drop_id, drop_qty, extra, order)
+
+def load_recipes(path=RECIPES_FILE, compiled_path=None):
+    # Compiled model for items.json; raises FileNotFoundError like open()
+    if compiled_path is None:
+        compiled_path = os.path.join(os.path.dirname(path), COMPILED_FILE)
+    st = os.stat(path)
+    try:
+        with open(compiled_path, 'rb') as f:
+            buf = f.read()
+    except OSError:
+        buf = b''
+    header = read_header(buf)
+
+    raw = None
+    if header is not None and (header[3], header[4]) != (st.st_mtime_ns, st.st_size):
+        # Touched or replaced: only recompile if the content changed
+        with open(path, 'rb') as f:
+            raw = f.read()
+        if hashlib.sha256(raw).digest() == header[5]:
+            try:
+                model = read_compiled(buf)
+            except (ValueError, struct.error, UnicodeDecodeError):
+                model = None
+            if model is not None:
+                save_compiled(compiled_path, model, st, header[5])
+                return model
+        header = None
+    if header is not None:
+        try:
+            return read_compiled(buf)
+        except (ValueError, struct.error, UnicodeDecodeError):
+            pass
+
+    if raw is None:
+        with open(path, 'rb') as f:
+            raw = f.read()
+    model = compile_recipes(json.loads(raw.decode('utf-8')))
+    save_compiled(compiled_path, model, st, hashlib.sha256(raw).digest())
+    return model
+
+def save_compiled(path, model, st, digest):
+    try:
+        write_compiled(path, model, st.st_mtime_ns, st.st_size, digest)
+    except OSError as e:
+        print(f"Could not write compiled recipes {path}: {e}")
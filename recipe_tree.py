@@ -0,0 +1,93 @@
+
+import sys
+from array import array
+from pricing import NAN
+from recipe_model import as_model
+
+# Cheapest way to get one unit of every product: buy it on the Bazaar
+# (insta-buy) or grow it from its own made_of, recursively down the recipe
+# DAG. Items are visited once per snapshot in topological order (ingredients
+# before the crops made from them), so each cost is computed once and reused
+# by every parent instead of re-expanding the subtree.
+#
+# Growing uses the same per-unit model as main.compute_profits: one set of
+# ingredients per crop, spread over 48 / stages harvests for crops that
+# regrow. Drops from intermediate crops are not credited.
+
+class RecipeTree:
+    def __init__(self, recipes, index):
+        self.recipes = recipes = as_model(recipes)
+        self.index = index
+        self.order = [name for name in recipes.topological_order() if recipes[name].made_of]
+        n = len(index)
+        # Per product id, rewritten by evaluate()
+        self.buy = array('d', [NAN]) * n
+        self.grow = array('d', [NAN]) * n
+        self.cost = array('d', [NAN]) * n
+        self.grown = bytearray(n)
+        # Hours along the longest chain of crops grown in-house to get one
+        # unit, and the ingredient that chain goes through (-1 = none)
+        self.hours = array('d', [0.0]) * n
+        self.via = array('l', [-1]) * n
+        # Stage time and amortization are fixed per recipe
+        self.divisor = {name: recipes[name].harvests for name in self.order}
+        self.grow_hours = {name: recipes[name].hours for name in self.order}
+
+    def evaluate(self):
+        index = self.index
+        ask = index.ask
+        buy, grow, cost, grown, hours, via = self.buy, self.grow, self.cost, self.grown, self.hours, self.via
+        # Products that are not recipes can only be bought
+        for i in range(len(index)):
+            buy[i] = ask[i]
+            grow[i] = NAN
+            cost[i] = ask[i]
+            grown[i] = 0
+            hours[i] = 0.0
+            via[i] = -1
+
+        for name in self.order:
+            item_id, ingredients, _ = index.refs[name]
+            total = 0.0
+            longest = 0.0
+            longest_id = -1
+            for _, ing_id, qty in ingredients:
+                unit = cost[ing_id]
+                if unit != unit:
+                    total = NAN
+                    break
+                total += unit * qty
+                if grown[ing_id] and hours[ing_id] > longest:
+                    longest = hours[ing_id]
+                    longest_id = ing_id
+            grow_cost = total / self.divisor[name]
+            grow[item_id] = grow_cost
+            # Ties go to buying: no grow time
+            if grow_cost == grow_cost and not grow_cost >= buy[item_id]:
+                cost[item_id] = grow_cost
+                grown[item_id] = 1
+                hours[item_id] = self.grow_hours[name] + longest
+                via[item_id] = longest_id
+        return self
+
+    def critical_path(self, name):
+        # Crops grown in-house along the longest chain, outermost first
+        path = []
+        i = self.index.ids[name]
+        while i >= 0 and self.grown[i]:
+            path.append(self.index.names[i])
+            i = self.via[i]
+        return path
+
+def print_tree(tree):
+    sys.stdout.reconfigure(encoding='utf-8')
+    print(f"{'ITEM':<20} | {'BUY':<12} | {'GROW':<12} | {'CHOICE':<6} | {'PATH H':<6} | CRITICAL PATH")
+    print("-" * 100)
+    for name in tree.order:
+        i = tree.index.ids[name]
+        buy = f"{tree.buy[i]:.1f}" if tree.buy[i] == tree.buy[i] else "-"
+        grow = f"{tree.grow[i]:.1f}" if tree.grow[i] == tree.grow[i] else "-"
+        choice = "grow" if tree.grown[i] else ("buy" if tree.buy[i] == tree.buy[i] else "n/a")
+        path = " -> ".join(tree.critical_path(name))
+        print(f"{name:<20} | {buy:<12} | {grow:<12} | {choice:<6} | {tree.hours[i]:<6g} | {path}")
+    print("")
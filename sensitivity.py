@@ -0,0 +1,217 @@
+
+import sys
+import time
+import argparse
+import numpy as np
+from layout_cache import LayoutCache
+from bazaar import get_bazaar_data, add_bazaar_args, client_from_args
+from pricing import PriceIndex, reachable_products
+from profit_engine import ProfitEngine
+from positions import EXACT_TIME_BUDGET
+from recipe_model import load_recipes
+
+# What-if analysis around the current prices. Each scenario scales every
+# product's bid and ask by one factor: random within +-spread for the
+# targeted products, times any fixed shocks (a drop price crash, one
+# product moving). Scenarios are evaluated in (batch, products) blocks with
+# ProfitEngine.evaluate, so 10k scenarios are a few dozen array passes.
+#
+# Reported per item: how often it lands in the top k, and the spread of its
+# profit/hour. Per ingredient: the insta-buy price at which the item stops
+# making a profit, all other prices as they are now.
+
+DEFAULT_SCENARIOS = 10000
+DEFAULT_SPREAD = 0.10
+DEFAULT_TOP = 5
+DEFAULT_BATCH = 2048
+TARGETS = ("all", "ingredients", "drops", "crops")
+
+class Sensitivity:
+    def __init__(self, engine):
+        self.engine = engine
+        self.index = engine.index
+        self.items = engine.items
+        self.bid, self.ask = (v.copy() for v in engine.price_vectors())
+
+        # Product ids per role
+        drop_ids = np.union1d(engine.drop_ench, engine.drop_base)
+        self.groups = {
+            "all": np.arange(len(self.bid)),
+            "ingredients": np.unique(engine.ing_cols),
+            "drops": drop_ids,
+            "crops": np.unique(engine.item_ids),
+        }
+
+    def shock_factors(self, shocks, drop_crash=0.0):
+        # Fixed multipliers per product id: shocks maps product name -> factor
+        fixed = np.ones(len(self.bid))
+        if drop_crash:
+            fixed[self.groups["drops"]] *= 1 - drop_crash
+        ids = {name: i for i, name in enumerate(self.index.names)}
+        for name, factor in shocks.items():
+            if name not in ids:
+                raise ValueError(f"Unknown product {name}")
+            fixed[ids[name]] *= factor
+        return fixed
+
+    def scenario_factors(self, rng, n, target, spread, fixed):
+        # (n, products) price multipliers
+        factors = np.ones((n, len(self.bid)))
+        if spread:
+            cols = self.groups[target]
+            factors[:, cols] = rng.uniform(1 - spread, 1 + spread, size=(n, len(cols)))
+        return factors * fixed
+
+    def run(self, n, target="all", spread=DEFAULT_SPREAD, shocks=None, drop_crash=0.0,
+            top=DEFAULT_TOP, seed=None, batch=DEFAULT_BATCH):
+        # Returns (n, items) profit/hour (NaN where unpriced) and the per-item
+        # count of scenarios in which it made the top `top`
+        rng = np.random.default_rng(seed)
+        fixed = self.shock_factors(shocks or {}, drop_crash)
+        n_items = len(self.items)
+        k = min(top, n_items)
+        samples = np.empty((n, n_items))
+        in_top = np.zeros(n_items, dtype=np.int64)
+        for start in range(0, n, batch):
+            b = min(batch, n - start)
+            factors = self.scenario_factors(rng, b, target, spread, fixed)
+            result = self.engine.evaluate(self.bid * factors, self.ask * factors)
+            ranked = np.where(result["valid"], result["profit_per_hour"], -np.inf)
+            samples[start:start + b] = np.where(result["valid"], result["profit_per_hour"], np.nan)
+            if k:
+                best = np.argpartition(-ranked, k - 1, axis=1)[:, :k]
+                priced = np.take_along_axis(ranked, best, axis=1) > -np.inf
+                in_top += np.bincount(best[priced], minlength=n_items)
+        return samples, in_top
+
+    def base(self):
+        return self.engine.evaluate(self.bid, self.ask)
+
+    def break_even(self):
+        # One row per (item, ingredient): the ask at which unit profit hits 0.
+        # unit_profit = revenue - sum(qty * ask) / harvests, linear in each ask.
+        engine = self.engine
+        result = self.base()
+        divisor = np.where(engine.amortized, engine.harvests, 1.0)
+        rows, cols, qty = engine.ing_rows, engine.ing_cols, engine.ing_vals
+        ask = self.ask[cols]
+        price = ask + result["unit_profit"][rows] * divisor[rows] / qty
+        out = []
+        for e in range(len(rows)):
+            row = rows[e]
+            if not result["valid"][row]:
+                continue
+            out.append({
+                "item": self.items[row],
+                "ingredient": self.index.names[cols[e]],
+                "qty": float(qty[e]),
+                "ask": float(ask[e]),
+                "break_even": float(price[e]),
+            })
+        return out
+
+def summarize(sens, samples, in_top):
+    # Per-item rows, most likely top-k first
+    base = sens.base()
+    base_pph = np.where(base["valid"], base["profit_per_hour"], -np.inf)
+    base_rank = np.empty(len(sens.items), dtype=np.int64)
+    base_rank[np.argsort(-base_pph, kind='stable')] = np.arange(1, len(sens.items) + 1)
+    n = samples.shape[0]
+    out = []
+    for col, item in enumerate(sens.items):
+        values = samples[:, col]
+        values = values[~np.isnan(values)]
+        if not len(values):
+            continue
+        out.append({
+            "item": item,
+            "base_rank": int(base_rank[col]) if base["valid"][col] else None,
+            "top_share": in_top[col] / n if n else 0.0,
+            "mean": float(values.mean()),
+            "p10": float(np.percentile(values, 10)),
+            "p90": float(np.percentile(values, 90)),
+            "loss_share": float((values < 0).mean()),
+        })
+    out.sort(key=lambda x: (-x["top_share"], -x["mean"]))
+    return out
+
+def print_report(stats, break_even, n, top, elapsed):
+    sys.stdout.reconfigure(encoding='utf-8')
+    print(f"Evaluated {n:,} scenarios in {elapsed:.2f}s.\n")
+    print(f"{'ITEM':<20} | {'RANK':<4} | {f'P(TOP {top})':<9} | {'MEAN P/H':<12} | {'P10 P/H':<12} | {'P90 P/H':<12} | {'P(LOSS)':<7}")
+    print("-" * 95)
+    for s in stats:
+        rank = s["base_rank"] if s["base_rank"] is not None else "-"
+        share = f"{s['top_share'] * 100:.1f}%"
+        print(f"{s['item']:<20} | {rank:<4} | {share:<9} | {s['mean']:<12.1f} | {s['p10']:<12.1f} | "
+              f"{s['p90']:<12.1f} | {s['loss_share'] * 100:.1f}%")
+
+    print("\nBreak-even ingredient prices (insta-buy price at which the item stops being profitable):")
+    print(f"{'ITEM':<20} | {'INGREDIENT':<24} | {'QTY':<4} | {'ASK':<12} | {'BREAK-EVEN':<12} | HEADROOM")
+    print("-" * 95)
+    for b in break_even:
+        headroom = f"{(b['break_even'] / b['ask'] - 1) * 100:+.1f}%" if b["ask"] else "-"
+        print(f"{b['item']:<20} | {b['ingredient']:<24} | {b['qty']:<4g} | {b['ask']:<12.1f} | {b['break_even']:<12.1f} | {headroom}")
+
+def parse_shock(text):
+    name, sep, factor = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected PRODUCT=FACTOR, got {text!r}")
+    try:
+        return name.upper(), float(factor)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bad factor in {text!r}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check how robust the profit ranking is to price moves.")
+    parser.add_argument("--scenarios", type=int, default=DEFAULT_SCENARIOS,
+                        help="number of random scenarios (default: %(default)s)")
+    parser.add_argument("--spread", type=float, default=DEFAULT_SPREAD,
+                        help="random price moves are uniform within +-SPREAD (default: %(default)s)")
+    parser.add_argument("--target", choices=TARGETS, default="all",
+                        help="which prices move randomly (default: %(default)s)")
+    parser.add_argument("--drop-crash", type=float, default=0.0, metavar="FRACTION",
+                        help="also cut every drop price by FRACTION in all scenarios, e.g. 0.5")
+    parser.add_argument("--shock", type=parse_shock, action="append", default=[], metavar="PRODUCT=FACTOR",
+                        help="also scale one product's prices by FACTOR in all scenarios (repeatable)")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="k for the top-k share (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed, for repeatable runs")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH,
+                        help="scenarios evaluated per array pass (default: %(default)s)")
+    parser.add_argument("--exact", action="store_true", help="use exact layouts")
+    parser.add_argument("--time-budget", type=float, default=EXACT_TIME_BUDGET,
+                        help="seconds per recipe for --exact (default: %(default)s)")
+    add_bazaar_args(parser)
+    args = parser.parse_args(argv)
+    if args.scenarios < 1 or args.batch < 1:
+        parser.error("--scenarios and --batch must be positive")
+
+    try:
+        recipes = load_recipes()
+    except FileNotFoundError:
+        print("items.json not found.")
+        return
+
+    layout_cache = LayoutCache(exact=args.exact, time_budget=args.time_budget)
+    layouts = layout_cache.get_layouts([name for name, data in recipes.items() if data.get("made_of")], recipes)
+    layout_cache.save()
+
+    products = get_bazaar_data(client_from_args(args), whitelist=reachable_products(recipes))
+    if not products:
+        return
+    index = PriceIndex.from_products(recipes, products)
+    del products
+
+    sens = Sensitivity(ProfitEngine(recipes, index, layouts))
+    started = time.perf_counter()
+    try:
+        samples, in_top = sens.run(args.scenarios, args.target, args.spread, dict(args.shock), args.drop_crash,
+                                   args.top, args.seed, args.batch)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    elapsed = time.perf_counter() - started
+    print_report(summarize(sens, samples, in_top), sens.break_even(), args.scenarios, args.top, elapsed)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,251 @@
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+from urllib.parse import urlsplit, unquote
+from layout_cache import LayoutCache
+from bazaar import DEFAULT_TTL, add_bazaar_args, client_from_args
+from positions import EXACT_TIME_BUDGET
+from watch import Watcher
+from pricing import reachable_products, sell_as
+from recipe_model import load_recipes
+
+# Small HTTP/JSON service over warm in-memory state, so other tools don't have
+# to run the scripts and parse their text output. Recipes and layouts are
+# loaded once. Prices live in a watch.Watcher and are refreshed on demand
+# once older than --refresh seconds. Requests that arrive while a refresh is
+# in flight await that same refresh, so a burst costs one Bazaar fetch and
+# one (incremental) recompute.
+#
+#   GET /profits           ranked profit table
+#   GET /items/<ITEM>      one item's revenue/cost breakdown
+#   GET /layouts/<ITEM>    an item's layout grid
+
+DEFAULT_PORT = 8765
+MAX_HEADER_BYTES = 16384
+
+class ProfitService:
+    def __init__(self, recipes, layouts, client, refresh=DEFAULT_TTL):
+        self.recipes = recipes
+        self.layouts = layouts
+        self.client = client
+        self.client.whitelist = set(reachable_products(recipes))
+        self.refresh_every = refresh
+        self.watcher = Watcher(recipes, layouts)
+        self.refreshed_at = None
+        self.warnings = []
+        self.pending = None
+        self.fetches = 0
+
+    async def state(self):
+        # Fresh-enough watcher; concurrent callers share one pending refresh
+        if self.refreshed_at is not None and time.monotonic() - self.refreshed_at < self.refresh_every:
+            return self.watcher
+        if self.pending is None:
+            self.pending = asyncio.ensure_future(self.refresh())
+        pending = self.pending
+        try:
+            await asyncio.shield(pending)
+        finally:
+            if self.pending is pending and pending.done():
+                self.pending = None
+        return self.watcher
+
+    async def refresh(self):
+        # Fetch and recompute off the event loop
+        self.fetches += 1
+        await asyncio.to_thread(self.refresh_sync)
+        self.refreshed_at = time.monotonic()
+
+    def refresh_sync(self):
+        # --refresh decides when to ask again, not the client's TTL
+        payload = self.client.fetch_snapshot(max_age=0)
+        if not payload or not payload.get("success") or not payload.get("products"):
+            if self.watcher.ticks == 0:
+                raise RuntimeError("No Bazaar data available")
+            # Keep serving the last good prices
+            return
+        if self.watcher.ticks and payload.get("lastUpdated") == self.watcher.last_updated:
+            return
+        _, warnings, _ = self.watcher.update(payload["products"], payload.get("lastUpdated"))
+        if warnings:
+            self.warnings = warnings
+
+    async def profits(self):
+        watcher = await self.state()
+        return {
+            "lastUpdated": watcher.last_updated,
+            "profits": [dict(p, rank=rank) for rank, p in enumerate(watcher.profits(), 1)],
+            "skipped": watcher.skipped_items(),
+            "warnings": self.warnings,
+        }
+
+    async def item(self, name):
+        if name not in self.recipes:
+            return None
+        watcher = await self.state()
+        return item_breakdown(watcher, name)
+
+    async def layout(self, name):
+        layout = self.layouts.get(name)
+        if layout is None:
+            return None
+        if isinstance(layout, Exception):
+            return {"item": name, "error": str(layout)}
+        grid, spots, legend = layout
+        return {"item": name, "spots": spots, "legend": legend, "grid": ["".join(row) for row in grid]}
+
+def item_breakdown(watcher, name):
+    # The numbers behind one row of the profit table, priced like compute_profits
+    index = watcher.index
+    data = watcher.recipes[name]
+    out = {"item": name, "lastUpdated": watcher.last_updated, "rank": watcher.rank(name)}
+    entry = watcher.entries.get(name)
+    if entry is not None:
+        out.update(entry)
+    else:
+        out["skipped"] = watcher.skipped.get(name, f"{name}: No recipe defined")
+    if not data.get("made_of"):
+        return out
+
+    item_id, ingredients, drops = index.refs[name]
+    out["instasell_price"] = index.bid[item_id] if index.has_bid(item_id) else None
+    out["drops"] = []
+    for drop_item, enchanted_id, base_id, units in drops:
+        drop_id = sell_as(index, enchanted_id, base_id)
+        product = index.names[drop_id] if drop_id is not None else None
+        price = index.bid[drop_id] if drop_id is not None else None
+        out["drops"].append({"item": drop_item, "qty": data["drop"][drop_item], "units": units, "priced_as": product,
+                             "unit_price": price, "revenue": units * price if price is not None else 0})
+    out["ingredients"] = [{"item": ing_name, "qty": qty,
+                           "unit_price": index.ask[ing_id] if index.has_ask(ing_id) else None}
+                          for ing_name, ing_id, qty in ingredients]
+    out["harvests_per_set"] = data.harvests
+    out["hours"] = data.hours
+    return out
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+async def route(service, method, path):
+    if method != "GET":
+        raise HTTPError(405, "Only GET is supported")
+    parts = [unquote(p) for p in urlsplit(path).path.split("/") if p]
+    if parts in ([], ["profits"]):
+        return await service.profits()
+    if len(parts) == 2 and parts[0] in ("items", "layouts"):
+        name = parts[1].upper()
+        result = await (service.item(name) if parts[0] == "items" else service.layout(name))
+        if result is None:
+            raise HTTPError(404, f"Unknown item {name}")
+        return result
+    raise HTTPError(404, f"No such endpoint {path}")
+
+async def handle(service, reader, writer):
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            except asyncio.LimitOverrunError:
+                await respond(writer, 400, {"error": "Request headers too large"}, False)
+                return
+            lines = head.decode("latin-1").split("\r\n")
+            request = lines[0].split()
+            headers = {}
+            for line in lines[1:]:
+                if ":" in line:
+                    k, v = line.split(":", 1)
+                    headers[k.strip().lower()] = v.strip()
+            # Request bodies are never used, but must be read off the stream;
+            # without a usable length the stream cannot be resynced
+            try:
+                length = int(headers.get("content-length", 0) or 0)
+                if length < 0:
+                    raise ValueError(length)
+            except ValueError:
+                await respond(writer, 400, {"error": "Bad Content-Length header"}, False)
+                return
+            if length:
+                try:
+                    await reader.readexactly(length)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+            keep_alive = (len(request) == 3 and request[2] == "HTTP/1.1"
+                          and headers.get("connection", "").lower() != "close")
+            try:
+                if len(request) != 3:
+                    raise HTTPError(400, "Malformed request line")
+                status, body = 200, await route(service, request[0], request[1])
+            except HTTPError as e:
+                status, body = e.status, {"error": str(e)}
+            except Exception as e:
+                status, body = 503, {"error": f"{type(e).__name__}: {e}"}
+            await respond(writer, status, body, keep_alive)
+            if not keep_alive:
+                return
+    finally:
+        writer.close()
+
+async def respond(writer, status, body, keep_alive):
+    # Serialized before the status line goes out, so a body that is not
+    # valid JSON (NaN/inf) still gets a response
+    try:
+        payload = json.dumps(body, allow_nan=False, default=str).encode("utf-8")
+    except ValueError as e:
+        status = 500
+        payload = json.dumps({"error": f"Unserializable response: {e}"}).encode("utf-8")
+    writer.write((f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                  f"Content-Type: application/json\r\n"
+                  f"Content-Length: {len(payload)}\r\n"
+                  f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1") + payload)
+    await writer.drain()
+
+async def serve(service, host, port):
+    server = await asyncio.start_server(lambda r, w: handle(service, r, w), host, port,
+                                        limit=MAX_HEADER_BYTES)
+    print(f"Serving on http://{host}:{port} (GET /profits, /items/<ITEM>, /layouts/<ITEM>)")
+    sys.stdout.flush()
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the profit table and layouts as JSON over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to bind (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to bind (default: %(default)s)")
+    parser.add_argument("--refresh", type=float, default=DEFAULT_TTL,
+                        help="re-fetch prices when they are older than this many seconds (default: %(default)s)")
+    parser.add_argument("--exact", action="store_true", help="use exact layouts")
+    parser.add_argument("--time-budget", type=float, default=EXACT_TIME_BUDGET,
+                        help="seconds per recipe for --exact (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, default=1, help="solve layouts in N worker processes (default: %(default)s)")
+    add_bazaar_args(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        recipes = load_recipes()
+    except FileNotFoundError:
+        print("items.json not found.")
+        return
+
+    layout_cache = LayoutCache(exact=args.exact, time_budget=args.time_budget)
+    layouts = layout_cache.get_layouts([name for name, data in recipes.items() if data.get("made_of")],
+                                       recipes, jobs=args.jobs)
+    layout_cache.save()
+
+    service = ProfitService(recipes, layouts, client_from_args(args), refresh=args.refresh)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
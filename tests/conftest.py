@@ -0,0 +1,32 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from recipe_model import load_recipes
+
+ITEMS = os.path.join(ROOT, "items.json")
+
+@pytest.fixture(scope="session")
+def recipes(tmp_path_factory):
+    # The real items.json, compiled into a scratch cache
+    return load_recipes(ITEMS, str(tmp_path_factory.mktemp("recipes") / "items.bin"))
+
+@pytest.fixture(scope="session")
+def layouts(recipes):
+    # Stand-in layouts: every recipe gets 4 spots
+    return {name: ([[' ']], 4, "") for name, data in recipes.items() if data.get("made_of")}
+
+@pytest.fixture()
+def payload(recipes):
+    # Deterministic Bazaar payload covering every reachable product
+    from bench import fixture_snapshot
+    return fixture_snapshot(recipes)
+
+def quote(price, amount=100):
+    # One-level product entry at price
+    return {"sell_summary": [{"amount": amount, "pricePerUnit": price, "orders": 1}],
+            "buy_summary": [{"amount": amount, "pricePerUnit": price * 1.05, "orders": 1}],
+            "quick_status": {"sellPrice": price, "buyPrice": price * 1.05}}
@@ -0,0 +1,64 @@
+import gzip
+import json
+import base64
+import asyncio
+from auctions import LowestBIN, fetch_lowest_bin, item_id
+
+def item_bytes(name, count=1):
+    # Minimal NBT like the API's: a Count byte tag, then tag.ExtraAttributes.id
+    raw = (b'\x0a\x00\x00\x09\x00\x01i\x0a\x00\x00\x00\x01'
+           b'\x01\x00\x05Count' + bytes([count]) +
+           b'\x0a\x00\x03tag\x0a\x00\x0fExtraAttributes'
+           b'\x08\x00\x02id' + len(name).to_bytes(2, 'big') + name.encode() + b'\x00\x00\x00')
+    return base64.b64encode(gzip.compress(raw)).decode()
+
+def auction(name, price, count=1, bin=True):
+    return {"bin": bin, "starting_bid": price, "item_bytes": item_bytes(name, count)}
+
+def test_item_id_reads_name_and_stack():
+    assert item_id(item_bytes("SNOOZLING", 4)) == ("SNOOZLING", 4)
+    assert item_id("not base64 gzip") == (None, 0)
+
+def test_lowest_bin_per_unit():
+    index = LowestBIN({"SNOOZLING", "ZOMBUD"})
+    index.add_page({"success": True, "lastUpdated": 1, "auctions": [
+        auction("SNOOZLING", 100), auction("SNOOZLING", 120, count=2), auction("SNOOZLING", 10, bin=False),
+        auction("HYPERION", 1)]})
+    index.add_page({"success": True, "lastUpdated": 2, "auctions": [auction("ZOMBUD", 30)]})
+    assert index.prices == {"SNOOZLING": 60, "ZOMBUD": 30}
+    assert index.decoded == 4 and index.stale_pages == 1
+
+def test_fetch_reads_every_page():
+    pages = [[auction("SNOOZLING", 90)], [auction("SNOOZLING", 50)], [auction("ZOMBUD", 7, count=7)]]
+
+    async def serve(reader, writer):
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                break
+            page = int(head.split(b" ")[1].split(b"page=")[1])
+            if page > len(pages):
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                continue
+            auctions = pages[page] if page < len(pages) else []
+            body = json.dumps({"success": True, "lastUpdated": 1, "totalPages": len(pages) + 2,
+                               "auctions": auctions}).encode()
+            if page % 2:
+                body = gzip.compress(body)
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Encoding: gzip\r\nTransfer-Encoding: chunked\r\n\r\n" +
+                             f"{len(body):x}\r\n".encode() + body + b"\r\n0\r\n\r\n")
+            else:
+                writer.write(f"HTTP/1.1 200 OK\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+        writer.close()
+
+    async def run():
+        server = await asyncio.start_server(serve, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await fetch_lowest_bin({"SNOOZLING", "ZOMBUD"}, f"http://127.0.0.1:{port}/auctions", 2, 5)
+
+    index = asyncio.run(run())
+    assert index.prices == {"SNOOZLING": 50, "ZOMBUD": 1}
+    assert index.pages == len(pages) + 1 and index.failed == [len(pages) + 1]
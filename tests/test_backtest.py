@@ -0,0 +1,52 @@
+import json
+import math
+import pytest
+from conftest import quote
+from bazaar import SnapshotStore
+from main import compute_profits
+from pricing import PriceIndex, reachable_products
+
+pytest.importorskip("numpy")
+
+def history(recipes):
+    # Three snapshots with drifting prices, plus a product no recipe reaches
+    payloads = []
+    for tick in range(3):
+        products = {pid: quote(10 + (i * 7 + tick * 13) % 50) for i, pid in enumerate(reachable_products(recipes))}
+        products["UNREACHED_PRODUCT"] = quote(1)
+        payloads.append({"success": True, "lastUpdated": 1000 + tick, "products": products})
+    return payloads
+
+def test_sources_are_decoded_through_the_whitelist(recipes, tmp_path):
+    from backtest import iter_snapshots
+    payloads = history(recipes)
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    for p in payloads:
+        store.save(p)
+    lines = tmp_path / "history.jsonl"
+    lines.write_text("".join(json.dumps(p) + "\n" for p in payloads), encoding="utf-8")
+    whitelist = set(reachable_products(recipes))
+    for source in (store.path, str(lines)):
+        decoded = list(iter_snapshots(source, whitelist))
+        assert [p["lastUpdated"] for p in decoded] == [1000, 1001, 1002]
+        for got, sent in zip(decoded, payloads):
+            assert got["products"] == {k: v for k, v in sent["products"].items() if k in whitelist}
+
+def test_series_matches_the_profit_pass(recipes, layouts):
+    from backtest import Backtest
+    payloads = history(recipes)
+    bt = Backtest(recipes, layouts)
+    for p in payloads:
+        assert bt.add(p)
+    assert not bt.add({"success": False})
+    assert bt.times == [1000, 1001, 1002] and bt.skipped == 1
+    series = bt.series()
+    for row, p in zip(series, payloads):
+        index = PriceIndex.from_products(recipes, p["products"])
+        expected = {e["item"]: e["profit_per_hour"] for e in compute_profits(recipes, index, layouts)[0]}
+        for item, value in zip(bt.items, row):
+            if item in expected:
+                assert value == pytest.approx(expected[item], rel=1e-9, abs=1e-9), item
+            else:
+                assert math.isnan(value), item
+    assert [s["snapshots"] for s in bt.stats()] == [3] * len(bt.stats())
@@ -0,0 +1,22 @@
+import argparse
+from bazaar import DEFAULT_KEEP, SnapshotStore, add_bazaar_args, client_from_args, snapshot_name
+
+def test_store_keeps_newest_snapshots(tmp_path):
+    store = SnapshotStore(str(tmp_path), keep=3)
+    for stamp in range(5):
+        store.save({"success": True, "lastUpdated": stamp, "products": {}})
+    assert store.list() == [str(tmp_path / snapshot_name(stamp)) for stamp in (2, 3, 4)]
+
+def test_keep_zero_keeps_everything(tmp_path):
+    store = SnapshotStore(str(tmp_path), keep=0)
+    for stamp in range(5):
+        store.save({"success": True, "lastUpdated": stamp, "products": {}})
+    assert len(store.list()) == 5
+
+def test_keep_flag_reaches_the_store():
+    parser = argparse.ArgumentParser()
+    add_bazaar_args(parser)
+    client = client_from_args(parser.parse_args([]))
+    assert client.store.keep == DEFAULT_KEEP
+    client = client_from_args(parser.parse_args(["--keep", "2"]))
+    assert client.store.keep == 2
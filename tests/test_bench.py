@@ -0,0 +1,29 @@
+import json
+import bench
+from pricing import reachable_products
+
+def test_fixture_is_deterministic(recipes):
+    payload = bench.fixture_snapshot(recipes)
+    assert payload == bench.fixture_snapshot(recipes)
+    assert set(reachable_products(recipes)) <= set(payload["products"])
+    assert len(payload["products"]) == len(reachable_products(recipes)) + bench.FIXTURE_FILLER
+
+def test_profit_cases_agree(recipes, payload):
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    results = {name: fn() for name, fn in bench.profit_cases(recipes, raw)}
+    assert results["profit/full_pass"] == results["profit/compute_only"]
+    assert results["profit/full_pass_streamed"] == results["profit/compute_only"]
+    assert results["profit/compute_only"][0]
+
+def test_main_writes_a_report(recipes, tmp_path, monkeypatch):
+    monkeypatch.setattr(bench, "load_recipes", lambda: recipes)
+    output = tmp_path / "bench.json"
+    bench.main(["--repeat", "1", "--only", "compute_only", "--output", str(output)])
+    report = json.loads(output.read_text(encoding='utf-8'))
+    assert list(report["results"]) == ["profit/compute_only"]
+    assert report["results"]["profit/compute_only"]["repeat"] == 1
+    assert report["snapshot"] == f"fixture(seed={bench.FIXTURE_SEED})"
+
+def test_layout_cases_run(recipes):
+    for name, fn in bench.layout_cases(recipes):
+        assert fn(), name
@@ -0,0 +1,22 @@
+from conftest import quote
+from main import compute_profits
+from pricing import DepthIndex, PriceIndex
+
+def priced(recipes, amount):
+    products = {name: quote(10.0 + i, amount) for i, name in enumerate(sorted(PriceIndex(recipes).names))}
+    index = PriceIndex.from_products(recipes, products)
+    return index, DepthIndex.from_products(index, products)
+
+def test_deep_books_match_top_of_book(recipes, layouts):
+    index, depth = priced(recipes, 10 ** 9)
+    plain, _, _ = compute_profits(recipes, index, layouts)
+    deep, _, warnings = compute_profits(recipes, index, layouts, depth)
+    assert plain and not warnings
+    assert [p["item"] for p in deep] == [p["item"] for p in plain]
+    for a, b in zip(deep, plain):
+        assert abs(a["total_profit"] - b["total_profit"]) < 1e-6 * max(1, abs(b["total_profit"]))
+
+def test_thin_books_warn(recipes, layouts):
+    index, depth = priced(recipes, 1)
+    _, _, warnings = compute_profits(recipes, index, layouts, depth)
+    assert any("too thin" in w for w in warnings)
@@ -0,0 +1,29 @@
+import time
+from exact_layout import BLOCKED
+from positions import solve_layout, solve_layout_exact
+
+def test_exact_never_loses_to_the_heuristic(recipes):
+    proven = {}
+    for name, data in recipes.items():
+        if not data.get("made_of"):
+            continue
+        _, spots, _, proven[name] = solve_layout_exact(name, data, recipes, 0.2)
+        # Proven or not: the search starts from the heuristic layout
+        assert spots >= solve_layout(name, data, recipes)[1], name
+    assert any(proven.values()) and not all(proven.values())
+
+def test_unbeaten_heuristic_layout_is_returned(recipes):
+    name = "PUFFERCLOUD"
+    grid, spots, legend = solve_layout(name, recipes[name], recipes)
+    assert solve_layout_exact(name, recipes[name], recipes, 0.2) == (grid, spots, legend, True)
+
+def test_search_stops_at_the_budget(recipes):
+    started = time.perf_counter()
+    _, spots, _, proven = solve_layout_exact("CHOCONUT", recipes["CHOCONUT"], recipes, 0.2)
+    assert time.perf_counter() - started < 1.0
+    assert spots > 0 and not proven
+
+def test_blocked_cells_stay_empty(recipes):
+    blocked = {(0, 0), (4, 5), (9, 9)}
+    grid, _, _, _ = solve_layout_exact("ASHWREATH", recipes["ASHWREATH"], recipes, 1, blocked=blocked)
+    assert all(grid[r][c] == BLOCKED for r, c in blocked)
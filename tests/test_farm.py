@@ -0,0 +1,13 @@
+from farm import FarmModel
+from main import compute_profits
+from pricing import PriceIndex
+
+def test_single_plot_earns_its_profit_per_hour(recipes, layouts, payload):
+    index = PriceIndex.from_products(recipes, payload["products"])
+    profits, _, _ = compute_profits(recipes, index, layouts)
+    model = FarmModel(recipes, index, layouts)
+    assert profits
+    for p in profits:
+        counts = [0] * len(model.mutations)
+        counts[model.mutations.index(p["item"])] = 1
+        assert abs(model.profit(counts) - p["profit_per_hour"]) < 1e-6 * max(1, abs(p["profit_per_hour"])), p["item"]
@@ -0,0 +1,29 @@
+from grow_sim import INGREDIENT_LIFETIME, PlotModel, approximation, simulate_farm
+from positions import solve_layout
+
+def plot_of(recipes, name):
+    recipe = recipes[name]
+    return PlotModel(recipe, solve_layout(name, recipe, recipes)[0], recipes), recipe
+
+def test_fast_crop_matches_the_approximation(recipes):
+    plot, recipe = plot_of(recipes, "ASHWREATH")
+    horizon = 2 * INGREDIENT_LIFETIME
+    sim = simulate_farm(plot, recipe, horizon=horizon)
+    assert sim["crops"] == len(plot.spots) * horizon // recipe.hours
+    assert sim["crops"] / horizon == approximation(recipe, len(plot.spots))[0]
+    # Planted at hour 0 and replanted once at hour 48
+    assert sum(sim["planted"].values()) == 2 * len(plot.placements)
+
+def test_crop_slower_than_its_ingredients_never_grows(recipes):
+    plot, recipe = plot_of(recipes, "ALL_IN_ALOE")
+    assert recipe.hours > INGREDIENT_LIFETIME
+    assert simulate_farm(plot, recipe, horizon=4 * INGREDIENT_LIFETIME)["crops"] == 0
+
+def test_staggered_plots_share_one_run(recipes):
+    plot, recipe = plot_of(recipes, "GLASSCORN")
+    one = simulate_farm(plot, recipe, horizon=100)
+    two = simulate_farm(plot, recipe, plots=2, horizon=100)
+    assert two["crops"] == 2 * one["crops"] and two["plot_hours"] == 200
+    late = simulate_farm(plot, recipe, plots=2, horizon=100, stagger=40)
+    assert late["crops"] == one["crops"] + simulate_farm(plot, recipe, horizon=60)["crops"]
+    assert late["events"] == one["events"]
@@ -0,0 +1,34 @@
+import json
+import pytest
+import instrument
+from layout_cache import run_solver
+
+@pytest.fixture()
+def fresh(monkeypatch):
+    # Private event/counter stores, so nothing leaks into other tests
+    monkeypatch.setattr(instrument, "_events", [])
+    monkeypatch.setattr(instrument, "_counters", {})
+    return instrument
+
+def test_nothing_is_recorded_when_disabled(fresh, recipes, monkeypatch):
+    monkeypatch.setattr(instrument, "enabled", False)
+    assert instrument.stage("a") is instrument.stage("b")
+    run_solver("CHOCONUT", recipes["CHOCONUT"], recipes, exact=True, time_budget=0.1)
+    assert instrument._events == [] and instrument._counters == {}
+    assert instrument.summary() == {}
+
+def test_stages_and_counters_when_enabled(fresh, recipes, monkeypatch, tmp_path):
+    monkeypatch.setattr(instrument, "enabled", True)
+    run_solver("CHOCONUT", recipes["CHOCONUT"], recipes, exact=True, time_budget=0.1)
+    calls, total, _ = instrument.summary()["layout.solve_exact"]
+    assert calls == 1 and total >= 0.1
+    assert instrument._counters["layout.exact.nodes"] > 0
+    assert instrument._counters["layout.exact.timed_out"] == 1
+
+    path = tmp_path / "trace.json"
+    instrument.write_trace(str(path))
+    events = json.loads(path.read_text(encoding='utf-8'))["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    assert [e["name"] for e in spans] == ["layout.solve_exact"]
+    assert spans[0]["args"] == {"item": "CHOCONUT"}
+    assert {e["name"] for e in events if e["ph"] == "C"} == set(instrument._counters)
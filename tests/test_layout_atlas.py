@@ -0,0 +1,25 @@
+import os
+from conftest import ROOT
+from layout_atlas import ATLAS_FILE, LayoutAtlas, build_atlas
+from layout_cache import recipe_hash, run_solver
+
+def solvable(recipes):
+    return [name for name, data in recipes.items() if data.get("made_of")]
+
+def test_shipped_atlas_is_current(recipes):
+    atlas = LayoutAtlas(os.path.join(ROOT, ATLAS_FILE))
+    for name in solvable(recipes):
+        h = recipe_hash(name, recipes[name], recipes)
+        grid, spots, legend = atlas.lookup(name, h)
+        assert (grid, spots, legend) == run_solver(name, recipes[name], recipes)[:3], name
+
+def test_built_atlas_reads_back(recipes, tmp_path):
+    path = str(tmp_path / "layouts.atlas")
+    build_atlas(recipes, path)
+    atlas = LayoutAtlas(path)
+    for name in solvable(recipes):
+        entry = atlas.entry(name)
+        assert entry["hash"] == recipe_hash(name, recipes[name], recipes)
+        assert entry["grid"] == run_solver(name, recipes[name], recipes)[0]
+    assert atlas.entry(solvable(recipes)[0], exact=True) is None
+    atlas.close()
@@ -0,0 +1,53 @@
+import os
+import json
+import time
+import multiprocessing
+from conftest import ITEMS
+from layout_cache import LayoutCache, recipe_hash
+from positions import solve_layout, solve_layout_exact
+
+def solvable(recipes):
+    return [name for name, data in recipes.items() if data.get("made_of")]
+
+def test_hash_follows_shape_not_drops(recipes):
+    name = "CHOCONUT"
+    with open(ITEMS, encoding='utf-8') as f:
+        data = json.load(f)[name]
+    assert recipe_hash(name, recipes[name], recipes) == recipe_hash(name, data, recipes)
+    h = recipe_hash(name, data, recipes)
+    assert recipe_hash(name, dict(data, drop={}), recipes) == h
+    assert recipe_hash(name, dict(data, size=2), recipes) != h
+    assert recipe_hash(name, data, recipes, exact=True) != h
+    assert recipe_hash(name, data, recipes, plot=(11, 11, set())) != h
+
+def test_cache_hits_after_reload(recipes, tmp_path):
+    path = str(tmp_path / "layouts.json")
+    names = solvable(recipes)[:5]
+    cache = LayoutCache(path, atlas_path=str(tmp_path / "missing.atlas"))
+    solved = cache.get_layouts(names, recipes)
+    assert cache.misses == len(names) and cache.hits == 0
+    cache.save()
+    assert os.path.exists(path)
+    again = LayoutCache(path, atlas_path=str(tmp_path / "missing.atlas"))
+    assert again.get_layouts(names, recipes) == solved
+    assert again.hits == len(names) and again.misses == 0
+
+def test_pool_times_out_and_replaces_stuck_workers(recipes, tmp_path):
+    # Two long exact searches tie up both workers, so that pool is torn
+    # down and the quick recipes are solved by a fresh one
+    slow = ["CHOCONUT", "DUSTGRAIN"]
+    quick = ["ASHWREATH", "WITHERBLOOM"]
+    cache = LayoutCache(str(tmp_path / "layouts.json"), exact=True, time_budget=30,
+                        atlas_path=str(tmp_path / "missing.atlas"))
+    started = time.monotonic()
+    layouts = cache.get_layouts(slow + quick, recipes, jobs=2, timeout=0.5)
+    assert time.monotonic() - started < 10
+    assert list(layouts) == slow + quick
+    for name in slow:
+        # Timed out: the heuristic layout is used and nothing is cached
+        assert layouts[name] == solve_layout(name, recipes[name], recipes)
+        assert cache.key(name) not in cache.entries
+    for name in quick:
+        assert layouts[name][1] == solve_layout_exact(name, recipes[name], recipes)[1]
+        assert cache.key(name) in cache.entries
+    assert multiprocessing.active_children() == []
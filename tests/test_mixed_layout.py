@@ -0,0 +1,55 @@
+import pytest
+from bitgrid import ring_cells
+from mixed_layout import MixedLayout, sharing_pairs
+from positions import solve_layout
+
+def cells(anchor, size, cols):
+    r, c = divmod(anchor, cols)
+    return {(r + dr, c + dc) for dr in range(size) for dc in range(size)}
+
+def check(layout, recipes, blocked=()):
+    # Independent of the solver: no overlaps, nothing on blocked cells, and
+    # every crop touches enough cells of each of its ingredients
+    rows, cols = layout.rows, layout.cols
+    crops, blocks = layout.layout()
+    owner = {}
+    for name, anchor in blocks:
+        for cell in cells(anchor, recipes[name].size if name in recipes else 1, cols):
+            assert cell not in owner and cell not in blocked
+            owner[cell] = name
+    for name, anchor in crops:
+        size = recipes[name].size
+        footprint = cells(anchor, size, cols)
+        assert not footprint & set(owner) and not footprint & set(blocked)
+        assert all(0 <= r < rows and 0 <= c < cols for r, c in footprint)
+        for cell in footprint:
+            owner[cell] = name
+        r, c = divmod(anchor, cols)
+        touching = [owner.get(cell) for cell in ring_cells(r, c, size, rows, cols)]
+        for ing, qty in recipes[name].made_of.items():
+            assert touching.count(ing) >= qty, (name, anchor, ing)
+
+def test_pairs_share_and_stay_valid(recipes):
+    pairs = sharing_pairs(recipes, list(recipes))
+    assert ("CHOCOBERRY", "CREAMBLOOM") in pairs
+    blocked = {(0, 0), (5, 5)}
+    layout = MixedLayout(["CHOCOBERRY", "CREAMBLOOM"], recipes, blocked=blocked)
+    value = layout.solve(300)
+    check(layout, recipes, blocked)
+    assert value == sum(layout.counts().values())
+    # Seeded, so a second run lands on the same layout
+    again = MixedLayout(["CHOCOBERRY", "CREAMBLOOM"], recipes, blocked=blocked)
+    again.solve(300)
+    assert again.layout() == layout.layout()
+
+def test_mixed_plot_beats_either_single_plot(recipes):
+    targets = ["CHOCOBERRY", "CREAMBLOOM"]
+    layout = MixedLayout(targets, recipes)
+    layout.solve(300)
+    check(layout, recipes)
+    assert sum(layout.counts().values()) >= max(solve_layout(t, recipes[t], recipes)[1] for t in targets)
+
+def test_regrowing_targets_only(recipes):
+    destructive = next(name for name, data in recipes.items() if data.get("made_of") and data.destructive)
+    with pytest.raises(ValueError):
+        MixedLayout([destructive], recipes)
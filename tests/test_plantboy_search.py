@@ -0,0 +1,30 @@
+import positions
+from positions import solve_layout
+
+NAME = "PLANTBOY_ADVANCE"
+
+# Spot counts the per-k search (k = 4 down to 1) gave before the single pass
+BASELINE = [
+    (10, 10, (), 16),
+    (9, 9, (), 16),
+    (8, 10, (), 16),
+    (7, 7, (), 8),
+    (6, 6, (), 4),
+    (5, 5, (), 0),
+    (10, 10, ((0, 0), (5, 5)), 16),
+    (8, 8, ((3, 3), (4, 4)), 8),
+]
+
+def solve_all(recipes):
+    return [solve_layout(NAME, recipes[NAME], recipes, rows, cols, set(blocked), tiled=False)
+            for rows, cols, blocked, _ in BASELINE]
+
+def test_single_pass_matches_the_per_k_counts(recipes):
+    for (rows, cols, blocked, spots), (_, got, _) in zip(BASELINE, solve_all(recipes)):
+        assert got == spots, (rows, cols, blocked)
+
+def test_transposition_table_does_not_change_layouts(recipes, monkeypatch):
+    with_table = solve_all(recipes)
+    # Every finished state is evicted at once, so nothing is ever skipped
+    monkeypatch.setattr(positions, "TRANSPOSITION_SIZE", 0)
+    assert solve_all(recipes) == with_table
@@ -0,0 +1,32 @@
+from conftest import quote
+from pricing import PriceIndex, reachable_products
+
+def dict_price(products, name, side):
+    # What the old per-lookup code read straight from the payload
+    summary = products.get(name, {}).get(side, [])
+    return summary[0]["pricePerUnit"] if summary else None
+
+def check_against_dicts(index, products):
+    for name in index.names:
+        i = index.id(name)
+        assert index.has(i) == (name in products), name
+        bid, ask = dict_price(products, name, "sell_summary"), dict_price(products, name, "buy_summary")
+        assert (index.bid[i] if index.has_bid(i) else None) == bid, name
+        assert (index.ask[i] if index.has_ask(i) else None) == ask, name
+
+def test_index_matches_dict_prices(recipes, payload):
+    products = payload["products"]
+    index = PriceIndex.from_products(recipes, products)
+    assert index.names == reachable_products(recipes)
+    check_against_dicts(index, products)
+
+    # A later snapshot rewrites the arrays in place: a delisted product, an
+    # empty order side and a new price must not keep any stale value
+    names = index.names
+    products = dict(products)
+    del products[names[0]]
+    products[names[1]] = dict(products[names[1]], sell_summary=[])
+    products[names[2]] = quote(123.4)
+    index.update(products)
+    check_against_dicts(index, products)
+    assert index.missing() == [names[0]]
@@ -0,0 +1,15 @@
+import pytest
+from main import compute_profits
+from pricing import PriceIndex
+
+pytest.importorskip("numpy")
+
+def test_vectorized_matches_the_loop(recipes, layouts, payload):
+    from profit_engine import ProfitEngine
+    index = PriceIndex.from_products(recipes, payload["products"])
+    plain, plain_skipped, _ = compute_profits(recipes, index, layouts)
+    fast, fast_skipped, _ = ProfitEngine(recipes, index, layouts).compute_profits()
+    assert [p["item"] for p in fast] == [p["item"] for p in plain]
+    for a, b in zip(fast, plain):
+        assert a["profit_per_hour"] == pytest.approx(b["profit_per_hour"], rel=1e-9, abs=1e-9)
+    assert sorted(fast_skipped) == sorted(plain_skipped)
@@ -0,0 +1,55 @@
+import json
+import os
+import shutil
+from conftest import ITEMS
+from recipe_model import compile_recipes, load_recipes, topological_order
+
+# Defaults the solvers and pricing read missing fields with
+DEFAULTS = {"size": 1, "stages": 0, "made_of": {}, "drop": {}, "destructive": False,
+            "explodes_on_harvest": False, "drop_factor": None}
+
+def raw_items():
+    with open(ITEMS, encoding='utf-8') as f:
+        return json.load(f)
+
+def test_records_answer_like_items_json(recipes):
+    items = raw_items()
+    assert list(recipes) == list(items)
+    for name, data in items.items():
+        for key, default in DEFAULTS.items():
+            assert recipes[name].get(key, default) == data.get(key, default), (name, key)
+
+def test_compiled_file_round_trips(tmp_path):
+    path = str(tmp_path / "items.json")
+    shutil.copy(ITEMS, path)
+    compiled = str(tmp_path / "items.bin")
+    first = load_recipes(path, compiled)
+    assert os.path.exists(compiled)
+    second = load_recipes(path, compiled)
+    for name in first:
+        assert repr(second[name]) == repr(first[name])
+        assert second[name].drop == first[name].drop and second[name].hours == first[name].hours
+    assert second.topological_order() == first.topological_order()
+
+def test_edited_items_are_recompiled(tmp_path):
+    items = raw_items()
+    path = str(tmp_path / "items.json")
+    compiled = str(tmp_path / "items.bin")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(items, f)
+    load_recipes(path, compiled)
+    name = next(n for n, d in items.items() if d.get("made_of"))
+    items[name]["stages"] = 7
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(items, f)
+    assert load_recipes(path, compiled)[name].stages == 7
+
+def test_topological_order_puts_ingredients_first():
+    items = raw_items()
+    model = compile_recipes(items)
+    order = model.topological_order()
+    assert order == topological_order(items)
+    seen = set()
+    for name in order:
+        assert all(ing in seen for ing in items[name].get("made_of", {}) if ing in items), name
+        seen.add(name)
@@ -0,0 +1,38 @@
+import pytest
+from conftest import quote
+from pricing import PriceIndex
+from recipe_model import HOURS_PER_STAGE, as_model
+from recipe_tree import RecipeTree
+
+# Two levels: TOP needs MID (a crop itself) plus a bought base product
+RECIPES = {
+    "BASE_A": {"size": 1, "stages": 0},
+    "BASE_B": {"size": 1, "stages": 0},
+    "MID": {"size": 1, "stages": 4, "made_of": {"BASE_A": 2}},
+    "TOP": {"size": 1, "stages": 6, "made_of": {"MID": 3, "BASE_B": 1}},
+}
+
+def evaluate(mid_price):
+    recipes = as_model(RECIPES)
+    products = {"BASE_A": quote(10), "BASE_B": quote(20), "MID": quote(mid_price), "TOP": quote(500)}
+    index = PriceIndex.from_products(recipes, products)
+    return recipes, index, RecipeTree(recipes, index).evaluate()
+
+def test_grows_the_cheaper_intermediate():
+    recipes, index, tree = evaluate(mid_price=100)
+    mid, top = index.ids["MID"], index.ids["TOP"]
+    mid_grow = 2 * index.ask[index.ids["BASE_A"]] / recipes["MID"].harvests
+    assert tree.grown[mid] and tree.cost[mid] == pytest.approx(mid_grow)
+    top_grow = (3 * mid_grow + index.ask[index.ids["BASE_B"]]) / recipes["TOP"].harvests
+    assert tree.grow[top] == pytest.approx(top_grow)
+    assert tree.hours[top] == (6 + 4) * HOURS_PER_STAGE
+    assert tree.critical_path("TOP") == ["TOP", "MID"]
+
+def test_buys_the_cheaper_intermediate():
+    recipes, index, tree = evaluate(mid_price=0.01)
+    mid, top = index.ids["MID"], index.ids["TOP"]
+    assert not tree.grown[mid] and tree.cost[mid] == index.ask[mid]
+    top_grow = (3 * index.ask[mid] + index.ask[index.ids["BASE_B"]]) / recipes["TOP"].harvests
+    assert tree.grow[top] == pytest.approx(top_grow)
+    assert tree.hours[top] == 6 * HOURS_PER_STAGE
+    assert tree.critical_path("TOP") == ["TOP"]
@@ -0,0 +1,55 @@
+import pytest
+from main import compute_profits
+from pricing import PriceIndex
+
+np = pytest.importorskip("numpy")
+
+def scaled_profits(recipes, layouts, products, factors):
+    # compute_profits with every bid and ask scaled by hand
+    index = PriceIndex.from_products(recipes, products)
+    for i, f in enumerate(factors):
+        index.bid[i] *= f
+        index.ask[i] *= f
+    profits, _, _ = compute_profits(recipes, index, layouts)
+    return {p["item"]: p["profit_per_hour"] for p in profits}
+
+def sensitivity(recipes, layouts, payload):
+    from profit_engine import ProfitEngine
+    from sensitivity import Sensitivity
+    index = PriceIndex.from_products(recipes, payload["products"])
+    return Sensitivity(ProfitEngine(recipes, index, layouts))
+
+def test_scenarios_match_a_manual_recompute(recipes, layouts, payload):
+    sens = sensitivity(recipes, layouts, payload)
+    shocked = sens.index.names[0]
+    n, spread, seed, top = 5, 0.2, 7, 3
+    # Batches of 2 so the random draws cross a batch boundary
+    samples, in_top = sens.run(n, "all", spread, {shocked: 0.5}, 0.3, top, seed, batch=2)
+
+    rng = np.random.default_rng(seed)
+    fixed = np.ones(len(sens.bid))
+    fixed[sens.groups["drops"]] *= 0.7
+    fixed[0] *= 0.5
+    counts = dict.fromkeys(sens.items, 0)
+    for start in range(0, n, 2):
+        draws = rng.uniform(1 - spread, 1 + spread, size=(min(2, n - start), len(sens.bid)))
+        for j, row in enumerate(draws):
+            expected = scaled_profits(recipes, layouts, payload["products"], row * fixed)
+            for col, item in enumerate(sens.items):
+                if item in expected:
+                    assert samples[start + j, col] == pytest.approx(expected[item], rel=1e-9, abs=1e-9), item
+                else:
+                    assert np.isnan(samples[start + j, col]), item
+            for item in sorted(expected, key=expected.get, reverse=True)[:top]:
+                counts[item] += 1
+    assert list(in_top) == [counts[item] for item in sens.items]
+
+def test_break_even_zeroes_the_unit_profit(recipes, layouts, payload):
+    sens = sensitivity(recipes, layouts, payload)
+    rows = sens.break_even()
+    assert rows
+    for row in rows[:10]:
+        index = PriceIndex.from_products(recipes, payload["products"])
+        index.ask[index.ids[row["ingredient"]]] = row["break_even"]
+        profits, _, _ = compute_profits(recipes, index, layouts, names=[row["item"]])
+        assert profits[0]["unit_profit"] == pytest.approx(0, abs=1e-6 * max(1.0, row["ask"])), row
@@ -0,0 +1,42 @@
+import json
+import asyncio
+from server import handle
+
+class StubService:
+    def __init__(self, profits):
+        self.result = profits
+
+    async def profits(self):
+        return self.result
+
+def exchange(service, request):
+    # Sends one raw request to handle() over a real socket; returns
+    # (status, body) of the first response and whether the server closed
+    async def run():
+        server = await asyncio.start_server(lambda r, w: handle(service, r, w), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            await writer.drain()
+            head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+            length = next(int(h.split(":", 1)[1]) for h in head if h.lower().startswith("content-length"))
+            body = json.loads(await reader.readexactly(length))
+            closed = await reader.read() == b""
+            writer.close()
+            return int(head[0].split()[1]), body, closed
+    return asyncio.run(asyncio.wait_for(run(), 5))
+
+def test_bad_content_length_is_a_400():
+    for length in (b"abc", b"-5"):
+        status, body, closed = exchange(StubService({}), b"GET /profits HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n")
+        assert status == 400 and "Content-Length" in body["error"] and closed
+
+def test_body_is_read_off_the_stream():
+    status, body, _ = exchange(StubService({"ok": 1}),
+                               b"GET /profits HTTP/1.0\r\nContent-Length: 4\r\n\r\nabcd")
+    assert status == 200 and body == {"ok": 1}
+
+def test_unserializable_result_is_a_500():
+    status, body, _ = exchange(StubService({"profit": float("nan")}), b"GET /profits HTTP/1.0\r\n\r\n")
+    assert status == 500 and "error" in body
@@ -0,0 +1,29 @@
+import json
+from bazaar import stream_payload
+
+def chunked(blob, size):
+    return (blob[i:i + size] for i in range(0, len(blob), size))
+
+def test_stream_matches_json_load(payload):
+    blob = json.dumps(payload, indent=1).encode("utf-8")
+    for size in (4096, 1 << 16):
+        assert stream_payload(chunked(blob, size)) == payload
+
+def test_tiny_chunks(payload):
+    # Every token split across chunk boundaries
+    small = dict(payload, products={name: payload["products"][name] for name in sorted(payload["products"])[:2]})
+    blob = json.dumps(small, indent=1).encode("utf-8")
+    for size in (1, 7):
+        assert stream_payload(chunked(blob, size)) == small
+
+def test_whitelist_and_levels(payload):
+    blob = json.dumps(payload).encode("utf-8")
+    keep = sorted(payload["products"])[:3]
+    trimmed = stream_payload(chunked(blob, 1024), whitelist=set(keep), levels=1)
+    assert sorted(trimmed["products"]) == keep
+    for name in keep:
+        product = trimmed["products"][name]
+        assert product["sell_summary"] == payload["products"][name]["sell_summary"][:1]
+        assert product["buy_summary"] == payload["products"][name]["buy_summary"][:1]
+        assert product["quick_status"] == payload["products"][name]["quick_status"]
+    assert trimmed["lastUpdated"] == payload["lastUpdated"]
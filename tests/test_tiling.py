@@ -0,0 +1,32 @@
+from exact_layout import BLOCKED
+from positions import TILE, create_grid, solve_layout, solve_layout_exact, solve_tiled
+
+def test_bigger_plot_never_loses_spots(recipes):
+    for name, data in recipes.items():
+        if not data.get("made_of"):
+            continue
+        base = solve_layout(name, data, recipes, TILE, TILE)[1]
+        for rows, cols in ((TILE + 1, TILE + 1), (TILE + 1, TILE), (TILE + 5, TILE + 5)):
+            assert solve_layout(name, data, recipes, rows, cols)[1] >= base, (name, rows, cols)
+
+def test_tiled_layout_keeps_blocked_cells(recipes):
+    blocked = {(0, 0), (TILE, TILE), (3, TILE + 2)}
+    grid, _, _ = solve_layout("CHOCONUT", recipes["CHOCONUT"], recipes, TILE + 3, TILE + 3, blocked)
+    assert len(grid) == TILE + 3 and all(len(row) == TILE + 3 for row in grid)
+    assert all(grid[r][c] == BLOCKED for r, c in blocked)
+
+def test_tiled_exact_is_not_proven_by_its_tiles(recipes):
+    name = "ASHWREATH"
+    _, base, _, proven = solve_layout_exact(name, recipes[name], recipes, 4, TILE, TILE)
+    assert proven
+    _, spots, _, proven = solve_layout_exact(name, recipes[name], recipes, 4, TILE + 1, TILE + 1)
+    assert spots >= base
+    tiled = solve_layout_exact(name, recipes[name], recipes, 4, TILE + 1, TILE + 1, tiled=False)
+    # Proven only because the whole-plot search proved it
+    assert proven == tiled[3] and spots == tiled[1]
+
+def test_proven_tiles_do_not_prove_the_plot():
+    def solve(rows, cols, blocked):
+        return create_grid(rows, cols, fill_char='.'), 1, "", True
+    _, spots, _, proven = solve_tiled(solve, TILE + 1, TILE + 1, frozenset())
+    assert spots == 4 and proven is False
@@ -0,0 +1,125 @@
+import json
+import asyncio
+from bazaar import BazaarClient
+from main import compute_profits
+from pricing import PriceIndex, item_revenue, reachable_products
+from server import ProfitService, item_breakdown, route
+from watch import Watcher, watch
+
+def full_ranking(recipes, layouts, products):
+    index = PriceIndex.from_products(recipes, products)
+    profits, _, _ = compute_profits(recipes, index, layouts)
+    return {p["item"]: rank for rank, p in enumerate(profits, 1)}
+
+def test_update_matches_full_pass(recipes, layouts, payload):
+    watcher = Watcher(recipes, layouts)
+    changes, _, dirty = watcher.update(payload["products"], 1)
+    assert dirty == len(watcher.items)
+    ranks = {p["item"]: rank for rank, p in enumerate(watcher.profits(), 1)}
+    assert ranks == full_ranking(recipes, layouts, payload["products"])
+    assert {item: new for item, _, new, _ in changes} == ranks
+
+def test_compute_profits_names_subset(recipes, layouts, payload):
+    index = PriceIndex.from_products(recipes, payload["products"])
+    everything, _, _ = compute_profits(recipes, index, layouts)
+    names = [p["item"] for p in everything[::3]]
+    subset, _, _ = compute_profits(recipes, index, layouts, names=names)
+    assert [p["item"] for p in subset] == names
+    assert subset == [p for p in everything if p["item"] in set(names)]
+
+class FakeClient:
+    def __init__(self, payload):
+        self.payload = payload
+        self.whitelist = None
+
+    def fetch_snapshot(self, max_age=None):
+        return self.payload
+
+def test_server_profits_request(recipes, layouts, payload):
+    payload["lastUpdated"] = 1
+    service = ProfitService(recipes, layouts, FakeClient(payload))
+    body = asyncio.run(route(service, "GET", "/profits"))
+    assert body["lastUpdated"] == 1
+    assert [p["rank"] for p in body["profits"]] == list(range(1, len(body["profits"]) + 1))
+    assert len(body["profits"]) == len(full_ranking(recipes, layouts, payload["products"]))
+    item = asyncio.run(route(service, "GET", f"/items/{body['profits'][0]['item']}"))
+    assert item["rank"] == 1
+
+def reported(changes):
+    return {item: (old, new) for item, old, new, _ in changes}
+
+def expected(before, after):
+    return {item: (before.get(item), after.get(item)) for item in set(before) | set(after)
+            if before.get(item) != after.get(item)}
+
+def test_unranked_item_shifts_everything_below(recipes, layouts, payload):
+    products = payload["products"]
+    watcher = Watcher(recipes, layouts)
+    watcher.update(products, 1)
+    before = full_ranking(recipes, layouts, products)
+
+    # The crop at rank 4 can no longer be sold, so every item below moves up
+    item = watcher.profits()[3]["item"]
+    without = {name: p for name, p in products.items() if name != item}
+    changes, _, _ = watcher.update(without, 2)
+    after = full_ranking(recipes, layouts, without)
+    assert item not in after
+    assert reported(changes) == expected(before, after)
+    assert len(changes) > 2
+
+    # And back: it is ranked again and pushes them down
+    changes, _, _ = watcher.update(products, 3)
+    assert reported(changes) == expected(after, before)
+    assert [p["item"] for p in watcher.profits()] == sorted(before, key=before.get)
+
+def test_item_breakdown_adds_up(recipes, layouts, payload):
+    watcher = Watcher(recipes, layouts)
+    watcher.update(payload["products"], 1)
+    for p in watcher.profits():
+        out = item_breakdown(watcher, p["item"])
+        revenue, _ = item_revenue(watcher.index, p["item"])
+        assert abs(out["instasell_price"] + sum(d["revenue"] for d in out["drops"]) - revenue) < 1e-6 * revenue
+        assert out["hours"] == p["hours"]
+
+class FakeResponse:
+    def __init__(self, status_code, body=b""):
+        self.status_code = status_code
+        self.body = body
+
+    def iter_content(self, size):
+        for i in range(0, len(self.body), size):
+            yield self.body[i:i + size]
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class FakeSession:
+    # Serves one snapshot, then 304 for conditional requests
+    def __init__(self, body):
+        self.body = body
+        self.gets = 0
+
+    def get(self, url, headers=None, timeout=None, stream=False):
+        self.gets += 1
+        if headers and "If-Modified-Since" in headers:
+            return FakeResponse(304)
+        return FakeResponse(200, self.body)
+
+def test_every_watch_tick_asks_the_api(recipes, layouts, payload, tmp_path):
+    products = {pid: payload["products"][pid] for pid in reachable_products(recipes) if pid in payload["products"]}
+    body = json.dumps({"success": True, "lastUpdated": 1, "products": products}).encode()
+    client = BazaarClient(url="http://bazaar.invalid", snapshot_dir=str(tmp_path), ttl=60)
+    client.session = FakeSession(body)
+    watcher = watch(recipes, layouts, client, interval=0, max_ticks=3)
+    # Well within the TTL, yet each tick fetches (the repeats as 304s)
+    assert client.session.gets == 3
+    assert watcher.ticks == 1
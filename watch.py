@@ -0,0 +1,194 @@
+
+import sys
+import json
+import time
+import bisect
+from main import compute_profits, print_profits
+from pricing import PriceIndex, reachable_products
+from recipe_model import as_model
+
+# Long-running re-ranking. Recipes, layouts and the PriceIndex stay in
+# memory; every tick diffs the new prices against the previous ones and
+# re-runs the profit pass only for the recipes that touch a changed product
+# (as crop, ingredient or drop). The ranking is a sorted list updated with
+# bisect, and only items whose rank moved are reported.
+
+DEFAULT_INTERVAL = 60
+
+class Watcher:
+    def __init__(self, recipes, layouts):
+        self.recipes = recipes = as_model(recipes)
+        self.layouts = layouts
+        self.index = PriceIndex(recipes)
+        self.items = [name for name, data in recipes.items() if data.get("made_of")]
+        # Recipe order breaks ties, like the stable sort in compute_profits
+        self.position = {name: pos for pos, name in enumerate(recipes)}
+        # product id -> recipes whose profit depends on it
+        self.dependents = [[] for _ in range(len(self.index))]
+        for name in self.items:
+            item_id, ingredients, drops = self.index.refs[name]
+            ids = {item_id}
+            ids.update(ing_id for _, ing_id, _ in ingredients)
+            for _, ench_id, base_id, _ in drops:
+                ids.add(ench_id)
+                ids.add(base_id)
+            for i in ids:
+                self.dependents[i].append(name)
+        self.prev = None
+        self.last_updated = None
+        self.ranking = []  # sorted (-profit_per_hour, position, item)
+        self.entries = {}  # item -> profit row
+        self.skipped = {}  # item -> skip reason
+        self.ticks = 0
+
+    def snapshot_prices(self):
+        index = self.index
+        return bytes(index.present), index.bid.tobytes(), index.ask.tobytes()
+
+    def changed_products(self, prev):
+        # Product ids whose presence, bid or ask differ from prev. Compared
+        # as raw bytes so NaN == NaN; a product is 1 byte + 2 doubles.
+        present, bid, ask = self.snapshot_prices()
+        if present == prev[0] and bid == prev[1] and ask == prev[2]:
+            return []
+        changed = []
+        for i in range(len(self.index)):
+            if (present[i] != prev[0][i] or bid[i * 8:i * 8 + 8] != prev[1][i * 8:i * 8 + 8]
+                    or ask[i * 8:i * 8 + 8] != prev[2][i * 8:i * 8 + 8]):
+                changed.append(i)
+        return changed
+
+    def update(self, products, last_updated=None):
+        # Apply one snapshot. Returns (changes, warnings, dirty item count);
+        # changes are (item, old_rank, new_rank, profit_per_hour) with 1-based
+        # ranks and None for "not ranked".
+        self.index.update(products, last_updated)
+        self.last_updated = last_updated
+        self.ticks += 1
+        if self.prev is None:
+            dirty = set(self.items)
+        else:
+            dirty = set()
+            for i in self.changed_products(self.prev):
+                dirty.update(self.dependents[i])
+        self.prev = self.snapshot_prices()
+        if not dirty:
+            return [], [], 0
+
+        names = sorted(dirty, key=self.position.get)
+        old_keys = {name: self.key(name) for name in names}
+        old_ranks = {name: self.rank(name) for name in names}
+        for name in names:
+            self.remove(name)
+        profits, skipped_items, warnings = compute_profits(self.recipes, self.index, self.layouts, names=names)
+        for p in profits:
+            self.entries[p["item"]] = p
+            bisect.insort(self.ranking, self.key(p["item"]))
+        for skip in skipped_items:
+            self.skipped[skip.split(":", 1)[0]] = skip
+        new_keys = {name: self.key(name) for name in names}
+
+        changes = []
+        for name in names:
+            new = self.rank(name)
+            if old_ranks[name] != new:
+                changes.append((name, old_ranks[name], new, self.entries[name]["profit_per_hour"] if new else None))
+        # Untouched items can only shift between the highest and lowest rank
+        # a recomputed item left or reached, or, when one entered or left
+        # the ranking, anywhere below it. Their old rank is the new one,
+        # minus recomputed items now above them, plus those that were.
+        touched = [r for name in names for r in (old_ranks[name], self.rank(name)) if r is not None]
+        if touched:
+            end = max(touched)
+            if any((old_keys[name] is None) != (new_keys[name] is None) for name in names):
+                end = len(self.ranking)
+            for pos in range(min(touched) - 1, min(end, len(self.ranking))):
+                key = self.ranking[pos]
+                if key[2] in dirty:
+                    continue
+                old = pos + 1
+                for name in names:
+                    old += (old_keys[name] is not None and old_keys[name] < key) - \
+                           (new_keys[name] is not None and new_keys[name] < key)
+                if old != pos + 1:
+                    changes.append((key[2], old, pos + 1, self.entries[key[2]]["profit_per_hour"]))
+        changes.sort(key=lambda c: (c[2] is None, c[2] or 0))
+        return changes, warnings, len(names)
+
+    def key(self, name):
+        entry = self.entries.get(name)
+        if entry is None:
+            return None
+        return (-entry["profit_per_hour"], self.position[name], name)
+
+    def remove(self, name):
+        key = self.key(name)
+        self.entries.pop(name, None)
+        self.skipped.pop(name, None)
+        if key is not None:
+            del self.ranking[bisect.bisect_left(self.ranking, key)]
+
+    def rank(self, name):
+        key = self.key(name)
+        return None if key is None else bisect.bisect_left(self.ranking, key) + 1
+
+    def profits(self):
+        return [self.entries[name] for _, _, name in self.ranking]
+
+    def skipped_items(self):
+        return [self.skipped[name] for name in self.recipes if name in self.skipped]
+
+def format_rank(rank):
+    return f"#{rank}" if rank is not None else "-"
+
+def print_changes(changes, last_updated, json_lines=False):
+    stamp = time.strftime('%H:%M:%S', time.localtime(last_updated / 1000)) if last_updated else time.strftime('%H:%M:%S')
+    for item, old, new, pph in changes:
+        if json_lines:
+            print(json.dumps({"lastUpdated": last_updated, "item": item, "old_rank": old,
+                              "new_rank": new, "profit_per_hour": pph}))
+        elif new is None:
+            print(f"[{stamp}] {item:<20} {format_rank(old):>4} -> unranked")
+        else:
+            print(f"[{stamp}] {item:<20} {format_rank(old):>4} -> {format_rank(new):<4} {pph:,.1f}/h")
+    sys.stdout.flush()
+
+def watch(recipes, layouts, client, interval=DEFAULT_INTERVAL, json_lines=False, max_ticks=None):
+    # Polls until interrupted. The first snapshot prints the full table,
+    # later ones only the rank changes.
+    sys.stdout.reconfigure(encoding='utf-8')
+    watcher = Watcher(recipes, layouts)
+    # Only reachable products are diffed, so the rest is skipped while decoding
+    client.whitelist = set(reachable_products(recipes))
+    polls = 0
+    try:
+        while max_ticks is None or polls < max_ticks:
+            polls += 1
+            started = time.monotonic()
+            try:
+                # Every tick asks the API; the TTL is for one-shot runs
+                payload = client.fetch_snapshot(max_age=0)
+            except Exception as e:
+                print(f"Error fetching bazaar data: {e}")
+                payload = None
+            if payload and payload.get("success") and payload.get("products"):
+                last_updated = payload.get("lastUpdated")
+                if watcher.ticks == 0 or last_updated != watcher.last_updated:
+                    first = watcher.ticks == 0
+                    changes, warnings, _ = watcher.update(payload["products"], last_updated)
+                    del payload
+                    if first and not json_lines:
+                        for warning in warnings:
+                            print(warning)
+                        print_profits(watcher.profits(), watcher.skipped_items(), len(recipes))
+                        print("")
+                    else:
+                        print_changes(changes, last_updated, json_lines)
+            elif payload is not None:
+                print("API request failed or returned success: false")
+            if max_ticks is not None and polls >= max_ticks:
+                break
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+    return watcher